@@ -1,9 +1,15 @@
-# config.py
-
-OVERSEERR_API_URL = 'http://YOUR_IP_ADDRESS:5055/api/v1'
-OVERSEERR_API_KEY = 'YOUR_OVERSEERR_API_KEY'
-TELEGRAM_TOKEN = 'YOUR_TELEGRAM_TOKEN'
-
-# Access Control Configuration
-# Set a password to protect access. If empty, no access control is applied.
-PASSWORD = ""  # or "" for no access control
\ No newline at end of file
+# config.py
+
+OVERSEERR_API_URL = 'http://YOUR_IP_ADDRESS:5055/api/v1'
+OVERSEERR_API_KEY = 'YOUR_OVERSEERR_API_KEY'
+TELEGRAM_TOKEN = 'YOUR_TELEGRAM_TOKEN'
+
+# Access Control Configuration
+# Set a password to protect access. If empty, no access control is applied.
+PASSWORD = ""  # or "" for no access control
+
+# Webhook Configuration (optional)
+# Set the public HTTPS URL Telegram should send updates to (e.g. behind a reverse proxy).
+# If empty, the bot uses polling.
+WEBHOOK_URL = ""  # e.g. "https://bot.example.com"
+WEBHOOK_PORT = 8443  # local port the webhook server listens on
\ No newline at end of file
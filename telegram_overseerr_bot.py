@@ -1,2637 +1,3081 @@
-import logging
-import base64
-import requests
-import urllib.parse
-import json
-import os
-from enum import Enum
-from typing import Optional
-from datetime import datetime, timezone
-
-from telegram import (
-    Update,
-    InlineKeyboardButton,
-    InlineKeyboardMarkup,
-    CallbackQuery,
-)
-from telegram.ext import (
-    ApplicationBuilder,
-    CommandHandler,
-    CallbackQueryHandler,
-    ContextTypes,
-    MessageHandler,
-    filters,
-)
-
-###############################################################################
-#                              BOT VERSION & BUILD
-###############################################################################
-VERSION = "3.0.2"
-BUILD = "2025.05.08.261"
-
-logging.basicConfig(
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-    level=logging.INFO,
-)
-logger = logging.getLogger(__name__)
-logger.info(f"Bot Version: {VERSION} BUILD: {BUILD}")
-
-###############################################################################
-#                    LOAD CONFIG OR ENVIRONMENT VARIABLES
-###############################################################################
-try:
-    logger.info("Importing environment/config variables...")
-    OVERSEERR_API_URL = (
-        os.environ.get("OVERSEERR_API_URL")
-        or getattr(__import__("config"), "OVERSEERR_API_URL", None)
-    )
-    OVERSEERR_API_KEY = (
-        os.environ.get("OVERSEERR_API_KEY")
-        or getattr(__import__("config"), "OVERSEERR_API_KEY", None)
-    )
-    TELEGRAM_TOKEN = (
-        os.environ.get("TELEGRAM_TOKEN")
-        or getattr(__import__("config"), "TELEGRAM_TOKEN", None)
-    )
-    # password initialization
-    try:
-        PASSWORD = os.environ.get("PASSWORD")
-        if PASSWORD is None:
-            # Try loading from config.py
-            config_module = __import__("config")
-            PASSWORD = getattr(config_module, "PASSWORD", None)
-    except ImportError:
-        # config.py not found, use None as fallback
-        PASSWORD = None
-    logger.info("Variables loaded successfully.")
-except Exception as e:
-    logger.error(f"Failed to load config: {e}")
-
-###############################################################################
-#                          OVERSEERR CONSTANTS
-###############################################################################
-STATUS_UNKNOWN = 1
-STATUS_PENDING = 2
-STATUS_PROCESSING = 3
-STATUS_PARTIALLY_AVAILABLE = 4
-STATUS_AVAILABLE = 5
-
-ISSUE_TYPES = {
-    1: "Video",
-    2: "Audio",
-    3: "Subtitle",
-    4: "Other"
-}
-
-# Operating modes as enum
-class BotMode(Enum):
-    NORMAL = "normal"
-    API = "api"
-    SHARED = "shared"
-
-# Define CURRENT_MODE globally
-CURRENT_MODE = BotMode.NORMAL  # Default mode
-
-# Contains the authorisation bit for 4K
-PERMISSION_4K_MOVIE = 2048
-PERMISSION_4K_TV = 4096
-
-DEFAULT_POSTER_URL = "https://raw.githubusercontent.com/sct/overseerr/refs/heads/develop/public/images/overseerr_poster_not_found.png"
-
-os.makedirs("data", exist_ok=True)  # Ensure 'data/' folder exists
-
-###############################################################################
-#                              FILE PATHS
-###############################################################################
-CONFIG_FILE = "data/bot_config.json"
-USER_SELECTION_FILE = "data/api_mode_selections.json"  # For API mode
-USER_SESSIONS_FILE = "data/normal_mode_sessions.json"  # For Normal mode
-SHARED_SESSION_FILE = "data/shared_mode_session.json"  # For Shared mode
-
-def load_config():
-    """
-    Loads the configuration from data/bot_config.json.
-    Returns a dict with default values if the file is missing or invalid.
-    """
-    try:
-        with open(CONFIG_FILE, "r", encoding="utf-8") as f:
-            config = json.load(f)
-            config.setdefault("group_mode", False)
-            config.setdefault("primary_chat_id", {"chat_id": None, "message_thread_id": None})
-            config["primary_chat_id"].setdefault("chat_id", None)
-            config["primary_chat_id"].setdefault("message_thread_id", None)
-            config.setdefault("mode", "normal")
-            config.setdefault("users", {})
-            logger.debug("Loaded configuration successfully")
-            return config
-    except (FileNotFoundError, json.JSONDecodeError, PermissionError) as e:
-        logger.warning(f"Failed to load {CONFIG_FILE}: {e}. Using defaults.")
-        default_config = {
-            "group_mode": False,
-            "primary_chat_id": {"chat_id": None, "message_thread_id": None},
-            "mode": "normal",
-            "users": {}
-        }
-        save_config(default_config)
-        return default_config
-
-async def send_message(context: ContextTypes.DEFAULT_TYPE, chat_id: int, text: str, reply_markup=None, allow_sending=True, message_thread_id: Optional[int]=None):
-    """
-    Sends a message to the specified chat_id, or to primary_chat_id (with thread) if group_mode is enabled.
-    """
-    if not allow_sending:
-        logger.debug(f"Skipped sending message to chat {chat_id}: sending not allowed")
-        return
-
-    config = load_config()
-    if config["group_mode"] and config["primary_chat_id"]["chat_id"] is not None:
-        chat_id = config["primary_chat_id"]["chat_id"]
-        message_thread_id = config["primary_chat_id"]["message_thread_id"]
-        logger.info(f"Group mode enabled, redirecting message to primary_chat_id: {chat_id}, thread: {message_thread_id}")
-    try:
-        kwargs = {
-            "chat_id": chat_id,
-            "text": text,
-            "parse_mode": "Markdown",
-            "reply_markup": reply_markup
-        }
-        if message_thread_id is not None:
-            kwargs["message_thread_id"] = message_thread_id
-        await context.bot.send_message(**kwargs)
-    except Exception as e:
-        logger.error(f"Failed to send message to chat {chat_id}, thread {message_thread_id}: {e}")
-
-def is_command_allowed(chat_id: int, message_thread_id: Optional[int], config: dict, telegram_user_id: int) -> bool:
-    """
-    Checks if a command is allowed based on Group Mode, chat/thread, and user status.
-    Admins can always use commands in private chats, even in Group Mode.
-    """
-    user_id_str = str(telegram_user_id)
-    user = config["users"].get(user_id_str, {})
-    is_admin = user.get("is_admin", False)
-    is_blocked = user.get("is_blocked", False)
-
-    if is_blocked:
-        logger.debug(f"User {telegram_user_id} is blocked, denying command")
-        return False
-
-    if is_admin and chat_id > 0:  # Positive chat_id indicates a private chat
-        logger.debug(f"Admin {telegram_user_id} in private chat {chat_id}, allowing command")
-        return True
-
-    if not config["group_mode"]:
-        return True
-
-    primary = config["primary_chat_id"]
-    if primary["chat_id"] is None:
-        logger.debug(f"Group Mode on, primary_chat_id unset, allowing command in chat {chat_id}")
-        return True
-    if chat_id != primary["chat_id"]:
-        logger.info(f"Ignoring command in chat {chat_id}: Group Mode restricts to primary chat {primary['chat_id']}")
-        return False
-    if primary["message_thread_id"] is not None and message_thread_id != primary["message_thread_id"]:
-        logger.info(f"Ignoring command in thread {message_thread_id}: Group Mode restricts to thread {primary['message_thread_id']}")
-        return False
-    return True
-
-def user_is_authorized(telegram_user_id: int) -> bool:
-    """
-    Checks if a Telegram user is authorized based on the config.
-    """
-    config = load_config()
-    user_id_str = str(telegram_user_id)
-    user = config["users"].get(user_id_str, {})
-    return user.get("is_authorized", False) and not user.get("is_blocked", False)
-
-def ensure_data_directory():
-    """
-    Ensures the directory for bot_config.json exists.
-    Creates the directory if it doesn't exist.
-    """
-    directory = os.path.dirname(CONFIG_FILE)
-    if directory:
-        try:
-            os.makedirs(directory, exist_ok=True)
-            logger.debug(f"Ensured directory exists: {directory}")
-        except Exception as e:
-            logger.error(f"Failed to create directory {directory}: {e}")
-
-def save_config(config):
-    """
-    Saves the configuration to data/bot_config.json.
-    Ensures the directory exists before writing.
-    """
-    try:
-        with open(CONFIG_FILE, "w", encoding="utf-8") as f:
-            json.dump(config, f, indent=4)
-        logger.info(f"Configuration saved to {CONFIG_FILE}")
-    except (IOError, PermissionError) as e:
-        logger.error(f"Failed to save {CONFIG_FILE}: {e}")
-
-def load_user_sessions():
-    try:
-        with open(USER_SESSIONS_FILE, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except (FileNotFoundError, json.JSONDecodeError):
-        return {}
-
-def save_user_session(telegram_telegram_user_id: int, session_data: dict):
-    """Save a user's session data to a JSON file for Normal mode."""
-    try:
-        # Load existing sessions if file exists
-        try:
-            with open(USER_SESSIONS_FILE, "r", encoding="utf-8") as f:
-                all_sessions = json.load(f)
-        except (FileNotFoundError, json.JSONDecodeError) as e:
-            logger.info(f"Creating new sessions file: {e}")
-            all_sessions = {}
-        
-        # Update with new session data
-        all_sessions[str(telegram_telegram_user_id)] = session_data
-        
-        # Write to file
-        with open(USER_SESSIONS_FILE, "w", encoding="utf-8") as f:
-            json.dump(all_sessions, f, indent=2)
-        logger.info(f"Saved session for Telegram user {telegram_telegram_user_id} to {USER_SESSIONS_FILE}")
-    except Exception as e:
-        logger.error(f"Failed to save session for Telegram user {telegram_telegram_user_id}: {e}")
-        raise  # Re-raise to catch in caller if needed
-
-def load_user_session(telegram_user_id: int) -> dict | None:
-    """Load a user's session data from the JSON file."""
-    try:
-        with open(USER_SESSIONS_FILE, "r", encoding="utf-8") as f:
-            all_sessions = json.load(f)
-            return all_sessions.get(str(telegram_user_id))
-    except (FileNotFoundError, json.JSONDecodeError):
-        return None
-
-def save_user_sessions(sessions):
-    with open(USER_SESSIONS_FILE, "w", encoding="utf-8") as f:
-        json.dump(sessions, f, indent=2)
-    logger.info("Saved user sessions")
-
-def load_shared_session():
-    try:
-        with open(SHARED_SESSION_FILE, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except (FileNotFoundError, json.JSONDecodeError):
-        return None
-
-def save_shared_session(session_data):
-    with open(SHARED_SESSION_FILE, "w", encoding="utf-8") as f:
-        json.dump(session_data, f, indent=2)
-    logger.info("Saved shared session")
-
-def clear_shared_session():
-    """Clear the shared session data."""
-    if os.path.exists(SHARED_SESSION_FILE):
-        os.remove(SHARED_SESSION_FILE)
-        logger.info("Cleared shared session")
-
-###############################################################################
-#                PERSISTENT USER SELECTION LOGIC (Overseerr user)
-###############################################################################
-def load_user_selections() -> dict:
-    """
-    Load a dict from user_selection.json:
-    {
-      "<telegram_telegram_user_id>": {
-        "userId": 10,
-        "userName": "Some Name"
-      },
-      ...
-    }
-    """
-    if not os.path.exists(USER_SELECTION_FILE):
-        logger.info("No user_selection.json found. Returning empty dictionary.")
-        return {}
-    try:
-        with open(USER_SELECTION_FILE, "r", encoding="utf-8") as f:
-            data = json.load(f)
-            logger.info(f"Loaded user selections from {USER_SELECTION_FILE}: {data}")
-            return data
-    except (FileNotFoundError, json.JSONDecodeError):
-        logger.warning("user_selection.json not found or invalid. Returning empty dictionary.")
-        return {}
-
-def save_user_selection(telegram_telegram_user_id: int, telegram_user_id: int, user_name: str):
-    """
-    Store the user's Overseerr selection in user_selection.json:
-    {
-      "<telegram_telegram_user_id>": {
-        "userId": 10,
-        "userName": "DisplayName"
-      }
-    }
-    """
-    data = load_user_selections()
-    data[str(telegram_telegram_user_id)] = {
-        "userId": telegram_user_id,
-        "userName": user_name
-    }
-    try:
-        with open(USER_SELECTION_FILE, "w", encoding="utf-8") as f:
-            json.dump(data, f, indent=4)
-        logger.info(f"Saved user selection for Telegram user {telegram_telegram_user_id}: (Overseerr user {telegram_user_id})")
-    except Exception as e:
-        logger.error(f"Failed to save user selection: {e}")
-
-def get_saved_user_for_telegram_id(telegram_telegram_user_id: int):
-    """
-    Return (userId, userName) or (None, None) if not found.
-    """
-    data = load_user_selections()
-    entry = data.get(str(telegram_telegram_user_id))
-    if entry:
-        logger.info(f"Found saved user for Telegram user {telegram_telegram_user_id}: {entry}")
-        return entry["userId"], entry["userName"]
-    logger.info(f"No saved user found for Telegram user {telegram_telegram_user_id}.")
-    return None, None
-
-###############################################################################
-#                      OVERSEERR API: FETCH USERS
-###############################################################################
-def get_overseerr_users():
-    """
-    Fetch all Overseerr users via /api/v1/user.
-    Returns a list of users or an empty list on error.
-    """
-    try:
-        url = f"{OVERSEERR_API_URL}/user?take=256"
-        logger.info(f"Fetching Overseerr users from: {url}")
-        response = requests.get(
-            url,
-            headers={"X-Api-Key": OVERSEERR_API_KEY},
-            timeout=10
-        )
-        response.raise_for_status()
-        data = response.json()
-        results = data.get("results", [])
-        logger.info(f"Fetched {len(results)} Overseerr users.")
-        return results
-    except requests.RequestException as e:
-        logger.error(f"Error fetching Overseerr users: {e}")
-        return []
-
-###############################################################################
-#                     OVERSEERR API: SEARCH
-###############################################################################
-def search_media(media_name: str):
-    """
-    Search for media by title in Overseerr.
-    Returns the JSON result or None on error.
-    """
-    try:
-        logger.info(f"Searching for media: {media_name}")
-        query_params = {'query': media_name}
-        encoded_query = urllib.parse.urlencode(query_params, quote_via=urllib.parse.quote)
-        url = f"{OVERSEERR_API_URL}/search?{encoded_query}"
-        response = requests.get(
-            url,
-            headers={"X-Api-Key": OVERSEERR_API_KEY},
-            timeout=10,
-        )
-        response.raise_for_status()
-        return response.json()
-    except requests.RequestException as e:
-        logger.error(f"Error during media search: {e}")
-        return None
-
-def get_tv_details(media_id: int, session_cookie: str):
-    """
-    Get tv details by id from Overseerr.
-    Returns the JSON result or None on error.
-    """
-    try:
-        logger.info(f"Get seasons detail for _id: {media_id}")
-        url = f"{OVERSEERR_API_URL}/tv/{media_id}"
-        response = requests.get(
-            url,
-            headers={"Cookie": f"connect.sid={session_cookie}"},
-            timeout=10,
-        )
-        response.raise_for_status()
-        return response.json()
-    except requests.RequestException as e:
-        logger.error(f"Error during media search: {e}")
-        return None        
-
-def process_search_results(results: list):
-    """
-    Process Overseerr search results into a simplified list of dicts.
-    Each dict contains relevant fields (title, year, mediaType, etc.).
-    """
-    processed_results = []
-    for result in results:
-        media_title = (
-            result.get("name")
-            or result.get("originalName")
-            or result.get("title")
-            or "Unknown Title"
-        )
-
-        date_key = "firstAirDate" if result["mediaType"] == "tv" else "releaseDate"
-        full_date_str = result.get(date_key, "")  # e.g. "2024-05-12"
-
-        # Extract just the year from the date (if it exists)
-        media_year = full_date_str.split("-")[0] if "-" in full_date_str else "Unknown Year"
-
-        media_info = result.get("mediaInfo", {})
-        overseerr_media_id = media_info.get("id")
-        hd_status = media_info.get("status", 1)
-        uhd_status = media_info.get("status4k", 1)
-
-        processed_results.append({
-            "title": media_title,
-            "year": media_year,
-            "id": result["id"],  # usually the TMDb ID
-            "mediaType": result["mediaType"],
-            "poster": result.get("posterPath"),
-            "description": result.get("overview", "No description available"),
-            "overseerr_id": overseerr_media_id,
-            "release_date_full": full_date_str,
-            "status_hd": hd_status,
-            "status_4k": uhd_status
-        })
-
-    logger.info(f"Processed {len(results)} search results.")
-    return processed_results
-
-def overseerr_login(email: str, password: str) -> str | None:
-    """Führt einen Login über die Overseerr-API aus und gibt den Session-Cookie zurück."""
-    url = f"{OVERSEERR_API_URL}/auth/local"
-    payload = {"email": email, "password": password}
-    try:
-        response = requests.post(
-            url,
-            headers={"Content-Type": "application/json"},
-            json=payload,
-            timeout=10
-        )
-        response.raise_for_status()
-        cookie = response.cookies.get("connect.sid")
-        logger.info(f"Login erfolgreich für {email}")
-        return cookie
-    except requests.RequestException as e:
-        logger.error(f"Login fehlgeschlagen für {email}: {e}")
-        return None
-
-def overseerr_logout(session_cookie: str) -> bool:
-    """Führt einen Logout über die Overseerr-API aus."""
-    url = f"{OVERSEERR_API_URL}/auth/logout"
-    try:
-        response = requests.post(
-            url,
-            headers={"Cookie": f"connect.sid={session_cookie}"},
-            timeout=10
-        )
-        response.raise_for_status()
-        logger.info("Logout erfolgreich")
-        return True
-    except requests.RequestException as e:
-        logger.error(f"Logout fehlgeschlagen: {e}")
-        return False
-
-def check_session_validity(session_cookie: str) -> bool:
-    """Prüft, ob der Session-Cookie gültig ist, indem eine einfache API-Anfrage gestellt wird."""
-    url = f"{OVERSEERR_API_URL}/auth/me"
-    try:
-        response = requests.get(
-            url,
-            headers={"Cookie": f"connect.sid={session_cookie}"},
-            timeout=5
-        )
-        response.raise_for_status()
-        return True
-    except requests.RequestException:
-        return False
-
-###############################################################################
-#              OVERSEERR API: REQUEST & ISSUE CREATION
-###############################################################################
-def request_media(media_id: int, media_type: str, season_index: str, requested_by: int = None, is4k: bool = False, session_cookie: str = None) -> tuple[bool, str]:
-    payload = {"mediaType": media_type, "mediaId": media_id, "is4k": is4k}
-    if requested_by is not None:  # Only in API Mode
-        payload["userId"] = requested_by
-    
-    if media_type == "tv":
-        if season_index == "all":
-            payload["seasons"] = "all"
-        else:
-            season_ar = []
-            season_ar.append(int(season_index))
-            payload["seasons"] = season_ar
-
-    headers = {"Content-Type": "application/json", "Accept": "application/json"}
-    if session_cookie:
-        headers["Cookie"] = f"connect.sid={session_cookie}"
-    elif CURRENT_MODE == BotMode.API:
-        headers["X-Api-Key"] = OVERSEERR_API_KEY
-    else:
-        return False, "No authentication provided."
-
-    try:
-        response = requests.post(f"{OVERSEERR_API_URL}/request", json=payload, headers=headers, timeout=10)
-        logger.info(f"Request response: Status {response.status_code}, Body: {response.text}")
-        if response.status_code == 201:
-            return True, "Request successful"
-        return False, f"Failed: {response.status_code} - {response.text}"
-    except requests.RequestException as e:
-        logger.error(f"Request failed: {e}")
-        return False, f"Error: {str(e)}"
-
-def create_issue(media_id: int, media_type: str, issue_description: str, issue_type: int, telegram_user_id: int = None, session_cookie: str = None) -> bool:
-    """
-    Create an issue on Overseerr via the API.
-    Uses session cookies in NORMAL or SHARED mode, or the API key in ADMIN mode.
-    
-    Args:
-        media_id (int): The Overseerr media ID.
-        media_type (str): 'movie' or 'tv'.
-        issue_description (str): Description of the issue.
-        issue_type (int): Type of issue (1=Video, 2=Audio, 3=Subtitle, 4=Other).
-        telegram_user_id (int, optional): Overseerr user ID reporting the issue.
-        session_cookie (str, optional): Session cookie for authentication in NORMAL/SHARED modes.
-    
-    Returns:
-        bool: True if the issue was created successfully, False otherwise.
-    """
-    # Prepare the payload for the API request
-    payload = {
-        "mediaId": media_id,
-        "mediaType": media_type,
-        "issueType": issue_type,
-        "message": issue_description,
-    }
-    if telegram_user_id is not None:
-        payload["userId"] = telegram_user_id
-
-    # Log the payload being sent
-    logger.info(f"Sending issue payload to Overseerr: {payload}")
-
-    # Set up headers based on the current mode
-    headers = {"Content-Type": "application/json"}
-    if session_cookie and CURRENT_MODE != BotMode.ADMIN:
-        headers["Cookie"] = f"connect.sid={session_cookie}"
-    else:
-        headers["X-Api-Key"] = OVERSEERR_API_KEY
-
-    # Send the POST request to create the issue
-    try:
-        response = requests.post(
-            f"{OVERSEERR_API_URL}/issue",
-            headers=headers,
-            json=payload,
-            timeout=10,
-        )
-        response.raise_for_status()
-        logger.info(f"Issue creation successful for mediaId {media_id}.")
-        return True
-    except requests.RequestException as e:
-        logger.error(f"Error during issue creation: {e}")
-        if e.response is not None:
-            logger.error(f"Response content: {e.response.text}")
-        return False
-
-###############################################################################
-#          get_latest_version_from_github: CHECK FOR UPDATES (OPTIONAL)
-###############################################################################
-def get_latest_version_from_github():
-    """
-    Check GitHub releases to find the latest version name (if any).
-    Returns a string like 'v2.4.0' or an empty string on error.
-    """
-    try:
-        response = requests.get(
-            "https://api.github.com/repos/LetsGoDude/OverseerrRequestViaTelegramBot/releases/latest",
-            timeout=10
-        )
-        response.raise_for_status()
-        data = response.json()
-        latest_version = data.get("tag_name", "")
-        return latest_version
-    except requests.RequestException as e:
-        logger.warning(f"Failed to check latest version on GitHub: {e}")
-        return ""
-
-###############################################################################
-#            user_data_loader: RUNS BEFORE OTHER HANDLERS (group=-999)
-###############################################################################
-async def user_data_loader(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """
-    Load user data, including session data and user selections, at the start of each update.
-    Ensures overseerr_telegram_user_id is available across restarts.
-    """
-    telegram_telegram_user_id = update.effective_user.id if update.effective_user else update.callback_query.from_user.id
-    logger.info(f"Loading user data for Telegram user {telegram_telegram_user_id} in mode {CURRENT_MODE.value}")
-
-    # Normal mode: Load session data
-    if CURRENT_MODE == BotMode.NORMAL:
-        session_data = load_user_session(telegram_telegram_user_id)
-        if session_data and "cookie" in session_data:
-            context.user_data["session_data"] = session_data
-            context.user_data["overseerr_telegram_user_id"] = session_data["overseerr_telegram_user_id"]
-            context.user_data["overseerr_user_name"] = session_data.get("overseerr_user_name", "Unknown")
-            logger.info(f"Loaded Normal mode session for user {telegram_telegram_user_id}: {session_data['overseerr_telegram_user_id']}")
-
-    # API mode: Load user selection
-    elif CURRENT_MODE == BotMode.API:
-        overseerr_telegram_user_id, overseerr_user_name = get_saved_user_for_telegram_id(telegram_telegram_user_id)
-        if overseerr_telegram_user_id:
-            context.user_data["overseerr_telegram_user_id"] = overseerr_telegram_user_id
-            context.user_data["overseerr_user_name"] = overseerr_user_name
-            logger.info(f"Loaded API mode user selection for {telegram_telegram_user_id}: {overseerr_telegram_user_id} ({overseerr_user_name})")
-
-    # Shared mode: Load shared session (global)
-    elif CURRENT_MODE == BotMode.SHARED:
-        shared_session = load_shared_session()
-        if shared_session and "cookie" in shared_session:
-            context.application.bot_data["shared_session"] = shared_session
-            context.user_data["overseerr_telegram_user_id"] = shared_session["overseerr_telegram_user_id"]
-            context.user_data["overseerr_user_name"] = shared_session.get("overseerr_user_name", "Shared User")
-            logger.info(f"Loaded Shared mode session for user {telegram_telegram_user_id}: {shared_session['overseerr_telegram_user_id']}")
-
-def get_global_telegram_notifications():
-    """
-    Retrieves the current global Telegram notification settings from Overseerr.
-    Returns a dictionary with the settings or None on error.
-    """
-    try:
-        url = f"{OVERSEERR_API_URL}/settings/notifications/telegram"
-        headers = {
-            "X-Api-Key": OVERSEERR_API_KEY
-        }
-        response = requests.get(url, headers=headers, timeout=10)
-        response.raise_for_status()
-        settings = response.json()
-        logger.info(f"Current Global Telegram notification settings: {settings}")
-        return settings
-    except requests.RequestException as e:
-        logger.error(f"Error when retrieving Telegram notification settings: {e}")
-        return None
-
-async def set_global_telegram_notifications(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """
-    Activates the global Telegram notifications in Overseerr.
-    Returns True if successful, otherwise False.
-    """
-
-    bot_info = await context.bot.get_me()
-    chat_id = str(update.effective_chat.id)
-
-    payload = {
-        "enabled": True,
-        "types": 1,  # Disable all notification types (except silent)
-        "options": {
-            "botUsername": bot_info.username,  # Botname
-            "botAPI": TELEGRAM_TOKEN,          # Telegram Token
-            "chatId": chat_id,                 # Chat-ID - i guess the admin will use the bot first?
-            "sendSilently": True
-        }
-    }
-    try:
-        url = f"{OVERSEERR_API_URL}/settings/notifications/telegram"
-        headers = {
-            "Content-Type": "application/json",
-            "X-Api-Key": OVERSEERR_API_KEY
-        }
-        response = requests.post(url, headers=headers, json=payload, timeout=10)
-        response.raise_for_status()
-        logger.info("Global Telegram notifications have been successfully activated.")
-        return True
-    except requests.RequestException as e:
-        logger.error(f"Error when activating global Telegram notifications: {e}")
-        if e.response is not None:
-            logger.error(f"Response content: {e.response.text}")
-        return False
-
-GLOBAL_TELEGRAM_NOTIFICATION_STATUS = get_global_telegram_notifications()
-
-async def enable_global_telegram_notifications(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """
-    Activates global Telegram notifications
-    """
-    if GLOBAL_TELEGRAM_NOTIFICATION_STATUS:
-        enabled = GLOBAL_TELEGRAM_NOTIFICATION_STATUS.get("enabled", False)
-        if enabled:
-
-            logger.info("Global Telegram notifications are activated.")
-        else:
-            logger.info("Activate global Telegram notifications...")
-            await set_global_telegram_notifications(update, context)
-    else:
-        logger.error("Could not retrieve Global Telegram notification settings.")
-
-async def start_login(update_or_query: Update | CallbackQuery, context: ContextTypes.DEFAULT_TYPE):
-    """Initiates login, deleting the settings menu and cleaning up prompts."""
-    if isinstance(update_or_query, Update):
-        telegram_user_id = update_or_query.effective_user.id
-        message = update_or_query.message
-    else:  # CallbackQuery
-        telegram_user_id = update_or_query.from_user.id
-        message = update_or_query.message
-
-    logger.info(f"User {telegram_user_id} started login process.")
-
-    # Check mode restrictions
-    if CURRENT_MODE == BotMode.API:
-        await message.reply_text("In API Mode, no login is required.")
-        return
-
-    if CURRENT_MODE == BotMode.SHARED:
-        config = load_config()
-        user_id_str = str(telegram_user_id)
-        user = config["users"].get(user_id_str, {})
-        if not user.get("is_admin", False):
-            await message.reply_text("In Shared Mode, only admins can log in.")
-            return
-
-    # Delete the settings menu if this is a callback query
-    if isinstance(update_or_query, CallbackQuery):
-        try:
-            await message.delete()
-            logger.info(f"Deleted settings menu message for user {telegram_user_id} during login.")
-        except Exception as e:
-            logger.warning(f"Failed to delete settings menu message: {e}")
-
-    # Set login state and prompt for email
-    context.user_data["login_step"] = "email"
-    msg = await context.bot.send_message(
-        chat_id=message.chat_id,
-        text="Please enter your Overseerr email address:"
-    )
-    context.user_data["login_message_id"] = msg.message_id
-
-async def handle_text_input(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """
-    Handles text input from users, including password authentication and issue reporting.
-    """
-    telegram_user_id = update.effective_user.id
-    chat_id = update.effective_chat.id
-    message_thread_id = getattr(update.message, "message_thread_id", None)
-    text = update.message.text
-    logger.info(f"Text input from {telegram_user_id}: {text}, awaiting_password: {context.user_data.get('awaiting_password')}, chat {chat_id}, thread {message_thread_id}")
-
-    config = load_config()
-    user_id_str = str(telegram_user_id)
-    user = config["users"].get(user_id_str, {})
-
-    # Update username if necessary
-    if not user or user.get("username") != (update.effective_user.username or update.effective_user.full_name):
-        config["users"][user_id_str] = {
-            "username": update.effective_user.username or update.effective_user.full_name,
-            "is_authorized": user.get("is_authorized", False),
-            "is_blocked": user.get("is_blocked", False),
-            "is_admin": user.get("is_admin", False),
-            "created_at": user.get("created_at", datetime.now(timezone.utc).isoformat() + "Z")
-        }
-        save_config(config)
-
-    # Handle issue reporting
-    if 'reporting_issue' in context.user_data:
-        issue_description = text
-        reporting_issue = context.user_data['reporting_issue']
-        issue_type_id = reporting_issue['issue_type']
-        issue_type_name = reporting_issue['issue_type_name']
-
-        selected_result = context.user_data.get('selected_result')
-        if not selected_result:
-            logger.error("No selected_result found while reporting an issue.")
-            await update.message.reply_text(
-                "An error occurred. Please try reporting the issue again.",
-                parse_mode="Markdown",
-            )
-            return
-
-        media_id = selected_result.get('overseerr_id')
-        media_title = selected_result['title']
-        media_type = selected_result['mediaType']
-
-        telegram_user_id_for_issue = context.user_data.get("overseerr_telegram_user_id")
-        user_display_name = context.user_data.get("overseerr_user_name", "Unknown User")
-        logger.info(
-            f"User {telegram_user_id} is reporting an issue on mediaId {media_id} "
-            f"as Overseerr user {telegram_user_id_for_issue}."
-        )
-
-        final_issue_description = f"(Reported by {user_display_name})\n\n{issue_description}"
-
-        success = create_issue(
-            media_id=media_id,
-            media_type=media_type,
-            issue_description=final_issue_description,
-            issue_type=issue_type_id,
-            telegram_user_id=telegram_user_id_for_issue
-        )
-
-        if success:
-            await update.message.reply_text(
-                f"✅ Thank you! Your issue with *{media_title}* has been successfully reported.",
-                parse_mode="Markdown",
-            )
-        else:
-            await update.message.reply_text(
-                f"❌ Failed to report the issue with *{media_title}*. Please try again later.",
-                parse_mode="Markdown",
-            )
-
-        # Cleanup
-        context.user_data.pop('reporting_issue', None)
-        media_message_id = context.user_data.get('media_message_id')
-        if media_message_id:
-            try:
-                await context.bot.delete_message(
-                    chat_id=update.message.chat_id,
-                    message_id=media_message_id
-                )
-                logger.info(f"Deleted media message {media_message_id} after issue reporting.")
-            except Exception as e:
-                logger.warning(f"Failed to delete media message {media_message_id}: {e}")
-            context.user_data.pop('media_message_id', None)
-
-        context.user_data.pop('selected_result', None)
-        return
-
-    # Handle password authentication
-    if context.user_data.get("awaiting_password"):
-        logger.info(f"Comparing input '{text}' with PASSWORD '{PASSWORD}'")
-        if text == PASSWORD:
-            is_admin = user.get("is_admin", False)
-            if not user.get("is_authorized", False):
-                config["users"][user_id_str] = {
-                    "username": update.effective_user.username or update.effective_user.full_name,
-                    "is_authorized": True,
-                    "is_blocked": False,
-                    "is_admin": is_admin,
-                    "created_at": datetime.now(timezone.utc).isoformat() + "Z"
-                }
-                save_config(config)
-                logger.info(f"User {telegram_user_id} added to users with authorized status")
-            context.user_data.pop("awaiting_password")
-            await send_message(context, chat_id, "✅ *Access granted!* Let’s get started...", message_thread_id=message_thread_id)
-            await context.bot.delete_message(chat_id=chat_id, message_id=update.message.message_id)
-            await start_command(update, context)
-            if not is_admin and CURRENT_MODE == BotMode.API:
-                await handle_change_user(update, context, is_initial=True)
-        else:
-            await send_message(context, chat_id, "❌ *Oops!* That’s not the right password. Try again:", message_thread_id=message_thread_id)
-            await context.bot.delete_message(chat_id=chat_id, message_id=update.message.message_id)
-        return
-
-    # Ignore non-command text input if Group Mode restricts this chat/thread
-    if not is_command_allowed(chat_id, message_thread_id, config, telegram_user_id):
-        logger.info(f"Ignoring text input in chat {chat_id}, thread {message_thread_id}: Group Mode restricts to primary")
-        return
-
-    # Handle Overseerr login
-    if "login_step" in context.user_data:
-        # Delete previous prompt and user input
-        if "login_message_id" in context.user_data:
-            try:
-                await context.bot.delete_message(chat_id, context.user_data["login_message_id"])
-            except Exception as e:
-                logger.warning(f"Failed to delete login prompt message: {e}")
-        try:
-            await context.bot.delete_message(chat_id, update.message.message_id)
-        except Exception as e:
-            logger.warning(f"Failed to delete user input message: {e}")
-
-        is_admin = user.get("is_admin", False)
-
-        if context.user_data["login_step"] == "email":
-            context.user_data["login_email"] = text
-            context.user_data["login_step"] = "password"
-            msg = await context.bot.send_message(chat_id, "Please enter your Overseerr password:")
-            context.user_data["login_message_id"] = msg.message_id
-        elif context.user_data["login_step"] == "password":
-            email = context.user_data["login_email"]
-            password = text
-            session_cookie = overseerr_login(email, password)
-            if session_cookie:
-                credentials = base64.b64encode(f"{email}:{password}".encode()).decode()
-                response = requests.get(
-                    f"{OVERSEERR_API_URL}/auth/me",
-                    headers={"Cookie": f"connect.sid={session_cookie}"}
-                )
-                user_info = response.json()
-                overseerr_id = user_info.get("id")
-                if not overseerr_id:
-                    await context.bot.send_message(chat_id, "❌ Login failed: Invalid user data.")
-                    await show_settings_menu(update, context, is_admin=is_admin)
-                    return
-                
-                session_data = {
-                    "cookie": session_cookie,
-                    "credentials": credentials,
-                    "overseerr_telegram_user_id": overseerr_id,
-                    "overseerr_user_name": user_info.get("displayName", "Unknown")
-                }
-                context.user_data["session_data"] = session_data
-                
-                if CURRENT_MODE == BotMode.NORMAL:
-                    sessions = load_user_sessions()
-                    sessions[str(telegram_user_id)] = session_data
-                    save_user_sessions(sessions)
-                elif CURRENT_MODE == BotMode.SHARED and is_admin:
-                    save_shared_session(session_data)
-                    context.application.bot_data["shared_session"] = session_data
-                
-                await context.bot.send_message(
-                    chat_id,
-                    f"✅ Logged in as {user_info.get('displayName', 'Unknown')}!"
-                )
-            else:
-                await context.bot.send_message(chat_id, "❌ Login failed. Check your credentials.")
-            
-            context.user_data.pop("login_step", None)
-            context.user_data.pop("login_email", None)
-            context.user_data.pop("login_message_id", None)
-            await show_settings_menu(update, context, is_admin=is_admin)
-        return
-
-    # Fallback für nicht erkannte Eingaben
-    logger.info(f"User {telegram_user_id} typed something unrecognized: {text}")
-    await update.message.reply_text(
-        "I didn't understand that. Please use /start to see the available commands."
-    )
-
-async def show_user_management_menu(update_or_query, context: ContextTypes.DEFAULT_TYPE, offset=0):
-    """
-    Displays the user management menu with pagination within the settings menu, including an option to create a new user.
-    """
-    config = load_config()
-    if isinstance(update_or_query, Update):
-        telegram_user_id = update_or_query.effective_user.id
-        chat_id = update_or_query.effective_chat.id
-        message_thread_id = getattr(update_or_query.message, "message_thread_id", None)
-    else:
-        telegram_user_id = update_or_query.from_user.id
-        chat_id = update_or_query.message.chat_id
-        message_thread_id = getattr(update_or_query.message, "message_thread_id", None)
-
-    user_id_str = str(telegram_user_id)
-    if not config["users"].get(user_id_str, {}).get("is_admin", False):
-        await send_message(context, chat_id, "❌ Only admins can manage users.", message_thread_id=message_thread_id)
-        return
-
-    users = [
-        {
-            "telegram_id": uid,
-            "username": details.get("username", "Unknown"),
-            "is_admin": details.get("is_admin", False),
-            "is_blocked": details.get("is_blocked", False)
-        }
-        for uid, details in config["users"].items()
-    ]
-
-    if not users:
-        text = "👥 *User Management*\n\nNo users found."
-        keyboard = [
-            [InlineKeyboardButton("➕ Create new Overseerr User", callback_data="create_user")],
-            [InlineKeyboardButton("⬅️ Back to Settings", callback_data="back_to_settings")]
-        ]
-        reply_markup = InlineKeyboardMarkup(keyboard)
-        if isinstance(update_or_query, Update):
-            await send_message(context, chat_id, text, reply_markup=reply_markup, message_thread_id=message_thread_id)
-        else:
-            await update_or_query.edit_message_text(text, parse_mode="Markdown", reply_markup=reply_markup)
-        return
-
-    page_size = 5
-    total_users = len(users)
-    current_users = users[offset:offset + page_size]
-
-    text = "👥 *User Management*\n\nSelect a user to manage:\n"
-    keyboard = []
-    for user in current_users:
-        status = "🚫 Blocked" if user["is_blocked"] else "👑 Admin" if user["is_admin"] else "✅ User"
-        button_text = f"{user['username']} (ID: {user['telegram_id']}) - {status}"
-        keyboard.append([InlineKeyboardButton(button_text, callback_data=f"manage_user_{user['telegram_id']}")])
-
-    keyboard.append([InlineKeyboardButton("➕ Create new Overseerr User", callback_data="create_user")])
-
-    navigation_buttons = []
-    if offset > 0:
-        navigation_buttons.append(InlineKeyboardButton("⬅️ Back", callback_data=f"users_page_{offset - page_size}"))
-    if offset + page_size < total_users:
-        navigation_buttons.append(InlineKeyboardButton("➡️ More", callback_data=f"users_page_{offset + page_size}"))
-    navigation_buttons.append(InlineKeyboardButton("⬅️ Back to Settings", callback_data="back_to_settings"))
-    keyboard.append(navigation_buttons)
-
-    reply_markup = InlineKeyboardMarkup(keyboard)
-
-    if isinstance(update_or_query, Update):
-        await send_message(context, chat_id, text, reply_markup=reply_markup, message_thread_id=message_thread_id)
-    else:
-        await update_or_query.edit_message_text(text, parse_mode="Markdown", reply_markup=reply_markup)
-
-async def manage_specific_user(query: CallbackQuery, context: ContextTypes.DEFAULT_TYPE, telegram_id: str):
-    """
-    Manages a specific user (block, unblock, promote, demote).
-    """
-    config = load_config()
-    telegram_user_id = query.from_user.id
-    chat_id = query.message.chat_id
-    message_thread_id = getattr(query.message, "message_thread_id", None)
-
-    user_id_str = str(telegram_user_id)
-    if not config["users"].get(user_id_str, {}).get("is_admin", False):
-        await query.edit_message_text("❌ Only admins can manage users.")
-        return
-
-    user = config["users"].get(telegram_id, {})
-    username = user.get("username", "Unknown")
-    is_admin = user.get("is_admin", False)
-    is_blocked = user.get("is_blocked", False)
-
-    text = (
-        f"👤 *Manage User: {username}*\n"
-        f"🆔 ID: {telegram_id}\n"
-        f"🔖 Status: {'Blocked' if is_blocked else 'Admin' if is_admin else 'User'}\n\n"
-        "Choose an action:"
-    )
-
-    keyboard = []
-    if is_blocked:
-        keyboard.append([InlineKeyboardButton("✅ Unblock User", callback_data=f"unblock_user_{telegram_id}")])
-    else:
-        keyboard.append([InlineKeyboardButton("🚫 Block User", callback_data=f"block_user_{telegram_id}")])
-    if is_admin and telegram_id != user_id_str:
-        keyboard.append([InlineKeyboardButton("👇 Demote to User", callback_data=f"demote_user_{telegram_id}")])
-    elif not is_admin and not is_blocked:
-        keyboard.append([InlineKeyboardButton("👑 Promote to Admin", callback_data=f"promote_user_{telegram_id}")])
-    keyboard.append([InlineKeyboardButton("⬅️ Back to User List", callback_data="manage_users")])
-
-    reply_markup = InlineKeyboardMarkup(keyboard)
-    await query.edit_message_text(text, parse_mode="Markdown", reply_markup=reply_markup)
-
-###############################################################################
-#                           BOT COMMAND HANDLERS
-###############################################################################
-async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """
-    /start command. Shows a welcome message and sets the primary chat/thread if Group Mode is enabled.
-    """
-    telegram_user_id = update.effective_user.id
-    chat_id = update.effective_chat.id
-    message_thread_id = getattr(update.message, "message_thread_id", None)
-    logger.info(f"User {telegram_user_id} executed /start in chat {chat_id}, thread {message_thread_id}")
-
-    config = load_config()
-
-    # Check if command is allowed
-    if not is_command_allowed(chat_id, message_thread_id, config, telegram_user_id):
-        return
-
-    # Handle unauthorized users
-    if PASSWORD and not user_is_authorized(telegram_user_id):
-        logger.info(f"User {telegram_user_id} is not authorized. Requesting password.")
-        await send_message(
-            context,
-            chat_id,
-            "👋 *Welcome!* Please enter the bot’s password to get started:",
-            message_thread_id=message_thread_id
-        )
-        context.user_data["awaiting_password"] = True
-        logger.info(f"Set awaiting_password=True for user {telegram_user_id}")
-        return
-
-    # Set primary_chat_id only if Group Mode is enabled
-    if config["group_mode"]:
-        config["primary_chat_id"] = {
-            "chat_id": chat_id,
-            "message_thread_id": message_thread_id
-        }
-        save_config(config)
-        logger.info(f"Set primary_chat_id to chat {chat_id}, thread {message_thread_id} in {CONFIG_FILE}")
-
-    # Set first user as admin if no admin exists
-    user_id_str = str(telegram_user_id)
-    if not any(user.get("is_admin", False) for user in config["users"].values()):
-        config["users"][user_id_str] = {
-            "username": update.effective_user.username or update.effective_user.full_name,
-            "is_authorized": True,
-            "is_blocked": False,
-            "is_admin": True,
-            "created_at": datetime.now(timezone.utc).isoformat() + "Z"
-        }
-        save_config(config)
-        logger.info(f"Set user {telegram_user_id} as admin")
-
-    await enable_global_telegram_notifications(update, context)
-
-    # Version check
-    latest_version = get_latest_version_from_github()
-    newer_version_text = ""
-    if latest_version:
-        latest_stripped = latest_version.strip().lstrip("v")
-        if latest_stripped > VERSION:
-            newer_version_text = f"\n🔔 A new version ({latest_version}) is available!"
-        else:
-            logger.info(f"Current version {VERSION} is up to date or newer than {latest_version}")
-
-    # Base welcome message
-    start_message = (
-        f"👋 *Welcome to the Overseerr Telegram Bot!* v{VERSION}"
-        f"{newer_version_text}"
-        "\n\n🎬 *What I can do:*\n"
-        " - 🔍 Search movies & TV shows\n"
-        " - 📊 Check availability\n"
-        " - 🎫 Request new titles\n"
-        " - 🛠 Report issues\n\n"
-        "💡 *How to start:* Type `/check <title>`\n"
-        "_Example: `/check Venom`_\n\n"
-        "You can also configure your preferences with [/settings]."
-    )
-
-    # Add login prompt only for non-admins in Normal mode
-    reply_markup = None
-    user = config["users"].get(user_id_str, {})
-    is_admin = user.get("is_admin", False)
-    if CURRENT_MODE == BotMode.NORMAL and not is_admin and "session_data" not in context.user_data:
-        start_message += (
-            "\n\n🔑 *Login Required*\n"
-            "Please log in with your Overseerr credentials to start requesting media."
-        )
-        keyboard = [[InlineKeyboardButton("🔑 Login", callback_data="login")]]
-        reply_markup = InlineKeyboardMarkup(keyboard)
-
-    await send_message(context, chat_id, start_message, reply_markup=reply_markup, message_thread_id=message_thread_id)
-
-########################################################################
-#                 UNIFIED SETTINGS MENU FUNCTION
-########################################################################
-async def show_settings_menu(update_or_query, context: ContextTypes.DEFAULT_TYPE, is_admin=False):
-    """
-    Displays the settings menu tailored for users or admins with conditional buttons.
-    In Shared mode, only the admin can access settings. Manage Notifications button is only shown if an Overseerr user is selected.
-    """
-    if isinstance(update_or_query, Update):
-        telegram_user_id = update_or_query.effective_user.id
-        chat_id = update_or_query.effective_chat.id
-        message_thread_id = getattr(update_or_query.message, "message_thread_id", None)
-    elif isinstance(update_or_query, CallbackQuery):
-        telegram_user_id = update_or_query.from_user.id
-        chat_id = update_or_query.message.chat_id
-        message_thread_id = getattr(update_or_query.message, "message_thread_id", None)
-    else:
-        logger.error("Invalid argument type passed to show_settings_menu")
-        return
-
-    config = load_config()
-
-    # Check if command/query is allowed
-    if not is_command_allowed(chat_id, message_thread_id, config, telegram_user_id):
-        return
-
-    user_id_str = str(telegram_user_id)
-    user = config["users"].get(user_id_str, {})
-    is_admin = user.get("is_admin", False)
-
-    # In Shared mode, only the admin can access settings
-    if CURRENT_MODE == BotMode.SHARED and not is_admin:
-        logger.info(f"Non-admin {telegram_user_id} attempted to access settings in Shared mode; ignoring.")
-        return
-
-    # Restrict access if unauthorized
-    if PASSWORD and not user_is_authorized(telegram_user_id):
-        await send_message(
-            context,
-            chat_id,
-            "🔒 *Access Denied*\nPlease enter the bot’s password via /start to access settings.",
-            message_thread_id=message_thread_id
-        )
-        return
-
-    # Refresh user data based on CURRENT_MODE
-    context.user_data.pop("overseerr_telegram_user_id", None)
-    context.user_data.pop("overseerr_user_name", None)
-    context.user_data.pop("session_data", None)
-
-    if CURRENT_MODE == BotMode.NORMAL:
-        session_data = load_user_session(telegram_user_id)
-        if session_data and "cookie" in session_data:
-            context.user_data["session_data"] = session_data
-            context.user_data["overseerr_telegram_user_id"] = session_data["overseerr_telegram_user_id"]
-            context.user_data["overseerr_user_name"] = session_data.get("overseerr_user_name", "Unknown")
-            logger.info(f"Loaded Normal mode session for user {telegram_user_id}: {session_data['overseerr_telegram_user_id']}")
-    elif CURRENT_MODE == BotMode.API:
-        overseerr_telegram_user_id, overseerr_user_name = get_saved_user_for_telegram_id(telegram_user_id)
-        if overseerr_telegram_user_id:
-            context.user_data["overseerr_telegram_user_id"] = overseerr_telegram_user_id
-            context.user_data["overseerr_user_name"] = overseerr_user_name
-            logger.info(f"Loaded API mode user selection for {telegram_user_id}: {overseerr_telegram_user_id} ({overseerr_user_name})")
-    elif CURRENT_MODE == BotMode.SHARED:
-        shared_session = load_shared_session()
-        if shared_session and "cookie" in shared_session:
-            context.application.bot_data["shared_session"] = shared_session
-            context.user_data["overseerr_telegram_user_id"] = shared_session["overseerr_telegram_user_id"]
-            context.user_data["overseerr_user_name"] = shared_session.get("overseerr_user_name", "Shared User")
-            logger.info(f"Loaded Shared mode session for user {telegram_user_id}: {shared_session['overseerr_telegram_user_id']}")
-
-    # Get current Overseerr user info (if any)
-    overseerr_user_name = context.user_data.get("overseerr_user_name", "None selected")
-    overseerr_telegram_user_id = context.user_data.get("overseerr_telegram_user_id", "N/A")
-    user_info = f"{overseerr_user_name} ({overseerr_telegram_user_id}) ✅" if overseerr_telegram_user_id != "N/A" else "Not set ❌"
-
-    group_mode_status = "🟢 On" if config["group_mode"] else "🔴 Off"
-
-    if is_admin:
-        mode_symbols = {
-            BotMode.NORMAL: "🌟",
-            BotMode.API: "🔑",
-            BotMode.SHARED: "👥"
-        }
-        mode_symbol = mode_symbols.get(CURRENT_MODE, "❓")
-        text = (
-            "⚙️ *Admin Settings*\n\n"
-            f"🤖 *Bot Mode:* {mode_symbol} *{CURRENT_MODE.value.capitalize()}*\n"
-            f"👤 *Current User:* {user_info}\n"
-            f"👥 *Group Mode:* {group_mode_status}\n\n"
-            "Select an option below to manage your settings:\n"
-        )
-    else:
-        text = (
-            "⚙️ *Settings - Current User:*\n\n"
-            f"👤 {user_info}\n\n"
-            "Select an option below to manage your settings:\n"
-        )
-
-    keyboard = []
-    account_buttons = []
-    if CURRENT_MODE == BotMode.API:
-        account_buttons.append(InlineKeyboardButton("🔄 Change User", callback_data="change_user"))
-    elif CURRENT_MODE == BotMode.NORMAL:
-        if context.user_data.get("session_data"):
-            account_buttons.append(InlineKeyboardButton("🔓 Logout", callback_data="logout"))
-        else:
-            account_buttons.append(InlineKeyboardButton("🔑 Login", callback_data="login"))
-    elif CURRENT_MODE == BotMode.SHARED and is_admin:
-        if context.application.bot_data.get("shared_session"):
-            account_buttons.append(InlineKeyboardButton("🔓 Logout", callback_data="logout"))
-        else:
-            account_buttons.append(InlineKeyboardButton("🔑 Login", callback_data="login"))
-    if account_buttons:
-        keyboard.append(account_buttons)
-
-    if is_admin:
-        keyboard.extend([
-            [InlineKeyboardButton("🔧 Change Mode", callback_data="mode_select")],
-            [InlineKeyboardButton(f"👥 Group Mode: {group_mode_status}", callback_data="toggle_group_mode")],
-            [InlineKeyboardButton("👤 Manage Users", callback_data="manage_users")]
-        ])
-    
-    # Show Manage Notifications only if an Overseerr user is selected
-    if overseerr_telegram_user_id != "N/A":
-        keyboard.append([InlineKeyboardButton("🔔 Manage Notifications", callback_data="manage_notifications")])
-
-    keyboard.append([InlineKeyboardButton("❌ Cancel", callback_data="cancel_settings")])
-    reply_markup = InlineKeyboardMarkup(keyboard)
-
-    if isinstance(update_or_query, Update):
-        await send_message(context, chat_id, text, reply_markup=reply_markup, message_thread_id=message_thread_id)
-    else:
-        await update_or_query.edit_message_text(text, parse_mode="Markdown", reply_markup=reply_markup)
-    
-########################################################################
-#                    /settings COMMAND
-########################################################################
-async def show_manage_notifications_menu(update_or_query, context: ContextTypes.DEFAULT_TYPE):
-    """
-    Displays a menu letting the user toggle:
-      - Telegram notifications on/off (interpreted from notificationTypes.telegram)
-      - Silent mode on/off (from telegramSendSilently)
-    for their selected Overseerr user, using partial updates.
-    """
-    # Check if it's a callback or normal command
-    if isinstance(update_or_query, Update) and update_or_query.message:
-        query = None
-        telegram_user_id = update_or_query.effective_user.id
-        chat_id = update_or_query.effective_chat.id
-    elif isinstance(update_or_query, CallbackQuery):
-        query = update_or_query
-        telegram_user_id = query.from_user.id
-        chat_id = query.message.chat_id
-    else:
-        return
-
-    # Which Overseerr user is selected?
-    overseerr_telegram_user_id = context.user_data.get("overseerr_telegram_user_id")
-    overseerr_user_name = context.user_data.get("overseerr_user_name", "Unknown User")
-
-    if not overseerr_telegram_user_id:
-        msg = "No Overseerr user selected. Use /settings to pick a user first."
-        if query:
-            await query.edit_message_text(msg)
-        else:
-            await update_or_query.message.reply_text(msg)
-        return
-
-    # Fetch from Overseerr to show real-time status
-    current_settings = get_user_notification_settings(overseerr_telegram_user_id)
-    if not current_settings:
-        error_text = f"Failed to retrieve notification settings for Overseerr user {overseerr_telegram_user_id}."
-        if query:
-            await query.edit_message_text(error_text)
-        else:
-            await update_or_query.message.reply_text(error_text)
-        return
-
-    # Extract relevant fields
-    # If notificationTypes or telegram is missing, default to 0
-    notification_types = current_settings.get("notificationTypes", {})
-    telegram_bitmask = notification_types.get("telegram", 0)
-    telegram_silent = current_settings.get("telegramSendSilently", False)
-
-    # We interpret telegram_bitmask > 0 to mean "enabled"
-    telegram_is_enabled = (telegram_bitmask != 0)
-
-    # Build the display text
-    heading_text = (
-        "🔔 *Notification Settings*\n"
-        "Manage how Overseerr sends you updates via Telegram.\n\n"
-        f"👤 *User Information:*\n"
-        f"   - Name: *{overseerr_user_name}* (ID: `{overseerr_telegram_user_id}`)\n\n"
-        "⚙️ *Current Telegram Settings:*\n"
-        f"   - Notifications: {'*Enabled* ✅' if telegram_is_enabled else '*Disabled* ❌'}\n"
-        f"   - Silent Mode: {'*On* 🤫' if telegram_silent else '*Off* 🔊'}\n\n"
-        "🔄 *Actions:*\n"
-        "Use the buttons below to toggle notifications or silent mode. "
-        "Your preferences will be updated immediately."
-    )
-
-    # Build inline keyboard
-    # "Disable notifications" if currently enabled, or "Enable notifications" if it's disabled
-    toggle_telegram_label = "Disable notifications" if telegram_is_enabled else "Enable notifications"
-    toggle_silent_label = "Turn Silent Off" if telegram_silent else "Turn Silent On"
-
-    keyboard = [
-        [
-            InlineKeyboardButton(toggle_telegram_label, callback_data="toggle_user_notifications")
-        ],
-        [
-            InlineKeyboardButton(toggle_silent_label, callback_data="toggle_user_silent")
-        ],
-        [
-            InlineKeyboardButton("⬅️ Back to Settings", callback_data="back_to_settings")
-        ]
-    ]
-    reply_markup = InlineKeyboardMarkup(keyboard)
-
-    # Edit or send message
-    if query:
-        await query.edit_message_text(
-            text=heading_text,
-            parse_mode="Markdown",
-            reply_markup=reply_markup
-        )
-    else:
-        await update_or_query.message.reply_text(
-            text=heading_text,
-            parse_mode="Markdown",
-            reply_markup=reply_markup
-        )
-
-def get_user_notification_settings(overseerr_telegram_user_id: int) -> dict:
-    """
-    (Optional) Fetch the user's notification settings from Overseerr:
-    GET /api/v1/user/<OverseerrUserID>/settings/notifications
-    Returns a dict or an empty dict on error.
-    """
-    try:
-        url = f"{OVERSEERR_API_URL}/user/{overseerr_telegram_user_id}/settings/notifications"
-        headers = {
-            "X-Api-Key": OVERSEERR_API_KEY,
-            "Content-Type": "application/json"
-        }
-        resp = requests.get(url, headers=headers, timeout=10)
-        resp.raise_for_status()
-        data = resp.json()
-        logger.info(f"Fetched notification settings for Overseerr user {overseerr_telegram_user_id}: {data}")
-        return data
-    except requests.RequestException as e:
-        logger.error(f"Failed to fetch settings for user {overseerr_telegram_user_id}: {e}")
-        return {}
-
-def update_telegram_settings_for_user(
-    overseerr_telegram_user_id: int,
-    telegram_bitmask: int,       # either 3657 or 0
-    chat_id: str,
-    send_silently: bool
-) -> bool:
-    """
-    Sends a partial update to /user/<OverseerrUserID>/settings/notifications.
-    - telegram_bitmask=3657: enable all telegram notifications
-    - telegram_bitmask=0: disable all telegram notifications
-    - We set telegramEnabled=true because Overseerr apparently keeps it that way.
-    - telegramChatId is necessary so Overseerr knows which chat to use.
-    """
-    payload = {
-        "notificationTypes": {
-            "telegram": telegram_bitmask
-        },
-        "telegramEnabled": True,         # Always true in Overseerr DB
-        "telegramChatId": chat_id,       # Must provide the chat ID
-        "telegramSendSilently": send_silently
-    }
-
-    url = f"{OVERSEERR_API_URL}/user/{overseerr_telegram_user_id}/settings/notifications"
-    headers = {
-        "X-Api-Key": OVERSEERR_API_KEY,
-        "Content-Type": "application/json"
-    }
-    logger.info(f"Updating user {overseerr_telegram_user_id} with payload: {payload}")
-
-    try:
-        resp = requests.post(url, headers=headers, json=payload, timeout=10)
-        resp.raise_for_status()
-        logger.info(f"Successfully updated telegram bitmask for user {overseerr_telegram_user_id}.")
-        return True
-    except requests.RequestException as e:
-        logger.error(f"Failed to update telegram bitmask for user {overseerr_telegram_user_id}: {e}")
-        if e.response is not None:
-            logger.error(f"Response content: {e.response.text}")
-        return False
-
-async def toggle_user_notifications(query: CallbackQuery, context: ContextTypes.DEFAULT_TYPE):
-    """
-    If the user currently has 0 => switch to 3657.
-    If the user currently has 3657 => switch to 0.
-    """
-    overseerr_telegram_user_id = context.user_data.get("overseerr_telegram_user_id")
-    if not overseerr_telegram_user_id:
-        await query.edit_message_text("No Overseerr user selected.")
-        return
-
-    # GET the current settings to see if it's 0 or not
-    settings = get_user_notification_settings(overseerr_telegram_user_id)
-    if not settings:
-        await query.edit_message_text(f"Failed to get settings for user {overseerr_telegram_user_id}.")
-        return
-    
-    # If "notificationTypes" or "notificationTypes.telegram" is missing, default to 0
-    notif_types = settings.get("notificationTypes", {})
-    current_value = notif_types.get("telegram", 0)
-
-    # Flip between 0 and 3657
-    new_value = 3657 if current_value == 0 else 0
-
-    telegram_silent = settings.get("telegramSendSilently", False)
-    chat_id = str(query.message.chat_id)
-
-    success = update_telegram_settings_for_user(
-        overseerr_telegram_user_id=overseerr_telegram_user_id,
-        telegram_bitmask=new_value,
-        chat_id=chat_id,
-        send_silently=telegram_silent
-    )
-
-    if not success:
-        await query.edit_message_text("❌ Failed to update Telegram bitmask in Overseerr.")
-        return
-
-    # Optionally re-fetch or trust your new data
-    await show_manage_notifications_menu(query, context)
-
-async def toggle_user_silent(query: CallbackQuery, context: ContextTypes.DEFAULT_TYPE):
-    """
-    Toggles the 'telegramSendSilently' flag for the currently selected Overseerr user.
-    This only changes whether notifications (if enabled) are sent silently or not.
-    If notifications are disabled (bitmask=0), silent mode won't matter in practice,
-    but we still update the 'telegramSendSilently' field in Overseerr.
-    """
-    telegram_user_id = query.from_user.id
-
-    overseerr_telegram_user_id = context.user_data.get("overseerr_telegram_user_id")
-    if not overseerr_telegram_user_id:
-        await query.edit_message_text("No Overseerr user selected.")
-        return
-
-    current_settings = get_user_notification_settings(overseerr_telegram_user_id)
-    if not current_settings:
-        await query.edit_message_text(
-            f"Failed to fetch notification settings for user {overseerr_telegram_user_id}."
-        )
-        return
-
-    # Instead of relying on telegramEnabled (which Overseerr keeps 'true'),
-    # we read the actual bitmask from notificationTypes['telegram'].
-    notification_types = current_settings.get("notificationTypes", {})
-    current_bitmask = notification_types.get("telegram", 0)
-
-    # Flip the silent mode
-    current_silent = current_settings.get("telegramSendSilently", False)
-    new_silent = not current_silent
-
-    # If current_bitmask == 0, the user effectively has Telegram disabled.
-    # Toggling silent won't enable them, but we can still store the preference.
-    chat_id = str(query.message.chat_id)
-
-    success = update_telegram_settings_for_user(
-        overseerr_telegram_user_id=overseerr_telegram_user_id,
-        telegram_bitmask=current_bitmask,  # keep the same bitmask (0 = off, 3657 = on, etc.)
-        chat_id=chat_id,
-        send_silently=new_silent
-    )
-
-    if not success:
-        await query.edit_message_text("❌ Failed to update silent mode in Overseerr.")
-        return
-
-    # Refresh the menu to display the new silent mode
-    await show_manage_notifications_menu(query, context)
-
-########################################################################
-#                    /check COMMAND
-########################################################################
-async def check_media(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """
-    Handles /check command to search for media.
-    """
-    telegram_user_id = update.effective_user.id
-    chat_id = update.effective_chat.id
-    message_thread_id = getattr(update.message, "message_thread_id", None)
-    logger.info(f"User {telegram_user_id} executed /check with args: {context.args} in chat {chat_id}, thread {message_thread_id}")
-
-    config = load_config()
-
-    # Check if command is allowed
-    if not is_command_allowed(chat_id, message_thread_id, config, telegram_user_id):
-        return
-
-    if PASSWORD and not user_is_authorized(telegram_user_id):
-        logger.info(f"User {telegram_user_id} is not authorized. Requesting password.")
-        await send_message(context, chat_id, "👋 *Hey there!* Please enter the bot’s password to proceed:", message_thread_id=message_thread_id)
-        context.user_data["awaiting_password"] = True
-        return
-
-    if "overseerr_telegram_user_id" not in context.user_data:
-        logger.info(f"User {telegram_user_id} has no Overseerr user set.")
-        mode_specific_msg = {
-            BotMode.NORMAL: "Please log in with your Overseerr credentials in /settings.",
-            BotMode.API: "Please select an Overseerr user in /settings.",
-            BotMode.SHARED: "The admin needs to log in first. Use /settings if you’re the admin."
-        }
-        await send_message(
-            context,
-            chat_id,
-            f"👤 *No user configured yet.*\n{mode_specific_msg.get(CURRENT_MODE, 'Please configure in /settings.')}",
-            message_thread_id=message_thread_id
-        )
-        await show_settings_menu(update, context)
-        return
-
-    if not context.args:
-        await send_message(
-            context,
-            chat_id,
-            "🔍 *Search Media*\nPlease provide a title. Example: `/check Venom`",
-            message_thread_id=message_thread_id
-        )
-        return
-
-    media_name = " ".join(context.args)
-    search_data = search_media(media_name)
-    if not search_data:
-        await send_message(
-            context,
-            chat_id,
-            "❌ *Search Error*\nSomething went wrong. Please try again later.",
-            message_thread_id=message_thread_id
-        )
-        return
-
-    results = search_data.get("results", [])
-    if not results:
-        await send_message(
-            context,
-            chat_id,
-            f"🔍 *No Results*\nNo media found for '{media_name}'. Try a different title!",
-            message_thread_id=message_thread_id
-        )
-        return
-
-    processed_results = process_search_results(results)
-    context.user_data["search_results"] = processed_results
-
-    sent_message = await display_results_with_buttons(update, context, processed_results, offset=0)
-    context.user_data["results_message_id"] = sent_message.message_id
-
-###############################################################################
-#              DISPLAY RESULTS WITH BUTTONS (SEARCH PAGINATION)
-###############################################################################
-async def display_results_with_buttons(
-    update_or_query,
-    context: ContextTypes.DEFAULT_TYPE,
-    results: list,
-    offset: int,
-    new_message: bool = False,
-):
-    """
-    Creates inline buttons for up to 5 titles per page. Allows
-    navigation with Back/More. Returns the message object (if any).
-    """
-    keyboard = []
-    for idx, result in enumerate(results[offset : offset + 5]):
-        year = result.get("year", "Unknown Year")
-        button_text = f"{result['title']} ({year})"
-        callback_data = f"select_{offset + idx}"
-        keyboard.append([InlineKeyboardButton(button_text, callback_data=callback_data)])
-
-    total_results = len(results)
-    is_first_page = (offset == 0)
-    is_last_page = (offset + 5 >= total_results)
-
-    navigation_buttons = []
-    if is_first_page:
-        cancel_button = InlineKeyboardButton("❌ Cancel", callback_data="cancel_search")
-        if total_results > 5:
-            more_button = InlineKeyboardButton("➡️ More", callback_data=f"page_{offset + 5}")
-            navigation_buttons = [cancel_button, more_button]
-        else:
-            navigation_buttons = [cancel_button]
-    elif is_last_page:
-        back_button = InlineKeyboardButton("⬅️ Back", callback_data=f"page_{offset - 5}")
-        cancel_button = InlineKeyboardButton("❌ Cancel", callback_data="cancel_search")
-        navigation_buttons = [back_button, cancel_button]
-    else:
-        back_button = InlineKeyboardButton("⬅️ Back", callback_data=f"page_{offset - 5}")
-        x_button = InlineKeyboardButton("❌ Cancel", callback_data="cancel_search")
-        more_button = InlineKeyboardButton("➡️ More", callback_data=f"page_{offset + 5}")
-        navigation_buttons = [back_button, x_button, more_button]
-
-    if navigation_buttons:
-        keyboard.append(navigation_buttons)
-
-    reply_markup = InlineKeyboardMarkup(keyboard)
-
-    # Decide how to send/edit the message
-    if new_message:
-        sent_message = await context.bot.send_message(
-            chat_id=update_or_query.message.chat_id,
-            text="Please select a result:",
-            reply_markup=reply_markup
-        )
-        return sent_message
-    elif isinstance(update_or_query, Update) and update_or_query.message:
-        sent_message = await update_or_query.message.reply_text(
-            text="Please select a result:",
-            reply_markup=reply_markup
-        )
-        return sent_message
-    elif isinstance(update_or_query, CallbackQuery):
-        await update_or_query.edit_message_text(
-            text="Please select a result:",
-            reply_markup=reply_markup
-        )
-        return
-    else:
-        sent_message = await context.bot.send_message(
-            chat_id=update_or_query.message.chat_id,
-            text="Please select a result:",
-            reply_markup=reply_markup
-        )
-        return sent_message
-
-###############################################################################
-#        process_user_selection: SHOW MEDIA DETAILS + REQUEST/ISSUE BUTTON
-###############################################################################
-async def process_user_selection(
-    update_or_query,
-    context: ContextTypes.DEFAULT_TYPE,
-    result: dict,
-    edit_message: bool = False
-):
-    """
-    Displays details about the selected media (poster, description, status).
-    Shows buttons for 1080p, 4K, or both—depending on user permissions.
-    """
-    REQUESTED_STATUSES = [STATUS_PENDING, STATUS_PROCESSING, STATUS_PARTIALLY_AVAILABLE, STATUS_AVAILABLE]
-    # Determine whether this was triggered by a CallbackQuery
-    if isinstance(update_or_query, Update):
-        query = update_or_query.callback_query
-    else:
-        query = update_or_query
-
-    # Basic media info
-    media_title = result.get("title", "Unknown Title")
-    media_year = result.get("year", "????")
-    poster = result.get("poster")
-    description = result.get("description", "No description available")
-
-    status_hd = result.get("status_hd", STATUS_UNKNOWN)
-    status_4k = result.get("status_4k", STATUS_UNKNOWN)
-    overseerr_media_id = result.get("overseerr_id")
-
-    # Save the result for potential future actions (report issue, etc.)
-    context.user_data["selected_result"] = result
-
-    overseerr_telegram_user_id = context.user_data.get("overseerr_telegram_user_id")
-
-    # Decide if the user can request 4K for this media_type
-    user_has_4k_permission = False
-    if overseerr_telegram_user_id:
-        user_has_4k_permission = user_can_request_4k(overseerr_telegram_user_id, result.get("mediaType", ""))
-
-    # Inline function to interpret the numeric status codes
-    def interpret_status(code: int) -> str:
-        if code == STATUS_AVAILABLE:
-            return "Available ✅"
-        elif code == STATUS_PROCESSING:
-            return "Processing ⏳"
-        elif code == STATUS_PARTIALLY_AVAILABLE:
-            return "Partially available ⏳"
-        elif code == STATUS_PENDING:
-            return "Pending ⏳"
-        else:
-            # If not requested (STATUS_UNKNOWN), return an empty string.
-            return ""
-
-    # Helper to see if we can request a given resolution
-    def can_request_resolution(code: int) -> bool:
-        return code not in REQUESTED_STATUSES
-
-    str_appendix="confirm"
-    if result["mediaType"] == "tv":
-        str_appendix="sselect"
-
-    # Build the inline keyboard
-    keyboard = []
-    back_button = InlineKeyboardButton("⬅️ Back", callback_data="back_to_results")
-
-    # Build request_buttons list
-    request_buttons = []
-    if can_request_resolution(status_hd):
-        btn_1080p = InlineKeyboardButton("📥 1080p", callback_data=f"{str_appendix}_1080p_{result['id']}")
-        request_buttons.append(btn_1080p)
-
-    if user_has_4k_permission and can_request_resolution(status_4k):
-        btn_4k = InlineKeyboardButton("📥 4K", callback_data=f"{str_appendix}_4k_{result['id']}")
-        request_buttons.append(btn_4k)
-
-    if user_has_4k_permission and can_request_resolution(status_hd) and can_request_resolution(status_4k):
-        btn_both = InlineKeyboardButton("📥 Both", callback_data=f"{str_appendix}_both_{result['id']}")
-        request_buttons.append(btn_both)
-
-    # Adjust labels if exactly two buttons are present
-    if len(request_buttons) == 1:
-        new_buttons = []
-        for btn in request_buttons:
-            if "Request" not in btn.text:
-                new_text = "📥 Request " + btn.text.lstrip("📥 ").strip()
-            else:
-                new_text = btn.text
-            new_buttons.append(InlineKeyboardButton(new_text, callback_data=btn.callback_data))
-        request_buttons = new_buttons
-
-    if request_buttons:
-        keyboard.append(request_buttons)
-
-
-    # Show Report Issue if any resolution is pending/processing/partial/available
-    def is_reportable(code: int) -> bool:
-        return code in [STATUS_PENDING, STATUS_PROCESSING, STATUS_PARTIALLY_AVAILABLE, STATUS_AVAILABLE]
-
-    if (is_reportable(status_hd) or is_reportable(status_4k)) and overseerr_media_id:
-        report_button = InlineKeyboardButton("🛠 Report Issue", callback_data=f"report_{overseerr_media_id}")
-        keyboard.append([report_button])
-
-    keyboard.append([back_button])
-
-    # Construct the main message text (with inline status interpretation)
-    status_hd_str = interpret_status(status_hd)
-    status_4k_str = interpret_status(status_4k)
-
-    status_lines = []
-    if status_hd_str:
-        status_lines.append(f"• 1080p: {status_hd_str}")
-    if status_4k_str:
-        status_lines.append(f"• 4K: {status_4k_str}")
-
-    if status_lines:
-        status_block = "*Current status*:\n" + "\n".join(status_lines)
-    else:
-        status_block = ""
-
-    media_heading = f"*{media_title} ({media_year})*"
-    message_text = f"{media_heading}\n\n{description}\n\n{status_block}"
-
-    # If we have an old results_message_id, delete it
-    results_message_id = context.user_data.get("results_message_id")
-    if results_message_id:
-        try:
-            await context.bot.delete_message(
-                chat_id=query.message.chat_id,
-                message_id=results_message_id
-            )
-            logger.info(f"Deleted previous results message {results_message_id}.")
-        except Exception as e:
-            logger.debug(f"Could not delete previous results message {results_message_id}: {e}")
-        context.user_data.pop("results_message_id", None)
-
-    reply_markup = InlineKeyboardMarkup(keyboard)
-
-    # Finally send or edit the message (photo or text)
-    # Use provided poster or default poster if none available
-    media_preview_url = f"https://image.tmdb.org/t/p/w500{poster}" if poster else DEFAULT_POSTER_URL
-
-    if edit_message:
-        # If the original message is a photo, edit its caption, otherwise edit the text.
-        if query.message.photo:
-            await query.edit_message_caption(
-                caption=message_text,
-                parse_mode="Markdown",
-                reply_markup=reply_markup
-            )
-            context.user_data["media_message_id"] = query.message.message_id
-        else:
-            await query.edit_message_text(
-                text=message_text,
-                parse_mode="Markdown",
-                reply_markup=reply_markup
-            )
-            context.user_data["media_message_id"] = query.message.message_id
-    else:
-        sent_msg = await context.bot.send_photo(
-            chat_id=query.message.chat_id,
-            photo=media_preview_url,
-            caption=message_text,
-            parse_mode="Markdown",
-            reply_markup=reply_markup
-        )
-        context.user_data["media_message_id"] = sent_msg.message_id
-
-def user_can_request_4k(overseerr_telegram_user_id: int, media_type: str) -> bool:
-    """
-    Returns True if this user can request 4K for the specified media_type.
-    """
-    all_users = get_overseerr_users()
-    user_info = next((u for u in all_users if u["id"] == overseerr_telegram_user_id), None)
-    if not user_info:
-        logger.warning(f"No user found with Overseerr ID {overseerr_telegram_user_id}")
-        return False
-
-    user_permissions = user_info.get("permissions", 0)
-
-    # Grant all 4K permissions to admin users (permission value 2)
-    if user_permissions == 2:
-        return True
-
-    # PERMISSION_4K_MOVIE: 2048 bit
-    # PERMISSION_4K_TV = 4096 bit
-    if media_type == "movie":
-        return (user_permissions & PERMISSION_4K_MOVIE) == PERMISSION_4K_MOVIE
-    elif media_type == "tv":
-        return (user_permissions & PERMISSION_4K_TV) == PERMISSION_4K_TV
-    else:
-        return False
-
-###############################################################################
-#            cancel_search: CANCEL CURRENT SEARCH & CLEANUP
-###############################################################################
-async def cancel_search(query: CallbackQuery, context: ContextTypes.DEFAULT_TYPE):
-    """
-    Cancels the current search and removes related messages or states.
-    """
-    logger.info(f"Search canceled by user {query.from_user.id}.")
-    # Delete the current message
-    await query.message.delete()
-
-    # If we have a results_message_id, delete it as well
-    results_message_id = context.user_data.get("results_message_id")
-    if results_message_id:
-        try:
-            await context.bot.delete_message(
-                chat_id=query.message.chat_id,
-                message_id=results_message_id
-            )
-            logger.info(f"Deleted search results message {results_message_id}.")
-        except Exception as e:
-            # Not critical - sometimes the message is already deleted.
-            logger.debug(f"Could not delete search results message {results_message_id}: {e}")
-        context.user_data.pop("results_message_id", None)
-
-    # Clear any saved search results from context
-    context.user_data.pop("search_results", None)
-
-    # Notify user
-    await context.bot.send_message(
-        chat_id=query.message.chat_id,
-        text=f"🔍 Search canceled. \n"
-        f"💡 Type `/check <title>` for a new search\n",
-        parse_mode="Markdown"
-    )
-
-async def mode_select(query: CallbackQuery, context: ContextTypes.DEFAULT_TYPE):
-    """
-    Displays a detailed mode selection menu with descriptions for each mode.
-    """
-    # Detailed mode descriptions with formatting and Emojis
-    text = (
-    "🔧 *Change Mode*\n\n"
-    "🌟 *Normal Mode*\n"
-    "Each user logs in with their own Overseerr credentials. Requests are made using individual session cookies. "
-    "If a session expires, the bot tries to auto-login. If it fails, users must log in again.\n\n"
-
-    "🔑 *API Mode*\n"
-    "All requests are sent using the API key, so users **don't need to log in**. Instead, they can select a user from the list, and the bot will process requests as that user.\n"
-    "Limitations:\n"
-    "- All media requests are approved automatically.\n"
-    "- Issue reports are sent under the admin’s account\n"
-    "- No individual login credentials.\n\n"
-
-    "👥 *Shared User Mode*\n"
-    "A single Overseerr account is shared for all users. The admin logs in once, and all user requests are sent through this shared account. "
-    "Normal users cannot change any settings.\n\n"
-
-    "📖 See GitHub Wiki for details."
-    )
-
-
-    # Mode selection buttons (three-column layout)
-    keyboard = [
-        [
-            InlineKeyboardButton("🌟 Normal", callback_data="activate_normal"),
-            InlineKeyboardButton("🔑 API", callback_data="activate_api"),
-            InlineKeyboardButton("👥 Shared", callback_data="activate_shared")
-        ],
-        [InlineKeyboardButton("🔙 Back", callback_data="back_to_settings")]
-    ]
-
-    await query.edit_message_text(text, parse_mode="Markdown", reply_markup=InlineKeyboardMarkup(keyboard))
-
-###############################################################################
-#   button_handler: PROCESSES ALL INLINE BUTTON CLICKS (search, confirm, etc.)
-###############################################################################
-async def button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """
-    Handles button callbacks from inline keyboards.
-    """
-    global CURRENT_MODE
-    query = update.callback_query
-    data = query.data
-    telegram_user_id = query.from_user.id
-    chat_id = query.message.chat_id
-    message_thread_id = getattr(query.message, "message_thread_id", None)
-    config = load_config()
-    user_id_str = str(telegram_user_id)
-    is_admin = config["users"].get(user_id_str, {}).get("is_admin", False)
-
-    logger.info(f"User {telegram_user_id} pressed a button with callback data: {data} in chat {chat_id}, thread {message_thread_id}")
-
-    # Check if button callback is allowed
-    if not is_command_allowed(chat_id, message_thread_id, config, telegram_user_id):
-        return
-
-    if PASSWORD and not user_is_authorized(telegram_user_id):
-        logger.info(f"User {telegram_user_id} is not authorized. Showing an error.")
-        await query.edit_message_text(
-            text="You need to be authorized. Please use /start and enter the password first."
-        )
-        return
-
-    # Handle settings
-    if data == "settings":
-        await show_settings_menu(query, context, is_admin)
-        return
-
-    elif data == "cancel_settings":
-        logger.info(f"User {telegram_user_id} canceled settings.")
-        await query.edit_message_text(
-            "⚙️ Settings closed. Use /start or /settings to return."
-        )
-        return
-
-    elif data == "change_user":
-        logger.info(f"User {telegram_user_id} wants to change Overseerr user.")
-        await handle_change_user(query, context)
-        return
-
-    elif data == "manage_users":
-        await show_user_management_menu(query, context)
-        return
-
-    elif data.startswith("users_page_"):
-        offset = int(data.split("_")[2])
-        await show_user_management_menu(query, context, offset=offset)
-        return
-
-    elif data.startswith("manage_user_"):
-        telegram_id = data.split("_")[2]
-        await manage_specific_user(query, context, telegram_id)
-        return
-
-    elif data.startswith("block_user_"):
-        telegram_id = data.split("_")[2]
-        if config["users"].get(telegram_id, {}).get("is_admin", False) and telegram_id == user_id_str:
-            await query.edit_message_text("❌ Cannot block the main admin.")
-            return
-        config["users"][telegram_id]["is_blocked"] = True
-        config["users"][telegram_id]["is_authorized"] = False
-        save_config(config)
-        await manage_specific_user(query, context, telegram_id)
-        return
-
-    elif data.startswith("unblock_user_"):
-        telegram_id = data.split("_")[2]
-        config["users"][telegram_id]["is_blocked"] = False
-        config["users"][telegram_id]["is_authorized"] = True
-        save_config(config)
-        await manage_specific_user(query, context, telegram_id)
-        return
-
-    elif data.startswith("promote_user_"):
-        telegram_id = data.split("_")[2]
-        config["users"][telegram_id]["is_admin"] = True
-        config["users"][telegram_id]["is_authorized"] = True
-        config["users"][telegram_id]["is_blocked"] = False
-        save_config(config)
-        await manage_specific_user(query, context, telegram_id)
-        return
-
-    elif data.startswith("demote_user_"):
-        telegram_id = data.split("_")[2]
-        if config["users"].get(telegram_id, {}).get("is_admin", False) and telegram_id == user_id_str:
-            await query.edit_message_text("❌ Cannot demote the main admin.")
-            return
-        config["users"][telegram_id]["is_admin"] = False
-        save_config(config)
-        await manage_specific_user(query, context, telegram_id)
-        return
-
-    elif data == "manage_notifications":
-        logger.info(f"User {telegram_user_id} wants to manage notifications.")
-        await show_manage_notifications_menu(query, context)
-        return
-
-    elif data == "toggle_user_notifications":
-        logger.info(f"User {telegram_user_id} toggling their Telegram notifications.")
-        await toggle_user_notifications(query, context)
-        return
-
-    elif data == "toggle_user_silent":
-        logger.info(f"User {telegram_user_id} toggling silent mode.")
-        await toggle_user_silent(query, context)
-        return
-
-    elif data == "create_user":
-        logger.info(f"User {telegram_user_id} clicked 'Create new Overseerr User'.")
-        context.user_data["creating_new_user"] = True
-        context.user_data["new_user_data"] = {}
-        context.user_data["create_user_message_id"] = query.message.message_id
-
-        keyboard = [[InlineKeyboardButton("🔙 Cancel Creation", callback_data="cancel_user_creation")]]
-        reply_markup = InlineKeyboardMarkup(keyboard)
-        await query.edit_message_text(
-            text=(
-                "➕ *Create new Overseerr User*\n\n"
-                "Step 1: Please enter the user's email address."
-            ),
-            parse_mode="Markdown",
-            reply_markup=reply_markup
-        )
-        return
-
-    elif data == "cancel_user_creation":
-        logger.info(f"User {telegram_user_id} canceled user creation.")
-        context.user_data.pop("creating_new_user", None)
-        context.user_data.pop("new_user_data", None)
-        await show_user_management_menu(query, context)
-        return
-
-    elif data == "back_to_settings":
-        logger.info(f"User {telegram_user_id} going back to settings.")
-        await show_settings_menu(query, context, is_admin)
-        return
-
-    elif data == "toggle_group_mode":
-        if not is_admin:
-            await query.edit_message_text("Only admins can toggle Group Mode.")
-            return
-        config["group_mode"] = not config["group_mode"]
-        if not config["group_mode"]:
-            config["primary_chat_id"] = {"chat_id": None, "message_thread_id": None}
-            logger.info("Group Mode disabled, reset primary_chat_id to null")
-        save_config(config)
-        logger.info(f"Group Mode set to {config['group_mode']} by user {telegram_user_id}")
-        await show_settings_menu(query, context, is_admin=is_admin)
-        return
-
-    elif data == "login":
-        logger.info(f"User {telegram_user_id} initiated login.")
-        if CURRENT_MODE == BotMode.API:
-            await query.edit_message_text("In API Mode, no login is required.")
-            return
-        if CURRENT_MODE == BotMode.SHARED and not is_admin:
-            await query.edit_message_text("In Shared Mode, only the admin can log in.")
-            return
-        await start_login(query, context)
-        return
-
-    elif data == "logout":
-        logger.info(f"User {telegram_user_id} initiated logout.")
-        if CURRENT_MODE == BotMode.SHARED and not is_admin:
-            await query.edit_message_text("In Shared Mode, only the admin can log out.")
-            return
-        context.user_data.pop("session_data", None)
-        context.user_data.pop("overseerr_telegram_user_id", None)
-        context.user_data.pop("overseerr_user_name", None)
-        context.user_data.pop("all_users", None)
-        if CURRENT_MODE == BotMode.NORMAL:
-            sessions = load_user_sessions()
-            sessions.pop(str(telegram_user_id), None)
-            save_user_sessions(sessions)
-        elif CURRENT_MODE == BotMode.SHARED and is_admin:
-            context.application.bot_data.pop("shared_session", None)
-            if os.path.exists(SHARED_SESSION_FILE):
-                os.remove(SHARED_SESSION_FILE)
-                logger.info("Cleared shared session file.")
-        await query.edit_message_text("✅ Logged out!")
-        await show_settings_menu(query, context, is_admin)
-        return
-
-    elif data == "mode_select" and is_admin:
-        logger.info(f"Admin {telegram_user_id} accessing mode selection.")
-        await mode_select(query, context)
-        return
-
-    elif data.startswith("activate_") and is_admin:
-        mode = data.split("_")[1]
-        config["mode"] = mode
-        CURRENT_MODE = BotMode[mode.upper()]
-        save_config(config)
-        await show_settings_menu(query, context, is_admin)
-        return
-
-    # ---------------------------------------------------------
-    # D) Search Pagination / Selection
-    # ---------------------------------------------------------
-    results = context.user_data.get("search_results", [])
-
-    if data.startswith("page_"):
-        offset = int(data.split("_")[1])
-        logger.info(f"User {telegram_user_id} requested page offset {offset}.")
-        await display_results_with_buttons(query, context, results, offset)
-        return
-    
-    elif data == "cancel_user_selection":
-        logger.info(f"User {telegram_user_id} canceled user selection.")
-        await show_settings_menu(query, context, is_admin)
-        return
-
-    elif data.startswith("user_page_"):
-        offset = int(data.split("_")[2])
-        logger.info(f"User {telegram_user_id} requested user page offset {offset}.")
-        await handle_change_user(query, context, offset=offset)
-        return
-
-    elif data.startswith("select_user_"):
-        selected_telegram_user_id_str = data.replace("select_user_", "")
-        all_users = get_overseerr_users()
-        selected_user = next((u for u in all_users if str(u["id"]) == selected_telegram_user_id_str), None)
-        if not selected_user:
-            logger.info(f"User ID {selected_telegram_user_id_str} not found in Overseerr user list.")
-            await query.edit_message_text("User not found. Please try again.")
-            return
-
-        display_name = (
-            selected_user.get("displayName")
-            or selected_user.get("username")
-            or f"User {selected_telegram_user_id_str}"
-        )
-
-        context.user_data["overseerr_telegram_user_id"] = int(selected_telegram_user_id_str)
-        context.user_data["overseerr_user_name"] = display_name
-
-        # Fetch notification settings for the selected user
-        current_settings = get_user_notification_settings(int(selected_telegram_user_id_str))
-        
-        # Check if Telegram notifications are enabled
-        notification_types = current_settings.get("notificationTypes", {})
-        telegram_bitmask = notification_types.get("telegram", 0)
-        if telegram_bitmask == 0:  # Notifications are disabled
-            chat_id = str(query.message.chat_id)
-            success = update_telegram_settings_for_user(
-                overseerr_telegram_user_id=int(selected_telegram_user_id_str),
-                chat_id=chat_id,
-                send_silently=current_settings.get("telegramSendSilently", False),
-                telegram_bitmask=3657  # Enable all notifications
-            )
-
-        # Persist in JSON so it survives bot restarts
-        save_user_selection(telegram_user_id, int(selected_telegram_user_id_str), display_name)
-
-        await show_settings_menu(query, context, is_admin)
-        return
-
-    elif data.startswith("select_"):
-        result_index = int(data.split("_")[1])
-        if 0 <= result_index < len(results):
-            selected_result = results[result_index]
-            logger.info(f"User {telegram_user_id} selected index {result_index}: {selected_result['title']}")
-            await process_user_selection(query, context, selected_result)
-        else:
-            logger.warning(f"Invalid search result index: {result_index}")
-            await query.edit_message_text("Invalid selection. Please try again.")
-        return
-
-    elif data == "back_to_results":
-        logger.info(f"User {telegram_user_id} going back to search results.")
-        await query.message.delete()
-        sent_message = await display_results_with_buttons(
-            query, context, results, offset=0, new_message=True
-        )
-        context.user_data["results_message_id"] = sent_message.message_id
-        return
-
-    elif data == "cancel_search":
-        logger.info(f"User {telegram_user_id} canceled the search.")
-        await cancel_search(query, context)
-        return
-
-    # ---------------------------------------------------------
-    # E) Handling Requests for 1080p, 4K, or Both
-    # ---------------------------------------------------------
-    elif data.startswith("confirm_"):
-        media_id = int(data.split("_")[2])
-        selected_result = next((r for r in results if r["id"] == media_id), None)
-        season_index = season_index = data.split("_")[3] if selected_result["mediaType"] == "tv" else ""
-        if not selected_result:
-            logger.warning(f"Media ID {media_id} not found in search results.")
-            await query.edit_message_text("Unable to find this media. Please try again.")
-            return
-
-        session_cookie = None
-        requested_by = None  # Default to None (excluded in Normal/Shared)
-
-        if CURRENT_MODE == BotMode.NORMAL:
-            if "session_data" not in context.user_data:
-                await query.edit_message_text("Please log in first (/settings).")
-                return
-            session_cookie = context.user_data["session_data"]["cookie"]
-            if not check_session_validity(session_cookie):
-                await query.edit_message_text("⏳ Session expired, attempting to re-login...")
-                email, password = base64.b64decode(context.user_data["session_data"]["credentials"]).decode().split(":")
-                new_cookie = overseerr_login(email, password)
-                if new_cookie:
-                    context.user_data["session_data"]["cookie"] = new_cookie
-                    sessions = load_user_sessions()
-                    sessions[str(telegram_user_id)]["cookie"] = new_cookie
-                    save_user_sessions(sessions)
-                    await query.edit_message_text("✅ Successfully re-logged in!")
-                else:
-                    context.user_data.pop("session_data", None)
-                    await query.edit_message_text("❌ Re-login failed. Please log in again.")
-                    return
-        elif CURRENT_MODE == BotMode.SHARED:
-            shared_session = context.application.bot_data.get("shared_session")
-            if not shared_session or not check_session_validity(shared_session["cookie"]):
-                await query.edit_message_text("Shared session expired. Admin must re-login.")
-                return
-            session_cookie = shared_session["cookie"]
-        elif CURRENT_MODE == BotMode.API:
-            requested_by = context.user_data.get("overseerr_telegram_user_id", 1)  # Use selected user ID in API mode
-
-        if data.startswith("confirm_1080p_"):
-            success_1080p, message_1080p = request_media(
-                media_id=media_id,
-                media_type=selected_result["mediaType"],
-                season_index=season_index,
-                requested_by=requested_by,
-                is4k=False,
-                session_cookie=session_cookie
-            )
-            await send_request_status(query, selected_result['title'], success_1080p=success_1080p, message_1080p=message_1080p)
-        elif data.startswith("confirm_4k_"):
-            success_4k, message_4k = request_media(
-                media_id=media_id,
-                media_type=selected_result["mediaType"],
-                season_index=season_index,
-                requested_by=requested_by,
-                is4k=True,
-                session_cookie=session_cookie
-            )
-            await send_request_status(query, selected_result['title'], success_4k=success_4k, message_4k=message_4k)
-        elif data.startswith("confirm_both_"):
-            success_1080p, message_1080p = request_media(
-                media_id=media_id,
-                media_type=selected_result["mediaType"],
-                season_index=season_index,
-                requested_by=requested_by,
-                is4k=False,
-                session_cookie=session_cookie
-            )
-            success_4k, message_4k = request_media(
-                media_id=media_id,
-                media_type=selected_result["mediaType"],
-                season_index=season_index,
-                requested_by=requested_by,
-                is4k=True,
-                session_cookie=session_cookie
-            )
-            await send_request_status(query, selected_result['title'], success_1080p, message_1080p, success_4k, message_4k)
-        return
-
-    # ---------------------------------------------------------
-    # F) Report Issue
-    # ---------------------------------------------------------
-    elif data.startswith("report_"):
-        overseerr_media_id = int(data.split("_")[1])
-        selected_result = next((r for r in results if r.get("overseerr_id") == overseerr_media_id), None)
-        if selected_result:
-            logger.info(
-                f"User {telegram_user_id} wants to report an issue for {selected_result['title']} "
-                f"(Overseerr ID {overseerr_media_id})."
-            )
-            context.user_data['selected_result'] = selected_result
-
-            issue_buttons = [
-                [InlineKeyboardButton(text=ISSUE_TYPES[1], callback_data=f"issue_type_{1}")],
-                [InlineKeyboardButton(text=ISSUE_TYPES[2], callback_data=f"issue_type_{2}")],
-                [InlineKeyboardButton(text=ISSUE_TYPES[3], callback_data=f"issue_type_{3}")],
-                [InlineKeyboardButton(text=ISSUE_TYPES[4], callback_data=f"issue_type_{4}")],
-                [InlineKeyboardButton(text="❌ Cancel", callback_data="cancel_issue")]
-            ]
-            reply_markup = InlineKeyboardMarkup(issue_buttons)
-
-            await query.edit_message_caption(
-                caption=f"🛠 *Report an Issue*\n\nSelect the issue type for *{selected_result['title']}*:",
-                parse_mode="Markdown",
-                reply_markup=reply_markup,
-            )
-        else:
-            logger.warning(f"No matching search result found for Overseerr ID {overseerr_media_id}.")
-            await query.edit_message_caption("Selected media not found. Please try again.")
-        return
-
-    elif data.startswith("issue_type_"):
-        try:
-            issue_type_id = int(data.split("_")[2])
-        except (IndexError, ValueError):
-            logger.warning(f"Invalid issue_type callback data: {data}")
-            await query.edit_message_caption("Invalid issue type. Please start again.")
-            return
-
-        issue_type_name = ISSUE_TYPES.get(issue_type_id, "Other")
-        context.user_data['reporting_issue'] = {
-            'issue_type': issue_type_id,
-            'issue_type_name': issue_type_name,
-        }
-        logger.info(f"User {telegram_user_id} selected issue type {issue_type_id} ({issue_type_name}).")
-
-        cancel_button = InlineKeyboardButton("❌ Cancel", callback_data="cancel_issue")
-        reply_markup = InlineKeyboardMarkup([[cancel_button]])
-
-        selected_result = context.user_data.get('selected_result')
-        if not selected_result:
-            logger.warning("No selected_result found in context when choosing issue type.")
-            await query.edit_message_caption("No media selected. Please try reporting again.")
-            return
-
-        issue_examples = {
-            1: "- *The video freezes at 1h 10m, but audio continues.*\n"
-               "- *The quality is very bad despite selecting HD/4K.*\n"
-               "- *Episode 2, Season 5 is missing entirely.*",
-            2: "- *Episode 3, Season 2 has no sound from minute 10.*\n"
-               "- *The audio is out of sync by 3 seconds.*\n"
-               "- *No sound at all in the movie after 45 minutes.*",
-            3: "- *No English subtitles available for the movie.*\n"
-               "- *Subtitles are completely out of sync.*\n"
-               "- *Wrong subtitles are shown (Spanish instead of German).*",
-            4: "- *Playback keeps buffering despite a stable connection.*\n"
-               "- *The wrong version of the movie is playing.*\n"
-               "- *Plex error when trying to watch.*"
-        }
-
-        example_text = issue_examples.get(issue_type_id, "- *Please describe the issue.*")
-        prompt_message = (
-            f"🛠 *Report an Issue*\n\n"
-            f"You selected: *{issue_type_name}*\n\n"
-            f"📋 *Describe the issue with {selected_result['title']}.*\n"
-            "Example:\n"
-            f"{example_text}\n\n"
-            "Type your issue below:"
-        )
-
-        await query.edit_message_caption(
-            caption=prompt_message,
-            parse_mode="Markdown",
-            reply_markup=reply_markup,
-        )
-        return
-
-    elif data == "cancel_issue":
-        logger.info(f"User {telegram_user_id} canceled the issue reporting process.")
-        context.user_data.pop('reporting_issue', None)
-        selected_result = context.user_data.get('selected_result')
-        await process_user_selection(query, context, selected_result, edit_message=True)
-        return
-
-    # ---------------------------------------------------------
-    # G) Seasons select
-    # ---------------------------------------------------------
-    elif data.startswith("sselect_"):
-        media_id = int(data.split("_")[2])
-        resolution_index = data.split("_")[1]
-        selected_result = next((r for r in results if r["id"] == media_id), None)
-        if not selected_result:
-            logger.warning(f"Media ID {media_id} not found in search results.")
-            await query.edit_message_text("Unable to find this media. Please try again.")
-            return
-
-        session_cookie = None
-
-        if CURRENT_MODE == BotMode.NORMAL:
-            if "session_data" not in context.user_data:
-                await query.edit_message_text("Please log in first (/settings).")
-                return
-            session_cookie = context.user_data["session_data"]["cookie"]
-            if not check_session_validity(session_cookie):
-                await query.edit_message_text("⏳ Session expired, attempting to re-login...")
-                email, password = base64.b64decode(context.user_data["session_data"]["credentials"]).decode().split(":")
-                new_cookie = overseerr_login(email, password)
-                if new_cookie:
-                    context.user_data["session_data"]["cookie"] = new_cookie
-                    sessions = load_user_sessions()
-                    sessions[str(telegram_user_id)]["cookie"] = new_cookie
-                    save_user_sessions(sessions)
-                    await query.edit_message_text("✅ Successfully re-logged in!")
-                else:
-                    context.user_data.pop("session_data", None)
-                    await query.edit_message_text("❌ Re-login failed. Please log in again.")
-                    return
-        elif CURRENT_MODE == BotMode.SHARED:
-            shared_session = context.application.bot_data.get("shared_session")
-            if not shared_session or not check_session_validity(shared_session["cookie"]):
-                await query.edit_message_text("Shared session expired. Admin must re-login.")
-                return
-            session_cookie = shared_session["cookie"]
-
-        # Build request_buttons list
-        keyboard = []        
-        back_button = InlineKeyboardButton("⬅️ Back", callback_data="back_to_results")
-
-        if selected_result["mediaType"] == "tv":
-            jrespond = get_tv_details(media_id=media_id,session_cookie=session_cookie) 
-            for season in jrespond["seasons"]:
-                season_index = season.get("seasonNumber","")
-                btn_text = "📥 " + season.get("name","")
-                btn = InlineKeyboardButton(btn_text, callback_data=f"confirm_{resolution_index}_{selected_result['id']}_{season_index}")
-                keyboard.append([btn])
-        
-        btn_all = InlineKeyboardButton("📥 All", callback_data=f"confirm_{resolution_index}_{selected_result['id']}_all")
-        keyboard.append([btn_all])
-        keyboard.append([back_button])
-
-        reply_markup = InlineKeyboardMarkup(keyboard)
-
-        await query.edit_message_caption(
-        caption="Select seasons:",
-        parse_mode="Markdown",
-        reply_markup=reply_markup
-        )
-        # context.user_data["media_message_id"] = query.message.message_id
-        
-    # ---------------------------------------------------------
-    # H) Fallback
-    # ---------------------------------------------------------
-    logger.warning(f"User {telegram_user_id} triggered unknown callback data: {data}")
-    await query.edit_message_text(
-        text="Invalid action or unknown callback data. Please try again.",
-        parse_mode="Markdown"
-    )
-
-async def send_request_status(query, title, success_1080p=None, message_1080p=None, success_4k=None, message_4k=None):
-    """
-    Sends a formatted status message for a media request.
-    Handles 1080p, 4K, or both in a unified way.
-    """
-    status_1080p = "✅ 1080p requested successfully" if success_1080p else f"❌ 1080p: {message_1080p}" if message_1080p else "❌ 1080p request failed"
-    status_4k = "✅ 4K requested successfully" if success_4k else f"❌ 4K: {message_4k}" if message_4k else "❌ 4K request failed"
-
-    msg = f"*Request Status for {title}:*\n"
-    if success_1080p is not None:
-        msg += f"• {status_1080p}\n"
-    if success_4k is not None:
-        msg += f"• {status_4k}\n"
-
-    await query.edit_message_caption(msg.strip(), parse_mode="Markdown")
-
-###############################################################################
-#                HANDLE CHANGE USER FUNCTION
-###############################################################################
-async def handle_change_user(update_or_query, context: ContextTypes.DEFAULT_TYPE, is_initial=False, offset=0):
-    """
-    Handles the 'Change User' button click or direct call after password.
-    Presents a paginated list of Overseerr users to select from, with efficient user list caching.
-    """
-    if isinstance(update_or_query, Update):
-        telegram_user_id = update_or_query.effective_user.id
-        chat_id = update_or_query.effective_chat.id
-        message_thread_id = getattr(update_or_query.message, "message_thread_id", None)
-    elif isinstance(update_or_query, CallbackQuery):
-        telegram_user_id = update_or_query.from_user.id
-        chat_id = update_or_query.message.chat_id
-        message_thread_id = getattr(update_or_query.message, "message_thread_id", None)
-    else:
-        logger.error("Invalid argument type passed to handle_change_user")
-        return
-
-    config = load_config()
-
-    # Check if action is allowed
-    if not is_command_allowed(chat_id, message_thread_id, config, telegram_user_id):
-        return
-
-    logger.info(f"User {telegram_user_id} is attempting to change Overseerr user, is_initial={is_initial}, offset={offset}, chat {chat_id}, thread {message_thread_id}")
-
-    if "all_users" not in context.user_data:
-        user_list = get_overseerr_users()
-        if not user_list:
-            error_text = "❌ Could not fetch user list from Overseerr. Please try again later."
-            await send_message(context, chat_id, error_text, message_thread_id=message_thread_id)
-            return
-        context.user_data["all_users"] = user_list.get("results", user_list) if isinstance(user_list, dict) else user_list
-
-    users = context.user_data["all_users"]
-    total_users = len(users)
-    page_size = 9
-    max_pages = (total_users + page_size - 1) // page_size
-
-    offset = max(0, min(offset, (max_pages - 1) * page_size))
-    current_users = users[offset:offset + page_size]
-
-    keyboard = []
-    for overseerr_user in current_users:
-        uid = overseerr_user["id"]
-        display_name = (
-            overseerr_user.get("displayName")
-            or overseerr_user.get("username")
-            or f"User {uid}"
-        )
-        callback_data = f"select_user_{uid}"
-        keyboard.append([InlineKeyboardButton(f"{display_name} (ID: {uid})", callback_data=callback_data)])
-
-    navigation_buttons = []
-    cancel_button = InlineKeyboardButton("❌ Cancel", callback_data="cancel_user_selection")
-    navigation_buttons.append(cancel_button)
-
-    if offset > 0:
-        back_button = InlineKeyboardButton("⬅️ Back", callback_data=f"user_page_{offset - page_size}")
-        navigation_buttons.append(back_button)
-
-    if offset + page_size < total_users:
-        more_button = InlineKeyboardButton("➡️ More", callback_data=f"user_page_{offset + page_size}")
-        navigation_buttons.append(more_button)
-
-    if navigation_buttons:
-        keyboard.append(navigation_buttons)
-
-    reply_markup = InlineKeyboardMarkup(keyboard)
-    message_text = (
-        "🔄 *Select an Overseerr User:*" if not is_initial
-        else "🔄 *Let’s pick your Overseerr user:*"
-    )
-
-    if isinstance(update_or_query, Update):
-        await send_message(context, chat_id, message_text, reply_markup=reply_markup, message_thread_id=message_thread_id)
-    elif isinstance(update_or_query, CallbackQuery):
-        await update_or_query.edit_message_text(message_text, parse_mode="Markdown", reply_markup=reply_markup)
-
-###############################################################################
-#                               MAIN ENTRY POINT
-###############################################################################
-def main():
-    global CURRENT_MODE
-    ensure_data_directory()
-    config = load_config()
-    mode_from_config = config.get("mode", "normal")
-    try:
-        CURRENT_MODE = BotMode[mode_from_config.upper()]
-    except KeyError:
-        logger.warning(f"Invalid mode {mode_from_config} in config, defaulting to NORMAL")
-        CURRENT_MODE = BotMode.NORMAL
-    logger.info(f"Bot started in mode: {CURRENT_MODE.value}")
-
-    app = ApplicationBuilder().token(TELEGRAM_TOKEN).build()
-
-    if CURRENT_MODE == BotMode.SHARED:
-        shared_session = load_shared_session()
-        if shared_session:
-            app.bot_data["shared_session"] = shared_session
-            logger.info("Loaded shared session for Shared mode")
-
-    # Register handlers
-    app.add_handler(MessageHandler(filters.ALL, user_data_loader), group=-999)
-    app.add_handler(CommandHandler("start", start_command))
-    app.add_handler(CommandHandler("settings", show_settings_menu))
-    app.add_handler(CommandHandler("check", check_media))
-    app.add_handler(CallbackQueryHandler(button_handler))
-    app.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, handle_text_input))
-
-    logger.info("Starting bot polling...")
-    app.run_polling()
-
-if __name__ == "__main__":
-    main()
+import asyncio
+import logging
+import base64
+import httpx
+import urllib.parse
+import json
+import orjson
+from aiolimiter import AsyncLimiter
+import os
+import threading
+import time
+from enum import Enum
+from types import MappingProxyType
+from typing import Optional
+from datetime import datetime, timezone
+from http.cookiejar import CookieJar, DefaultCookiePolicy
+
+from telegram import (
+    Update,
+    InlineKeyboardButton,
+    InlineKeyboardMarkup,
+    CallbackQuery,
+)
+from telegram.ext import (
+    AIORateLimiter,
+    ApplicationBuilder,
+    CommandHandler,
+    CallbackQueryHandler,
+    ContextTypes,
+    MessageHandler,
+    TypeHandler,
+    filters,
+)
+from telegram.request import HTTPXRequest
+
+# uvloop is optional (not available on Windows); the default asyncio loop is used without it
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
+
+###############################################################################
+#                              BOT VERSION & BUILD
+###############################################################################
+VERSION = "3.0.2"
+BUILD = "2025.05.08.261"
+
+logging.basicConfig(
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+    level=logging.INFO,
+)
+logger = logging.getLogger(__name__)
+logger.info(f"Bot Version: {VERSION} BUILD: {BUILD}")
+
+###############################################################################
+#                    LOAD CONFIG OR ENVIRONMENT VARIABLES
+###############################################################################
+try:
+    logger.info("Importing environment/config variables...")
+    OVERSEERR_API_URL = (
+        os.environ.get("OVERSEERR_API_URL")
+        or getattr(__import__("config"), "OVERSEERR_API_URL", None)
+    )
+    OVERSEERR_API_KEY = (
+        os.environ.get("OVERSEERR_API_KEY")
+        or getattr(__import__("config"), "OVERSEERR_API_KEY", None)
+    )
+    TELEGRAM_TOKEN = (
+        os.environ.get("TELEGRAM_TOKEN")
+        or getattr(__import__("config"), "TELEGRAM_TOKEN", None)
+    )
+    # password initialization
+    try:
+        PASSWORD = os.environ.get("PASSWORD")
+        if PASSWORD is None:
+            # Try loading from config.py
+            config_module = __import__("config")
+            PASSWORD = getattr(config_module, "PASSWORD", None)
+    except ImportError:
+        # config.py not found, use None as fallback
+        PASSWORD = None
+    # Optional webhook mode: set the public HTTPS base URL to receive updates via webhook instead of polling
+    try:
+        config_module = __import__("config")
+    except ImportError:
+        config_module = None
+    WEBHOOK_URL = os.environ.get("WEBHOOK_URL") or getattr(config_module, "WEBHOOK_URL", None)
+    WEBHOOK_PORT = int(os.environ.get("WEBHOOK_PORT") or getattr(config_module, "WEBHOOK_PORT", 8443))
+    logger.info("Variables loaded successfully.")
+except Exception as e:
+    logger.error(f"Failed to load config: {e}")
+
+###############################################################################
+#                          OVERSEERR CONSTANTS
+###############################################################################
+STATUS_UNKNOWN = 1
+STATUS_PENDING = 2
+STATUS_PROCESSING = 3
+STATUS_PARTIALLY_AVAILABLE = 4
+STATUS_AVAILABLE = 5
+
+# Labels shown on the media card; not-yet-requested media (STATUS_UNKNOWN) has none
+STATUS_LABELS = {
+    STATUS_AVAILABLE: "Available ✅",
+    STATUS_PROCESSING: "Processing ⏳",
+    STATUS_PARTIALLY_AVAILABLE: "Partially available ⏳",
+    STATUS_PENDING: "Pending ⏳",
+}
+
+# Statuses that mean a resolution has already been requested (and can be reported)
+REQUESTED_STATUSES = frozenset({STATUS_PENDING, STATUS_PROCESSING, STATUS_PARTIALLY_AVAILABLE, STATUS_AVAILABLE})
+
+ISSUE_TYPES = {
+    1: "Video",
+    2: "Audio",
+    3: "Subtitle",
+    4: "Other"
+}
+
+# Example descriptions shown when asking the user to describe an issue
+ISSUE_EXAMPLES = {
+    1: "- *The video freezes at 1h 10m, but audio continues.*\n"
+       "- *The quality is very bad despite selecting HD/4K.*\n"
+       "- *Episode 2, Season 5 is missing entirely.*",
+    2: "- *Episode 3, Season 2 has no sound from minute 10.*\n"
+       "- *The audio is out of sync by 3 seconds.*\n"
+       "- *No sound at all in the movie after 45 minutes.*",
+    3: "- *No English subtitles available for the movie.*\n"
+       "- *Subtitles are completely out of sync.*\n"
+       "- *Wrong subtitles are shown (Spanish instead of German).*",
+    4: "- *Playback keeps buffering despite a stable connection.*\n"
+       "- *The wrong version of the movie is playing.*\n"
+       "- *Plex error when trying to watch.*"
+}
+
+# Full issue prompt per issue type, only the media title is filled in per callback
+ISSUE_PROMPT_TEMPLATES = {
+    issue_type_id: (
+        "🛠 *Report an Issue*\n\n"
+        f"You selected: *{issue_type_name}*\n\n"
+        "📋 *Describe the issue with {title}.*\n"
+        "Example:\n"
+        f"{ISSUE_EXAMPLES[issue_type_id]}\n\n"
+        "Type your issue below:"
+    )
+    for issue_type_id, issue_type_name in ISSUE_TYPES.items()
+}
+
+# Operating modes as enum
+class BotMode(Enum):
+    NORMAL = "normal"
+    API = "api"
+    SHARED = "shared"
+
+# Multi-step text input a user is currently in the middle of
+class PendingFlow(Enum):
+    PASSWORD = "password"
+    ISSUE_DESCRIPTION = "issue_description"
+    LOGIN_EMAIL = "login_email"
+    LOGIN_PASSWORD = "login_password"
+
+# Define CURRENT_MODE globally
+CURRENT_MODE = BotMode.NORMAL  # Default mode
+
+# Contains the authorisation bit for 4K
+PERMISSION_4K_MOVIE = 2048
+PERMISSION_4K_TV = 4096
+
+# How long fetched notification settings are reused while toggling them
+NOTIFICATION_SETTINGS_CACHE_TTL = 15  # seconds
+
+DEFAULT_POSTER_URL = "https://raw.githubusercontent.com/sct/overseerr/refs/heads/develop/public/images/overseerr_poster_not_found.png"
+
+# Static parts of the /start welcome message; only the update notice is added per call
+START_MESSAGE_HEADER = f"👋 *Welcome to the Overseerr Telegram Bot!* v{VERSION}"
+START_MESSAGE_BODY = (
+    "\n\n🎬 *What I can do:*\n"
+    " - 🔍 Search movies & TV shows\n"
+    " - 📊 Check availability\n"
+    " - 🎫 Request new titles\n"
+    " - 🛠 Report issues\n\n"
+    "💡 *How to start:* Type `/check <title>`\n"
+    "_Example: `/check Venom`_\n\n"
+    "You can also configure your preferences with [/settings]."
+)
+START_LOGIN_REQUIRED_TEXT = (
+    "\n\n🔑 *Login Required*\n"
+    "Please log in with your Overseerr credentials to start requesting media."
+)
+
+# Keyboards without per-user state are built once and reused
+LOGIN_MARKUP = InlineKeyboardMarkup([[InlineKeyboardButton("🔑 Login", callback_data="login")]])
+
+NO_USERS_MARKUP = InlineKeyboardMarkup([
+    [InlineKeyboardButton("➕ Create new Overseerr User", callback_data="create_user")],
+    [InlineKeyboardButton("⬅️ Back to Settings", callback_data="back_to_settings")]
+])
+
+MODE_SELECT_MARKUP = InlineKeyboardMarkup([
+    [
+        InlineKeyboardButton("🌟 Normal", callback_data="activate_normal"),
+        InlineKeyboardButton("🔑 API", callback_data="activate_api"),
+        InlineKeyboardButton("👥 Shared", callback_data="activate_shared")
+    ],
+    [InlineKeyboardButton("🔙 Back", callback_data="back_to_settings")]
+])
+
+CANCEL_USER_CREATION_MARKUP = InlineKeyboardMarkup([[InlineKeyboardButton("🔙 Cancel Creation", callback_data="cancel_user_creation")]])
+
+CANCEL_ISSUE_BUTTON = InlineKeyboardButton("❌ Cancel", callback_data="cancel_issue")
+
+ISSUE_TYPE_MARKUP = InlineKeyboardMarkup(
+    [[InlineKeyboardButton(text=name, callback_data=f"issue_type_{issue_type_id}")] for issue_type_id, name in ISSUE_TYPES.items()]
+    + [[CANCEL_ISSUE_BUTTON]]
+)
+
+CANCEL_ISSUE_MARKUP = InlineKeyboardMarkup([[CANCEL_ISSUE_BUTTON]])
+
+os.makedirs("data", exist_ok=True)  # Ensure 'data/' folder exists
+
+###############################################################################
+#                              FILE PATHS
+###############################################################################
+CONFIG_FILE = "data/bot_config.json"
+USER_SELECTION_FILE = "data/api_mode_selections.json"  # For API mode
+USER_SESSIONS_FILE = "data/normal_mode_sessions.json"  # For Normal mode
+SHARED_SESSION_FILE = "data/shared_mode_session.json"  # For Shared mode
+
+def load_config():
+    """
+    Loads the configuration from data/bot_config.json.
+    Returns a dict with default values if the file is missing or invalid.
+    """
+    try:
+        with open(CONFIG_FILE, "r", encoding="utf-8") as f:
+            config = json.load(f)
+            config.setdefault("group_mode", False)
+            config.setdefault("primary_chat_id", {"chat_id": None, "message_thread_id": None})
+            config["primary_chat_id"].setdefault("chat_id", None)
+            config["primary_chat_id"].setdefault("message_thread_id", None)
+            config.setdefault("mode", "normal")
+            config.setdefault("users", {})
+            logger.debug("Loaded configuration successfully")
+            return config
+    except (FileNotFoundError, json.JSONDecodeError, PermissionError) as e:
+        logger.warning(f"Failed to load {CONFIG_FILE}: {e}. Using defaults.")
+        default_config = {
+            "group_mode": False,
+            "primary_chat_id": {"chat_id": None, "message_thread_id": None},
+            "mode": "normal",
+            "users": {}
+        }
+        save_config(default_config)
+        return default_config
+
+async def send_message(context: ContextTypes.DEFAULT_TYPE, chat_id: int, text: str, reply_markup=None, allow_sending=True, message_thread_id: Optional[int]=None):
+    """
+    Sends a message to the specified chat_id, or to primary_chat_id (with thread) if group_mode is enabled.
+    """
+    if not allow_sending:
+        logger.debug(f"Skipped sending message to chat {chat_id}: sending not allowed")
+        return
+
+    config = load_config()
+    if config["group_mode"] and config["primary_chat_id"]["chat_id"] is not None:
+        chat_id = config["primary_chat_id"]["chat_id"]
+        message_thread_id = config["primary_chat_id"]["message_thread_id"]
+        logger.info(f"Group mode enabled, redirecting message to primary_chat_id: {chat_id}, thread: {message_thread_id}")
+    try:
+        kwargs = {
+            "chat_id": chat_id,
+            "text": text,
+            "parse_mode": "Markdown",
+            "reply_markup": reply_markup
+        }
+        if message_thread_id is not None:
+            kwargs["message_thread_id"] = message_thread_id
+        await context.bot.send_message(**kwargs)
+    except Exception as e:
+        logger.error(f"Failed to send message to chat {chat_id}, thread {message_thread_id}: {e}")
+
+async def delete_message_quietly(context: ContextTypes.DEFAULT_TYPE, chat_id: int, message_id: Optional[int]):
+    """
+    Deletes a message if message_id is set. Failures are only logged, since
+    the message may already be gone.
+    """
+    if not message_id:
+        return
+    try:
+        await context.bot.delete_message(chat_id=chat_id, message_id=message_id)
+        logger.info(f"Deleted message {message_id} in chat {chat_id}.")
+    except Exception as e:
+        logger.debug(f"Could not delete message {message_id} in chat {chat_id}: {e}")
+
+def is_command_allowed(chat_id: int, message_thread_id: Optional[int], config: dict, telegram_user_id: int) -> bool:
+    """
+    Checks if a command is allowed based on Group Mode, chat/thread, and user status.
+    Admins can always use commands in private chats, even in Group Mode.
+    """
+    user_id_str = str(telegram_user_id)
+    user = config["users"].get(user_id_str, {})
+    is_admin = user.get("is_admin", False)
+    is_blocked = user.get("is_blocked", False)
+
+    if is_blocked:
+        logger.debug(f"User {telegram_user_id} is blocked, denying command")
+        return False
+
+    if is_admin and chat_id > 0:  # Positive chat_id indicates a private chat
+        logger.debug(f"Admin {telegram_user_id} in private chat {chat_id}, allowing command")
+        return True
+
+    if not config["group_mode"]:
+        return True
+
+    primary = config["primary_chat_id"]
+    if primary["chat_id"] is None:
+        logger.debug(f"Group Mode on, primary_chat_id unset, allowing command in chat {chat_id}")
+        return True
+    if chat_id != primary["chat_id"]:
+        logger.info(f"Ignoring command in chat {chat_id}: Group Mode restricts to primary chat {primary['chat_id']}")
+        return False
+    if primary["message_thread_id"] is not None and message_thread_id != primary["message_thread_id"]:
+        logger.info(f"Ignoring command in thread {message_thread_id}: Group Mode restricts to thread {primary['message_thread_id']}")
+        return False
+    return True
+
+# Authorized (and not blocked) user IDs are kept in memory so the password check
+# doesn't read the config file on every update. save_config refreshes the set;
+# the TTL picks up edits made to the file by hand.
+AUTHORIZED_USERS_CACHE_TTL = 60  # seconds
+# loaded_at is None until the first load (main() loads it at startup)
+authorized_users_cache = {"loaded_at": None, "user_ids": frozenset()}
+
+def refresh_authorized_users(config: dict):
+    """
+    Rebuilds the in-memory set of authorized user IDs from the given config.
+    """
+    authorized_users_cache["user_ids"] = frozenset(
+        user_id_str
+        for user_id_str, user in config["users"].items()
+        if user.get("is_authorized", False) and not user.get("is_blocked", False)
+    )
+    authorized_users_cache["loaded_at"] = time.monotonic()
+
+def user_is_authorized(telegram_user_id: int) -> bool:
+    """
+    Checks if a Telegram user is authorized based on the config.
+    """
+    loaded_at = authorized_users_cache["loaded_at"]
+    if loaded_at is None or time.monotonic() - loaded_at >= AUTHORIZED_USERS_CACHE_TTL:
+        refresh_authorized_users(load_config())
+    return str(telegram_user_id) in authorized_users_cache["user_ids"]
+
+def ensure_data_directory():
+    """
+    Ensures the directory for bot_config.json exists.
+    Creates the directory if it doesn't exist.
+    """
+    directory = os.path.dirname(CONFIG_FILE)
+    if directory:
+        try:
+            os.makedirs(directory, exist_ok=True)
+            logger.debug(f"Ensured directory exists: {directory}")
+        except Exception as e:
+            logger.error(f"Failed to create directory {directory}: {e}")
+
+# save_config and the session/selection savers may run in a worker thread (asyncio.to_thread),
+# so writes are serialized and files are replaced atomically; loaders never see them half-written.
+CONFIG_WRITE_LOCK = threading.Lock()
+USER_FILES_LOCK = threading.Lock()
+
+def write_json_file(path: str, data, indent: int):
+    temp_file = f"{path}.tmp"
+    with open(temp_file, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=indent)
+    os.replace(temp_file, path)
+
+def save_config(config):
+    """
+    Saves the configuration to data/bot_config.json.
+    Ensures the directory exists before writing.
+    """
+    try:
+        with CONFIG_WRITE_LOCK:
+            write_json_file(CONFIG_FILE, config, indent=4)
+        logger.info(f"Configuration saved to {CONFIG_FILE}")
+        refresh_authorized_users(config)
+    except (IOError, PermissionError) as e:
+        logger.error(f"Failed to save {CONFIG_FILE}: {e}")
+
+# Updates of different users are handled concurrently, so a handler must not save a
+# config it loaded before an await: another handler may have changed it in between.
+# All load-modify-save cycles in handlers go through update_config instead.
+CONFIG_UPDATE_LOCK = asyncio.Lock()
+
+async def update_config(mutate) -> dict:
+    """
+    Loads the current config, applies mutate(config) and saves the result, all under
+    CONFIG_UPDATE_LOCK. mutate may return False to skip saving. Returns the config.
+    """
+    async with CONFIG_UPDATE_LOCK:
+        config = load_config()
+        if mutate(config) is not False:
+            await asyncio.to_thread(save_config, config)
+        return config
+
+def load_user_sessions():
+    try:
+        with open(USER_SESSIONS_FILE, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+def save_user_session(telegram_telegram_user_id: int, session_data: dict):
+    """Save a user's session data to a JSON file for Normal mode."""
+    try:
+        with USER_FILES_LOCK:
+            all_sessions = load_user_sessions()
+            all_sessions[str(telegram_telegram_user_id)] = session_data
+            write_json_file(USER_SESSIONS_FILE, all_sessions, indent=2)
+        logger.info(f"Saved session for Telegram user {telegram_telegram_user_id} to {USER_SESSIONS_FILE}")
+    except Exception as e:
+        logger.error(f"Failed to save session for Telegram user {telegram_telegram_user_id}: {e}")
+        raise  # Re-raise to catch in caller if needed
+
+def remove_user_session(telegram_user_id: int):
+    """Remove a user's session data from the JSON file (logout in Normal mode)."""
+    with USER_FILES_LOCK:
+        all_sessions = load_user_sessions()
+        if all_sessions.pop(str(telegram_user_id), None) is not None:
+            write_json_file(USER_SESSIONS_FILE, all_sessions, indent=2)
+    logger.info(f"Removed session for Telegram user {telegram_user_id}")
+
+def load_user_session(telegram_user_id: int) -> dict | None:
+    """Load a user's session data from the JSON file."""
+    try:
+        with open(USER_SESSIONS_FILE, "r", encoding="utf-8") as f:
+            all_sessions = json.load(f)
+            return all_sessions.get(str(telegram_user_id))
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+def load_shared_session():
+    try:
+        with open(SHARED_SESSION_FILE, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+def save_shared_session(session_data):
+    write_json_file(SHARED_SESSION_FILE, session_data, indent=2)
+    logger.info("Saved shared session")
+
+def clear_shared_session():
+    """Clear the shared session data."""
+    if os.path.exists(SHARED_SESSION_FILE):
+        os.remove(SHARED_SESSION_FILE)
+        logger.info("Cleared shared session")
+
+###############################################################################
+#                PERSISTENT USER SELECTION LOGIC (Overseerr user)
+###############################################################################
+def load_user_selections() -> dict:
+    """
+    Load a dict from user_selection.json:
+    {
+      "<telegram_telegram_user_id>": {
+        "userId": 10,
+        "userName": "Some Name"
+      },
+      ...
+    }
+    """
+    if not os.path.exists(USER_SELECTION_FILE):
+        logger.info("No user_selection.json found. Returning empty dictionary.")
+        return {}
+    try:
+        with open(USER_SELECTION_FILE, "r", encoding="utf-8") as f:
+            data = json.load(f)
+            logger.debug(f"Loaded user selections from {USER_SELECTION_FILE}: {data}")
+            return data
+    except (FileNotFoundError, json.JSONDecodeError):
+        logger.warning("user_selection.json not found or invalid. Returning empty dictionary.")
+        return {}
+
+def save_user_selection(telegram_telegram_user_id: int, telegram_user_id: int, user_name: str):
+    """
+    Store the user's Overseerr selection in user_selection.json:
+    {
+      "<telegram_telegram_user_id>": {
+        "userId": 10,
+        "userName": "DisplayName"
+      }
+    }
+    """
+    try:
+        with USER_FILES_LOCK:
+            data = load_user_selections()
+            data[str(telegram_telegram_user_id)] = {
+                "userId": telegram_user_id,
+                "userName": user_name
+            }
+            write_json_file(USER_SELECTION_FILE, data, indent=4)
+        logger.info(f"Saved user selection for Telegram user {telegram_telegram_user_id}: (Overseerr user {telegram_user_id})")
+    except Exception as e:
+        logger.error(f"Failed to save user selection: {e}")
+
+def get_saved_user_for_telegram_id(telegram_telegram_user_id: int):
+    """
+    Return (userId, userName) or (None, None) if not found.
+    """
+    data = load_user_selections()
+    entry = data.get(str(telegram_telegram_user_id))
+    if entry:
+        logger.info(f"Found saved user for Telegram user {telegram_telegram_user_id}: {entry}")
+        return entry["userId"], entry["userName"]
+    logger.info(f"No saved user found for Telegram user {telegram_telegram_user_id}.")
+    return None, None
+
+###############################################################################
+#                      OVERSEERR API: SHARED HTTP CLIENT
+###############################################################################
+# One AsyncClient is shared by all Overseerr (and GitHub) calls so connections are
+# kept alive between requests. It is created in post_init and closed in post_shutdown.
+# Authentication is passed per request (API key or the user's session cookie);
+# the client itself never stores cookies, so one user's session can't leak into
+# another user's request.
+http_client: Optional[httpx.AsyncClient] = None
+
+# Caps outgoing calls so a burst of users doesn't flood Overseerr; requests over
+# the limit wait for capacity instead of failing
+OVERSEERR_RATE_LIMIT = AsyncLimiter(10, 1)  # 10 requests per second
+
+async def wait_for_rate_limit(request: httpx.Request):
+    await OVERSEERR_RATE_LIMIT.acquire()
+
+def create_http_client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        event_hooks={"request": [wait_for_rate_limit]},
+        # Give up quickly on an unreachable Overseerr, allow slower responses once connected.
+        # With the single connect retry below an unreachable host fails after about 6 s.
+        timeout=httpx.Timeout(10, connect=3),
+        # Retries failed connection attempts only, so a request is never sent twice
+        transport=httpx.AsyncHTTPTransport(
+            retries=1,
+            # Uses HTTP/2 when Overseerr (or its reverse proxy) offers it over HTTPS
+            http2=True,
+            limits=httpx.Limits(max_connections=50, max_keepalive_connections=20, keepalive_expiry=30),
+        ),
+        # Passed as a plain CookieJar so httpx keeps this policy instead of copying
+        # the cookies into a default jar
+        cookies=CookieJar(policy=DefaultCookiePolicy(allowed_domains=[])),
+    )
+
+# Endpoints hit on every search and request, built once from the configured base URL
+OVERSEERR_SEARCH_URL = f"{OVERSEERR_API_URL}/search?query="
+OVERSEERR_REQUEST_URL = f"{OVERSEERR_API_URL}/request"
+
+# Headers for calls authenticated with the API key; shared by every such call and read-only
+API_KEY_HEADERS = MappingProxyType({"X-Api-Key": OVERSEERR_API_KEY})
+API_KEY_JSON_HEADERS = MappingProxyType({"X-Api-Key": OVERSEERR_API_KEY, "Content-Type": "application/json"})
+
+###############################################################################
+#                      OVERSEERR API: FETCH USERS
+###############################################################################
+# The Overseerr user list is small and rarely changes, so it is cached briefly
+# instead of being fetched on every media selection.
+OVERSEERR_USERS_CACHE_TTL = 30  # seconds
+overseerr_users_cache = {"fetched_at": 0.0, "users": [], "users_by_id": {}}
+
+async def get_overseerr_users():
+    """
+    Fetch all Overseerr users via /api/v1/user.
+    Results are cached for OVERSEERR_USERS_CACHE_TTL seconds.
+    Returns a list of users or an empty list on error.
+    """
+    if overseerr_users_cache["users"] and time.monotonic() - overseerr_users_cache["fetched_at"] < OVERSEERR_USERS_CACHE_TTL:
+        return overseerr_users_cache["users"]
+
+    try:
+        url = f"{OVERSEERR_API_URL}/user?take=256"
+        logger.info(f"Fetching Overseerr users from: {url}")
+        response = await http_client.get(
+            url,
+            headers=API_KEY_HEADERS,
+        )
+        response.raise_for_status()
+        data = orjson.loads(response.content)
+        results = data.get("results", [])
+        logger.info(f"Fetched {len(results)} Overseerr users.")
+        overseerr_users_cache["fetched_at"] = time.monotonic()
+        overseerr_users_cache["users"] = results
+        overseerr_users_cache["users_by_id"] = {u["id"]: u for u in results}
+        return results
+    except (httpx.HTTPError, ValueError) as e:
+        logger.error(f"Error fetching Overseerr users: {e}")
+        return []
+
+async def get_overseerr_user_by_id(overseerr_user_id: int) -> dict | None:
+    """
+    Look up a single Overseerr user by ID using the cached user list.
+    Returns the user dict or None if not found.
+    """
+    await get_overseerr_users()
+    return overseerr_users_cache["users_by_id"].get(overseerr_user_id)
+
+###############################################################################
+#                     OVERSEERR API: SEARCH
+###############################################################################
+# Repeated searches for the same title reuse the previous result for a while.
+# Cleared whenever a request succeeds, since that changes the media status.
+SEARCH_CACHE_TTL = 300  # seconds
+SEARCH_CACHE_MAX_ENTRIES = 512
+search_cache = {}  # normalized query -> (fetched_at, search result)
+
+async def search_media(media_name: str):
+    """
+    Search for media by title in Overseerr.
+    media_name is the joined command arguments, so it has no surrounding whitespace.
+    Returns the JSON result or None on error.
+    """
+    cache_key = media_name.casefold()
+    cached = search_cache.get(cache_key)
+    if cached and time.monotonic() - cached[0] < SEARCH_CACHE_TTL:
+        logger.info("Using cached search results for: %s", media_name)
+        return cached[1]
+
+    try:
+        logger.info("Searching for media: %s", media_name)
+        # Encoded once here: Overseerr rejects the "+" for spaces that params= would produce
+        url = OVERSEERR_SEARCH_URL + urllib.parse.quote(media_name, safe="")
+        response = await http_client.get(
+            url,
+            headers=API_KEY_HEADERS,
+        )
+        response.raise_for_status()
+        search_data = orjson.loads(response.content)
+    except httpx.TimeoutException:
+        # Raised to the caller so the user is told Overseerr is not responding
+        logger.warning("Media search timed out: %s", media_name)
+        raise
+    except (httpx.HTTPError, ValueError) as e:
+        logger.error("Error during media search: %s", e)
+        return None
+
+    # Drop the oldest entry once full (dicts keep insertion order)
+    search_cache.pop(cache_key, None)
+    if len(search_cache) >= SEARCH_CACHE_MAX_ENTRIES:
+        search_cache.pop(next(iter(search_cache)))
+    search_cache[cache_key] = (time.monotonic(), search_data)
+    return search_data
+
+async def get_tv_details(media_id: int, session_cookie: Optional[str] = None):
+    """
+    Get tv details by id from Overseerr.
+    Uses the session cookie if given, otherwise the API key.
+    Returns the JSON result or None on error.
+    """
+    if session_cookie:
+        headers = {"Cookie": f"connect.sid={session_cookie}"}
+    else:
+        headers = API_KEY_HEADERS
+    try:
+        logger.info(f"Get seasons detail for _id: {media_id}")
+        url = f"{OVERSEERR_API_URL}/tv/{media_id}"
+        response = await http_client.get(url, headers=headers)
+        response.raise_for_status()
+        return orjson.loads(response.content)
+    except (httpx.HTTPError, ValueError) as e:
+        logger.error(f"Error during media search: {e}")
+        return None        
+
+def process_search_results(results: list):
+    """
+    Process Overseerr search results into a simplified list of dicts.
+    Each dict contains relevant fields (title, year, mediaType, etc.).
+    """
+    processed_results = []
+    for result in results:
+        # Search also returns people, which can't be requested
+        if result["mediaType"] not in ("movie", "tv"):
+            continue
+
+        media_title = (
+            result.get("name")
+            or result.get("originalName")
+            or result.get("title")
+            or "Unknown Title"
+        )
+
+        date_key = "firstAirDate" if result["mediaType"] == "tv" else "releaseDate"
+        date_str = result.get(date_key, "")  # e.g. "2024-05-12"
+
+        # Extract just the year from the date (if it exists)
+        media_year = date_str.split("-")[0] if "-" in date_str else "Unknown Year"
+
+        # Media nobody has requested yet comes without mediaInfo
+        media_info = result.get("mediaInfo")
+        if media_info:
+            overseerr_media_id = media_info.get("id")
+            hd_status = media_info.get("status", STATUS_UNKNOWN)
+            uhd_status = media_info.get("status4k", STATUS_UNKNOWN)
+        else:
+            overseerr_media_id = None
+            hd_status = uhd_status = STATUS_UNKNOWN
+
+        processed_results.append({
+            "title": media_title,
+            "year": media_year,
+            "id": result["id"],  # usually the TMDb ID
+            "mediaType": result["mediaType"],
+            "poster": result.get("posterPath"),
+            "description": result.get("overview", "No description available"),
+            "overseerr_id": overseerr_media_id,
+            "status_hd": hd_status,
+            "status_4k": uhd_status
+        })
+
+    logger.info("Processed %d of %d search results.", len(processed_results), len(results))
+    return processed_results
+
+def store_search_results(user_data: dict, processed_results: list):
+    """
+    Replaces any previous search in user_data with processed_results and the
+    indexes the callback handlers look results up in. No I/O.
+    """
+    clear_search_state(user_data)
+    user_data["search_results"] = processed_results
+    # Reversed so the first match wins on duplicate IDs
+    user_data["search_results_by_id"] = {r["id"]: r for r in reversed(processed_results)}
+    user_data["search_results_by_overseerr_id"] = {
+        r["overseerr_id"]: r for r in reversed(processed_results) if r["overseerr_id"]
+    }
+    user_data["total_results"] = len(processed_results)
+    user_data["rendered_pages"] = {}
+
+async def overseerr_login(email: str, password: str) -> str | None:
+    """Führt einen Login über die Overseerr-API aus und gibt den Session-Cookie zurück."""
+    url = f"{OVERSEERR_API_URL}/auth/local"
+    payload = {"email": email, "password": password}
+    try:
+        response = await http_client.post(
+            url,
+            headers={"Content-Type": "application/json"},
+            content=orjson.dumps(payload),
+        )
+        response.raise_for_status()
+        cookie = response.cookies.get("connect.sid")
+        logger.info(f"Login erfolgreich für {email}")
+        return cookie
+    except httpx.HTTPError as e:
+        logger.error(f"Login fehlgeschlagen für {email}: {e}")
+        return None
+
+async def overseerr_logout(session_cookie: str) -> bool:
+    """Führt einen Logout über die Overseerr-API aus."""
+    url = f"{OVERSEERR_API_URL}/auth/logout"
+    try:
+        response = await http_client.post(
+            url,
+            headers={"Cookie": f"connect.sid={session_cookie}"},
+        )
+        response.raise_for_status()
+        logger.info("Logout erfolgreich")
+        return True
+    except httpx.HTTPError as e:
+        logger.error(f"Logout fehlgeschlagen: {e}")
+        return False
+
+async def check_session_validity(session_cookie: str) -> bool:
+    """Prüft, ob der Session-Cookie gültig ist, indem eine einfache API-Anfrage gestellt wird."""
+    url = f"{OVERSEERR_API_URL}/auth/me"
+    try:
+        response = await http_client.get(
+            url,
+            headers={"Cookie": f"connect.sid={session_cookie}"},
+            timeout=5
+        )
+        response.raise_for_status()
+        return True
+    except httpx.HTTPError:
+        return False
+
+###############################################################################
+#              OVERSEERR API: REQUEST & ISSUE CREATION
+###############################################################################
+async def request_media(media_id: int, media_type: str, season_index: str, requested_by: int = None, is4k: bool = False, session_cookie: str = None) -> tuple[bool, str]:
+    payload = {"mediaType": media_type, "mediaId": media_id, "is4k": is4k}
+    if requested_by is not None:  # Only in API Mode
+        payload["userId"] = requested_by
+    
+    if media_type == "tv":
+        payload["seasons"] = "all" if season_index == "all" else [int(season_index)]
+
+    if session_cookie:
+        headers = {"Content-Type": "application/json", "Cookie": f"connect.sid={session_cookie}"}
+    elif CURRENT_MODE == BotMode.API:
+        headers = API_KEY_JSON_HEADERS
+    else:
+        return False, "No authentication provided."
+
+    try:
+        response = await http_client.post(OVERSEERR_REQUEST_URL, content=orjson.dumps(payload), headers=headers)
+        logger.info(f"Request response: Status {response.status_code}, Body: {response.text}")
+        # Overseerr answers 201 for new requests, but 200/202 are successes too
+        if response.status_code in (200, 201, 202):
+            search_cache.clear()
+            return True, "Request successful"
+        return False, f"Failed: {response.status_code} - {response.text}"
+    except httpx.TimeoutException:
+        logger.warning(f"Request for mediaId {media_id} timed out")
+        return False, "Overseerr did not respond in time."
+    except httpx.HTTPError as e:
+        logger.error(f"Request failed: {e}")
+        return False, f"Error: {str(e)}"
+
+async def create_issue(media_id: int, media_type: str, issue_description: str, issue_type: int, telegram_user_id: int = None, session_cookie: str = None) -> bool:
+    """
+    Create an issue on Overseerr via the API.
+    Uses session cookies in NORMAL or SHARED mode, or the API key in ADMIN mode.
+    
+    Args:
+        media_id (int): The Overseerr media ID.
+        media_type (str): 'movie' or 'tv'.
+        issue_description (str): Description of the issue.
+        issue_type (int): Type of issue (1=Video, 2=Audio, 3=Subtitle, 4=Other).
+        telegram_user_id (int, optional): Overseerr user ID reporting the issue.
+        session_cookie (str, optional): Session cookie for authentication in NORMAL/SHARED modes.
+    
+    Returns:
+        bool: True if the issue was created successfully, False otherwise.
+    """
+    # Prepare the payload for the API request
+    payload = {
+        "mediaId": media_id,
+        "mediaType": media_type,
+        "issueType": issue_type,
+        "message": issue_description,
+    }
+    if telegram_user_id is not None:
+        payload["userId"] = telegram_user_id
+
+    # Log the payload being sent
+    logger.info(f"Sending issue payload to Overseerr: {payload}")
+
+    # Set up headers based on the current mode
+    headers = {"Content-Type": "application/json"}
+    if session_cookie and CURRENT_MODE != BotMode.ADMIN:
+        headers["Cookie"] = f"connect.sid={session_cookie}"
+    else:
+        headers["X-Api-Key"] = OVERSEERR_API_KEY
+
+    # Send the POST request to create the issue
+    try:
+        response = await http_client.post(
+            f"{OVERSEERR_API_URL}/issue",
+            headers=headers,
+            content=orjson.dumps(payload),
+        )
+        response.raise_for_status()
+        logger.info(f"Issue creation successful for mediaId {media_id}.")
+        return True
+    except httpx.HTTPStatusError as e:
+        logger.error(f"Error during issue creation: {e}")
+        logger.error(f"Response content: {e.response.text}")
+        return False
+    except httpx.HTTPError as e:
+        logger.error(f"Error during issue creation: {e}")
+        return False
+
+###############################################################################
+#          get_latest_version_from_github: CHECK FOR UPDATES (OPTIONAL)
+###############################################################################
+async def get_latest_version_from_github():
+    """
+    Check GitHub releases to find the latest version name (if any).
+    Returns a string like 'v2.4.0' or an empty string on error.
+    """
+    try:
+        response = await http_client.get(
+            "https://api.github.com/repos/LetsGoDude/OverseerrRequestViaTelegramBot/releases/latest"
+        )
+        response.raise_for_status()
+        data = orjson.loads(response.content)
+        latest_version = data.get("tag_name", "")
+        return latest_version
+    except (httpx.HTTPError, ValueError) as e:
+        logger.warning(f"Failed to check latest version on GitHub: {e}")
+        return ""
+
+###############################################################################
+#            user_data_loader: RUNS BEFORE OTHER HANDLERS (group=-999)
+###############################################################################
+async def user_data_loader(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """
+    Load user data, including session data and user selections, at the start of each update.
+    Ensures overseerr_telegram_user_id is available across restarts.
+    """
+    # Runs for every message and button press, so the files are only read until the
+    # user's Overseerr identity is known (/settings, login and logout refresh it)
+    if not update.effective_user or "overseerr_telegram_user_id" in context.user_data:
+        return
+    telegram_telegram_user_id = update.effective_user.id
+    logger.info(f"Loading user data for Telegram user {telegram_telegram_user_id} in mode {CURRENT_MODE.value}")
+
+    # Normal mode: Load session data
+    if CURRENT_MODE == BotMode.NORMAL:
+        session_data = await asyncio.to_thread(load_user_session, telegram_telegram_user_id)
+        if session_data and "cookie" in session_data:
+            context.user_data["session_data"] = session_data
+            context.user_data["overseerr_telegram_user_id"] = session_data["overseerr_telegram_user_id"]
+            context.user_data["overseerr_user_name"] = session_data.get("overseerr_user_name", "Unknown")
+            logger.info(f"Loaded Normal mode session for user {telegram_telegram_user_id}: {session_data['overseerr_telegram_user_id']}")
+
+    # API mode: Load user selection
+    elif CURRENT_MODE == BotMode.API:
+        overseerr_telegram_user_id, overseerr_user_name = await asyncio.to_thread(get_saved_user_for_telegram_id, telegram_telegram_user_id)
+        if overseerr_telegram_user_id:
+            context.user_data["overseerr_telegram_user_id"] = overseerr_telegram_user_id
+            context.user_data["overseerr_user_name"] = overseerr_user_name
+            logger.info(f"Loaded API mode user selection for {telegram_telegram_user_id}: {overseerr_telegram_user_id} ({overseerr_user_name})")
+
+    # Shared mode: Load shared session (global)
+    elif CURRENT_MODE == BotMode.SHARED:
+        shared_session = await asyncio.to_thread(load_shared_session)
+        if shared_session and "cookie" in shared_session:
+            context.application.bot_data["shared_session"] = shared_session
+            context.user_data["overseerr_telegram_user_id"] = shared_session["overseerr_telegram_user_id"]
+            context.user_data["overseerr_user_name"] = shared_session.get("overseerr_user_name", "Shared User")
+            logger.info(f"Loaded Shared mode session for user {telegram_telegram_user_id}: {shared_session['overseerr_telegram_user_id']}")
+
+async def get_global_telegram_notifications():
+    """
+    Retrieves the current global Telegram notification settings from Overseerr.
+    Returns a dictionary with the settings or None on error.
+    """
+    try:
+        url = f"{OVERSEERR_API_URL}/settings/notifications/telegram"
+        response = await http_client.get(url, headers=API_KEY_HEADERS)
+        response.raise_for_status()
+        settings = orjson.loads(response.content)
+        logger.info(f"Current Global Telegram notification settings: {settings}")
+        return settings
+    except (httpx.HTTPError, ValueError) as e:
+        logger.error(f"Error when retrieving Telegram notification settings: {e}")
+        return None
+
+async def set_global_telegram_notifications(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """
+    Activates the global Telegram notifications in Overseerr.
+    Returns True if successful, otherwise False.
+    """
+
+    bot_info = await context.bot.get_me()
+    chat_id = str(update.effective_chat.id)
+
+    payload = {
+        "enabled": True,
+        "types": 1,  # Disable all notification types (except silent)
+        "options": {
+            "botUsername": bot_info.username,  # Botname
+            "botAPI": TELEGRAM_TOKEN,          # Telegram Token
+            "chatId": chat_id,                 # Chat-ID - i guess the admin will use the bot first?
+            "sendSilently": True
+        }
+    }
+    try:
+        url = f"{OVERSEERR_API_URL}/settings/notifications/telegram"
+        response = await http_client.post(url, headers=API_KEY_JSON_HEADERS, content=orjson.dumps(payload))
+        response.raise_for_status()
+        logger.info("Global Telegram notifications have been successfully activated.")
+        return True
+    except httpx.HTTPStatusError as e:
+        logger.error(f"Error when activating global Telegram notifications: {e}")
+        logger.error(f"Response content: {e.response.text}")
+        return False
+    except httpx.HTTPError as e:
+        logger.error(f"Error when activating global Telegram notifications: {e}")
+        return False
+
+# Fetched once at startup in post_init
+GLOBAL_TELEGRAM_NOTIFICATION_STATUS = None
+
+async def enable_global_telegram_notifications(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """
+    Activates global Telegram notifications
+    """
+    if GLOBAL_TELEGRAM_NOTIFICATION_STATUS:
+        enabled = GLOBAL_TELEGRAM_NOTIFICATION_STATUS.get("enabled", False)
+        if enabled:
+
+            logger.info("Global Telegram notifications are activated.")
+        else:
+            logger.info("Activate global Telegram notifications...")
+            await set_global_telegram_notifications(update, context)
+    else:
+        logger.error("Could not retrieve Global Telegram notification settings.")
+
+async def start_login(update_or_query: Update | CallbackQuery, context: ContextTypes.DEFAULT_TYPE):
+    """Initiates login, deleting the settings menu and cleaning up prompts."""
+    if isinstance(update_or_query, Update):
+        telegram_user_id = update_or_query.effective_user.id
+        message = update_or_query.message
+    else:  # CallbackQuery
+        telegram_user_id = update_or_query.from_user.id
+        message = update_or_query.message
+
+    logger.info(f"User {telegram_user_id} started login process.")
+
+    # Check mode restrictions
+    if CURRENT_MODE == BotMode.API:
+        await message.reply_text("In API Mode, no login is required.")
+        return
+
+    if CURRENT_MODE == BotMode.SHARED:
+        config = load_config()
+        user_id_str = str(telegram_user_id)
+        user = config["users"].get(user_id_str, {})
+        if not user.get("is_admin", False):
+            await message.reply_text("In Shared Mode, only admins can log in.")
+            return
+
+    # Delete the settings menu if this is a callback query
+    if isinstance(update_or_query, CallbackQuery):
+        try:
+            await message.delete()
+            logger.info(f"Deleted settings menu message for user {telegram_user_id} during login.")
+        except Exception as e:
+            logger.warning(f"Failed to delete settings menu message: {e}")
+
+    # Set login state and prompt for email
+    context.user_data["pending_flow"] = PendingFlow.LOGIN_EMAIL
+    msg = await context.bot.send_message(
+        chat_id=message.chat_id,
+        text="Please enter your Overseerr email address:"
+    )
+    context.user_data["login_message_id"] = msg.message_id
+
+async def handle_issue_description_input(update: Update, context: ContextTypes.DEFAULT_TYPE, text: str, config: dict, user: dict):
+    """
+    Files the issue typed by the user against the currently selected media.
+    """
+    user_data = context.user_data
+    reporting_issue = user_data['reporting_issue']
+    issue_type_id = reporting_issue['issue_type']
+
+    selected_result = user_data.get('selected_result')
+    if not selected_result:
+        logger.error("No selected_result found while reporting an issue.")
+        # End the flow, otherwise every later text message would land here again
+        user_data.pop('pending_flow', None)
+        user_data.pop('reporting_issue', None)
+        await update.message.reply_text(
+            "An error occurred. Please try reporting the issue again.",
+            parse_mode="Markdown",
+        )
+        return
+
+    media_id = selected_result.get('overseerr_id')
+    media_title = selected_result['title']
+    media_type = selected_result['mediaType']
+
+    telegram_user_id_for_issue = user_data.get("overseerr_telegram_user_id")
+    user_display_name = user_data.get("overseerr_user_name", "Unknown User")
+    logger.info(
+        f"User {update.effective_user.id} is reporting an issue on mediaId {media_id} "
+        f"as Overseerr user {telegram_user_id_for_issue}."
+    )
+
+    final_issue_description = f"(Reported by {user_display_name})\n\n{text}"
+
+    success = await create_issue(
+        media_id=media_id,
+        media_type=media_type,
+        issue_description=final_issue_description,
+        issue_type=issue_type_id,
+        telegram_user_id=telegram_user_id_for_issue
+    )
+
+    if success:
+        reply_text = f"✅ Thank you! Your issue with *{media_title}* has been successfully reported."
+    else:
+        reply_text = f"❌ Failed to report the issue with *{media_title}*. Please try again later."
+
+    # Reply and remove the media card at the same time
+    user_data.pop('pending_flow', None)
+    user_data.pop('reporting_issue', None)
+    media_message_id = user_data.pop('media_message_id', None)
+    await asyncio.gather(
+        update.message.reply_text(reply_text, parse_mode="Markdown"),
+        delete_message_quietly(context, update.message.chat_id, media_message_id),
+    )
+
+    user_data.pop('selected_result', None)
+
+async def handle_password_input(update: Update, context: ContextTypes.DEFAULT_TYPE, text: str, config: dict, user: dict):
+    """
+    Checks the bot password and authorizes the user when it matches.
+    """
+    telegram_user_id = update.effective_user.id
+    chat_id = update.effective_chat.id
+    message_thread_id = getattr(update.message, "message_thread_id", None)
+
+    logger.info(f"Comparing input '{text}' with PASSWORD '{PASSWORD}'")
+    if text == PASSWORD:
+        user_id_str = str(telegram_user_id)
+
+        def authorize(config):
+            current = config["users"].get(user_id_str, {})
+            if current.get("is_authorized", False):
+                return False
+            config["users"][user_id_str] = {
+                "username": update.effective_user.username or update.effective_user.full_name,
+                "is_authorized": True,
+                "is_blocked": False,
+                "is_admin": current.get("is_admin", False),
+                "created_at": datetime.now(timezone.utc).isoformat() + "Z"
+            }
+            logger.info(f"User {telegram_user_id} added to users with authorized status")
+
+        config = await update_config(authorize)
+        is_admin = config["users"][user_id_str].get("is_admin", False)
+        context.user_data.pop("pending_flow", None)
+        await asyncio.gather(
+            send_message(context, chat_id, "✅ *Access granted!* Let’s get started...", message_thread_id=message_thread_id),
+            context.bot.delete_message(chat_id=chat_id, message_id=update.message.message_id),
+        )
+        await start_command(update, context)
+        if not is_admin and CURRENT_MODE == BotMode.API:
+            await handle_change_user(update, context, is_initial=True)
+    else:
+        await asyncio.gather(
+            send_message(context, chat_id, "❌ *Oops!* That’s not the right password. Try again:", message_thread_id=message_thread_id),
+            context.bot.delete_message(chat_id=chat_id, message_id=update.message.message_id),
+        )
+
+async def handle_login_input(update: Update, context: ContextTypes.DEFAULT_TYPE, text: str, config: dict, user: dict):
+    """
+    Walks the user through the Overseerr email/password login.
+    """
+    telegram_user_id = update.effective_user.id
+    chat_id = update.effective_chat.id
+    message_thread_id = getattr(update.message, "message_thread_id", None)
+    user_data = context.user_data
+
+    # Ignore non-command text input if Group Mode restricts this chat/thread
+    if not is_command_allowed(chat_id, message_thread_id, config, telegram_user_id):
+        logger.info(f"Ignoring text input in chat {chat_id}, thread {message_thread_id}: Group Mode restricts to primary")
+        return
+
+    # Delete previous prompt and user input
+    if "login_message_id" in user_data:
+        try:
+            await context.bot.delete_message(chat_id, user_data["login_message_id"])
+        except Exception as e:
+            logger.warning(f"Failed to delete login prompt message: {e}")
+    try:
+        await context.bot.delete_message(chat_id, update.message.message_id)
+    except Exception as e:
+        logger.warning(f"Failed to delete user input message: {e}")
+
+    is_admin = user.get("is_admin", False)
+
+    if user_data["pending_flow"] is PendingFlow.LOGIN_EMAIL:
+        user_data["login_email"] = text
+        user_data["pending_flow"] = PendingFlow.LOGIN_PASSWORD
+        msg = await context.bot.send_message(chat_id, "Please enter your Overseerr password:")
+        user_data["login_message_id"] = msg.message_id
+        return
+
+    email = user_data["login_email"]
+    password = text
+    session_cookie = await overseerr_login(email, password)
+    if session_cookie:
+        credentials = base64.b64encode(f"{email}:{password}".encode()).decode()
+        response = await http_client.get(
+            f"{OVERSEERR_API_URL}/auth/me",
+            headers={"Cookie": f"connect.sid={session_cookie}"}
+        )
+        user_info = orjson.loads(response.content)
+        overseerr_id = user_info.get("id")
+        if not overseerr_id:
+            await context.bot.send_message(chat_id, "❌ Login failed: Invalid user data.")
+            await show_settings_menu(update, context, is_admin=is_admin)
+            return
+
+        session_data = {
+            "cookie": session_cookie,
+            "credentials": credentials,
+            "overseerr_telegram_user_id": overseerr_id,
+            "overseerr_user_name": user_info.get("displayName", "Unknown")
+        }
+        user_data["session_data"] = session_data
+
+        if CURRENT_MODE == BotMode.NORMAL:
+            await asyncio.to_thread(save_user_session, telegram_user_id, session_data)
+        elif CURRENT_MODE == BotMode.SHARED and is_admin:
+            await asyncio.to_thread(save_shared_session, session_data)
+            context.application.bot_data["shared_session"] = session_data
+
+        await context.bot.send_message(
+            chat_id,
+            f"✅ Logged in as {user_info.get('displayName', 'Unknown')}!"
+        )
+    else:
+        await context.bot.send_message(chat_id, "❌ Login failed. Check your credentials.")
+
+    user_data.pop("pending_flow", None)
+    user_data.pop("login_email", None)
+    user_data.pop("login_message_id", None)
+    await show_settings_menu(update, context, is_admin=is_admin)
+
+# Text input handler for each pending flow
+TEXT_INPUT_FLOWS = {
+    PendingFlow.PASSWORD: handle_password_input,
+    PendingFlow.ISSUE_DESCRIPTION: handle_issue_description_input,
+    PendingFlow.LOGIN_EMAIL: handle_login_input,
+    PendingFlow.LOGIN_PASSWORD: handle_login_input,
+}
+
+async def handle_text_input(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """
+    Handles text input from users, including password authentication and issue reporting.
+    """
+    telegram_user_id = update.effective_user.id
+    chat_id = update.effective_chat.id
+    message_thread_id = getattr(update.message, "message_thread_id", None)
+    text = update.message.text
+    pending_flow = context.user_data.get("pending_flow")
+    logger.info(f"Text input from {telegram_user_id}: {text}, pending_flow: {pending_flow}, chat {chat_id}, thread {message_thread_id}")
+
+    config = load_config()
+    user_id_str = str(telegram_user_id)
+    user = config["users"].get(user_id_str, {})
+
+    # Update username if necessary
+    username = update.effective_user.username or update.effective_user.full_name
+    # A not yet authorized user entering the right password is saved once by handle_password_input
+    authorizing_now = pending_flow is PendingFlow.PASSWORD and text == PASSWORD and not user.get("is_authorized", False)
+    if user.get("username") != username and not authorizing_now:
+        def set_username(config):
+            current = config["users"].get(user_id_str, {})
+            config["users"][user_id_str] = {
+                "username": username,
+                "is_authorized": current.get("is_authorized", False),
+                "is_blocked": current.get("is_blocked", False),
+                "is_admin": current.get("is_admin", False),
+                "created_at": current.get("created_at", datetime.now(timezone.utc).isoformat() + "Z")
+            }
+
+        config = await update_config(set_username)
+        user = config["users"][user_id_str]
+
+    flow_handler = TEXT_INPUT_FLOWS.get(pending_flow)
+    if flow_handler:
+        await flow_handler(update, context, text, config, user)
+        return
+
+    # Ignore non-command text input if Group Mode restricts this chat/thread
+    if not is_command_allowed(chat_id, message_thread_id, config, telegram_user_id):
+        logger.info(f"Ignoring text input in chat {chat_id}, thread {message_thread_id}: Group Mode restricts to primary")
+        return
+
+    # Fallback für nicht erkannte Eingaben
+    logger.info(f"User {telegram_user_id} typed something unrecognized: {text}")
+    await update.message.reply_text(
+        "I didn't understand that. Please use /start to see the available commands."
+    )
+
+async def show_user_management_menu(update_or_query, context: ContextTypes.DEFAULT_TYPE, offset=0):
+    """
+    Displays the user management menu with pagination within the settings menu, including an option to create a new user.
+    """
+    config = load_config()
+    if isinstance(update_or_query, Update):
+        telegram_user_id = update_or_query.effective_user.id
+        chat_id = update_or_query.effective_chat.id
+        message_thread_id = getattr(update_or_query.message, "message_thread_id", None)
+    else:
+        telegram_user_id = update_or_query.from_user.id
+        chat_id = update_or_query.message.chat_id
+        message_thread_id = getattr(update_or_query.message, "message_thread_id", None)
+
+    user_id_str = str(telegram_user_id)
+    if not config["users"].get(user_id_str, {}).get("is_admin", False):
+        await send_message(context, chat_id, "❌ Only admins can manage users.", message_thread_id=message_thread_id)
+        return
+
+    users = [
+        {
+            "telegram_id": uid,
+            "username": details.get("username", "Unknown"),
+            "is_admin": details.get("is_admin", False),
+            "is_blocked": details.get("is_blocked", False)
+        }
+        for uid, details in config["users"].items()
+    ]
+
+    if not users:
+        text = "👥 *User Management*\n\nNo users found."
+        reply_markup = NO_USERS_MARKUP
+        if isinstance(update_or_query, Update):
+            await send_message(context, chat_id, text, reply_markup=reply_markup, message_thread_id=message_thread_id)
+        else:
+            await update_or_query.edit_message_text(text, parse_mode="Markdown", reply_markup=reply_markup)
+        return
+
+    page_size = 5
+    total_users = len(users)
+    current_users = users[offset:offset + page_size]
+
+    text = "👥 *User Management*\n\nSelect a user to manage:\n"
+    keyboard = []
+    for user in current_users:
+        status = "🚫 Blocked" if user["is_blocked"] else "👑 Admin" if user["is_admin"] else "✅ User"
+        button_text = f"{user['username']} (ID: {user['telegram_id']}) - {status}"
+        keyboard.append([InlineKeyboardButton(button_text, callback_data=f"manage_user_{user['telegram_id']}")])
+
+    keyboard.append([InlineKeyboardButton("➕ Create new Overseerr User", callback_data="create_user")])
+
+    navigation_buttons = []
+    if offset > 0:
+        navigation_buttons.append(InlineKeyboardButton("⬅️ Back", callback_data=f"users_page_{offset - page_size}"))
+    if offset + page_size < total_users:
+        navigation_buttons.append(InlineKeyboardButton("➡️ More", callback_data=f"users_page_{offset + page_size}"))
+    navigation_buttons.append(InlineKeyboardButton("⬅️ Back to Settings", callback_data="back_to_settings"))
+    keyboard.append(navigation_buttons)
+
+    reply_markup = InlineKeyboardMarkup(keyboard)
+
+    if isinstance(update_or_query, Update):
+        await send_message(context, chat_id, text, reply_markup=reply_markup, message_thread_id=message_thread_id)
+    else:
+        await update_or_query.edit_message_text(text, parse_mode="Markdown", reply_markup=reply_markup)
+
+async def manage_specific_user(query: CallbackQuery, context: ContextTypes.DEFAULT_TYPE, telegram_id: str):
+    """
+    Manages a specific user (block, unblock, promote, demote).
+    """
+    config = load_config()
+    telegram_user_id = query.from_user.id
+    chat_id = query.message.chat_id
+    message_thread_id = getattr(query.message, "message_thread_id", None)
+
+    user_id_str = str(telegram_user_id)
+    if not config["users"].get(user_id_str, {}).get("is_admin", False):
+        await query.edit_message_text("❌ Only admins can manage users.")
+        return
+
+    user = config["users"].get(telegram_id, {})
+    username = user.get("username", "Unknown")
+    is_admin = user.get("is_admin", False)
+    is_blocked = user.get("is_blocked", False)
+
+    text = (
+        f"👤 *Manage User: {username}*\n"
+        f"🆔 ID: {telegram_id}\n"
+        f"🔖 Status: {'Blocked' if is_blocked else 'Admin' if is_admin else 'User'}\n\n"
+        "Choose an action:"
+    )
+
+    keyboard = []
+    if is_blocked:
+        keyboard.append([InlineKeyboardButton("✅ Unblock User", callback_data=f"unblock_user_{telegram_id}")])
+    else:
+        keyboard.append([InlineKeyboardButton("🚫 Block User", callback_data=f"block_user_{telegram_id}")])
+    if is_admin and telegram_id != user_id_str:
+        keyboard.append([InlineKeyboardButton("👇 Demote to User", callback_data=f"demote_user_{telegram_id}")])
+    elif not is_admin and not is_blocked:
+        keyboard.append([InlineKeyboardButton("👑 Promote to Admin", callback_data=f"promote_user_{telegram_id}")])
+    keyboard.append([InlineKeyboardButton("⬅️ Back to User List", callback_data="manage_users")])
+
+    reply_markup = InlineKeyboardMarkup(keyboard)
+    await query.edit_message_text(text, parse_mode="Markdown", reply_markup=reply_markup)
+
+###############################################################################
+#                           BOT COMMAND HANDLERS
+###############################################################################
+async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """
+    /start command. Shows a welcome message and sets the primary chat/thread if Group Mode is enabled.
+    """
+    telegram_user_id = update.effective_user.id
+    chat_id = update.effective_chat.id
+    message_thread_id = getattr(update.message, "message_thread_id", None)
+    logger.info(f"User {telegram_user_id} executed /start in chat {chat_id}, thread {message_thread_id}")
+
+    config = load_config()
+
+    # Check if command is allowed
+    if not is_command_allowed(chat_id, message_thread_id, config, telegram_user_id):
+        return
+
+    # Handle unauthorized users
+    if PASSWORD and not user_is_authorized(telegram_user_id):
+        logger.info(f"User {telegram_user_id} is not authorized. Requesting password.")
+        await send_message(
+            context,
+            chat_id,
+            "👋 *Welcome!* Please enter the bot’s password to get started:",
+            message_thread_id=message_thread_id
+        )
+        context.user_data["pending_flow"] = PendingFlow.PASSWORD
+        logger.info(f"Awaiting password from user {telegram_user_id}")
+        return
+
+    user_id_str = str(telegram_user_id)
+
+    def claim_chat_and_admin(config):
+        changed = False
+        # Set primary_chat_id only if Group Mode is enabled
+        if config["group_mode"]:
+            config["primary_chat_id"] = {
+                "chat_id": chat_id,
+                "message_thread_id": message_thread_id
+            }
+            logger.info(f"Set primary_chat_id to chat {chat_id}, thread {message_thread_id} in {CONFIG_FILE}")
+            changed = True
+
+        # Set first user as admin if no admin exists
+        if not any(user.get("is_admin", False) for user in config["users"].values()):
+            config["users"][user_id_str] = {
+                "username": update.effective_user.username or update.effective_user.full_name,
+                "is_authorized": True,
+                "is_blocked": False,
+                "is_admin": True,
+                "created_at": datetime.now(timezone.utc).isoformat() + "Z"
+            }
+            logger.info(f"Set user {telegram_user_id} as admin")
+            changed = True
+        return changed
+
+    config = await update_config(claim_chat_and_admin)
+
+    await enable_global_telegram_notifications(update, context)
+
+    # Version check
+    latest_version = await get_latest_version_from_github()
+    newer_version_text = ""
+    if latest_version:
+        latest_stripped = latest_version.strip().lstrip("v")
+        if latest_stripped > VERSION:
+            newer_version_text = f"\n🔔 A new version ({latest_version}) is available!"
+        else:
+            logger.info(f"Current version {VERSION} is up to date or newer than {latest_version}")
+
+    # Base welcome message
+    start_message = f"{START_MESSAGE_HEADER}{newer_version_text}{START_MESSAGE_BODY}"
+
+    # Add login prompt only for non-admins in Normal mode
+    reply_markup = None
+    user = config["users"].get(user_id_str, {})
+    is_admin = user.get("is_admin", False)
+    if CURRENT_MODE == BotMode.NORMAL and not is_admin and "session_data" not in context.user_data:
+        start_message += START_LOGIN_REQUIRED_TEXT
+        reply_markup = LOGIN_MARKUP
+
+    await send_message(context, chat_id, start_message, reply_markup=reply_markup, message_thread_id=message_thread_id)
+
+########################################################################
+#                 UNIFIED SETTINGS MENU FUNCTION
+########################################################################
+async def show_settings_menu(update_or_query, context: ContextTypes.DEFAULT_TYPE, is_admin=False):
+    """
+    Displays the settings menu tailored for users or admins with conditional buttons.
+    In Shared mode, only the admin can access settings. Manage Notifications button is only shown if an Overseerr user is selected.
+    """
+    if isinstance(update_or_query, Update):
+        telegram_user_id = update_or_query.effective_user.id
+        chat_id = update_or_query.effective_chat.id
+        message_thread_id = getattr(update_or_query.message, "message_thread_id", None)
+    elif isinstance(update_or_query, CallbackQuery):
+        telegram_user_id = update_or_query.from_user.id
+        chat_id = update_or_query.message.chat_id
+        message_thread_id = getattr(update_or_query.message, "message_thread_id", None)
+    else:
+        logger.error("Invalid argument type passed to show_settings_menu")
+        return
+
+    config = load_config()
+
+    # Check if command/query is allowed
+    if not is_command_allowed(chat_id, message_thread_id, config, telegram_user_id):
+        return
+
+    user_id_str = str(telegram_user_id)
+    user = config["users"].get(user_id_str, {})
+    is_admin = user.get("is_admin", False)
+
+    # In Shared mode, only the admin can access settings
+    if CURRENT_MODE == BotMode.SHARED and not is_admin:
+        logger.info(f"Non-admin {telegram_user_id} attempted to access settings in Shared mode; ignoring.")
+        return
+
+    # Restrict access if unauthorized
+    if PASSWORD and not user_is_authorized(telegram_user_id):
+        await send_message(
+            context,
+            chat_id,
+            "🔒 *Access Denied*\nPlease enter the bot’s password via /start to access settings.",
+            message_thread_id=message_thread_id
+        )
+        return
+
+    # Refresh user data based on CURRENT_MODE
+    context.user_data.pop("overseerr_telegram_user_id", None)
+    context.user_data.pop("overseerr_user_name", None)
+    context.user_data.pop("session_data", None)
+
+    if CURRENT_MODE == BotMode.NORMAL:
+        session_data = load_user_session(telegram_user_id)
+        if session_data and "cookie" in session_data:
+            context.user_data["session_data"] = session_data
+            context.user_data["overseerr_telegram_user_id"] = session_data["overseerr_telegram_user_id"]
+            context.user_data["overseerr_user_name"] = session_data.get("overseerr_user_name", "Unknown")
+            logger.info(f"Loaded Normal mode session for user {telegram_user_id}: {session_data['overseerr_telegram_user_id']}")
+    elif CURRENT_MODE == BotMode.API:
+        overseerr_telegram_user_id, overseerr_user_name = get_saved_user_for_telegram_id(telegram_user_id)
+        if overseerr_telegram_user_id:
+            context.user_data["overseerr_telegram_user_id"] = overseerr_telegram_user_id
+            context.user_data["overseerr_user_name"] = overseerr_user_name
+            logger.info(f"Loaded API mode user selection for {telegram_user_id}: {overseerr_telegram_user_id} ({overseerr_user_name})")
+    elif CURRENT_MODE == BotMode.SHARED:
+        shared_session = load_shared_session()
+        if shared_session and "cookie" in shared_session:
+            context.application.bot_data["shared_session"] = shared_session
+            context.user_data["overseerr_telegram_user_id"] = shared_session["overseerr_telegram_user_id"]
+            context.user_data["overseerr_user_name"] = shared_session.get("overseerr_user_name", "Shared User")
+            logger.info(f"Loaded Shared mode session for user {telegram_user_id}: {shared_session['overseerr_telegram_user_id']}")
+
+    # Get current Overseerr user info (if any)
+    overseerr_user_name = context.user_data.get("overseerr_user_name", "None selected")
+    overseerr_telegram_user_id = context.user_data.get("overseerr_telegram_user_id", "N/A")
+    user_info = f"{overseerr_user_name} ({overseerr_telegram_user_id}) ✅" if overseerr_telegram_user_id != "N/A" else "Not set ❌"
+
+    group_mode_status = "🟢 On" if config["group_mode"] else "🔴 Off"
+
+    if is_admin:
+        mode_symbols = {
+            BotMode.NORMAL: "🌟",
+            BotMode.API: "🔑",
+            BotMode.SHARED: "👥"
+        }
+        mode_symbol = mode_symbols.get(CURRENT_MODE, "❓")
+        text = (
+            "⚙️ *Admin Settings*\n\n"
+            f"🤖 *Bot Mode:* {mode_symbol} *{CURRENT_MODE.value.capitalize()}*\n"
+            f"👤 *Current User:* {user_info}\n"
+            f"👥 *Group Mode:* {group_mode_status}\n\n"
+            "Select an option below to manage your settings:\n"
+        )
+    else:
+        text = (
+            "⚙️ *Settings - Current User:*\n\n"
+            f"👤 {user_info}\n\n"
+            "Select an option below to manage your settings:\n"
+        )
+
+    keyboard = []
+    account_buttons = []
+    if CURRENT_MODE == BotMode.API:
+        account_buttons.append(InlineKeyboardButton("🔄 Change User", callback_data="change_user"))
+    elif CURRENT_MODE == BotMode.NORMAL:
+        if context.user_data.get("session_data"):
+            account_buttons.append(InlineKeyboardButton("🔓 Logout", callback_data="logout"))
+        else:
+            account_buttons.append(InlineKeyboardButton("🔑 Login", callback_data="login"))
+    elif CURRENT_MODE == BotMode.SHARED and is_admin:
+        if context.application.bot_data.get("shared_session"):
+            account_buttons.append(InlineKeyboardButton("🔓 Logout", callback_data="logout"))
+        else:
+            account_buttons.append(InlineKeyboardButton("🔑 Login", callback_data="login"))
+    if account_buttons:
+        keyboard.append(account_buttons)
+
+    if is_admin:
+        keyboard.extend([
+            [InlineKeyboardButton("🔧 Change Mode", callback_data="mode_select")],
+            [InlineKeyboardButton(f"👥 Group Mode: {group_mode_status}", callback_data="toggle_group_mode")],
+            [InlineKeyboardButton("👤 Manage Users", callback_data="manage_users")]
+        ])
+    
+    # Show Manage Notifications only if an Overseerr user is selected
+    if overseerr_telegram_user_id != "N/A":
+        keyboard.append([InlineKeyboardButton("🔔 Manage Notifications", callback_data="manage_notifications")])
+
+    keyboard.append([InlineKeyboardButton("❌ Cancel", callback_data="cancel_settings")])
+    reply_markup = InlineKeyboardMarkup(keyboard)
+
+    if isinstance(update_or_query, Update):
+        await send_message(context, chat_id, text, reply_markup=reply_markup, message_thread_id=message_thread_id)
+    else:
+        await update_or_query.edit_message_text(text, parse_mode="Markdown", reply_markup=reply_markup)
+    
+########################################################################
+#                    /settings COMMAND
+########################################################################
+async def show_manage_notifications_menu(update_or_query, context: ContextTypes.DEFAULT_TYPE, current_settings: Optional[dict] = None):
+    """
+    Displays a menu letting the user toggle:
+      - Telegram notifications on/off (interpreted from notificationTypes.telegram)
+      - Silent mode on/off (from telegramSendSilently)
+    for their selected Overseerr user, using partial updates.
+    If current_settings is given, it is shown as-is instead of being fetched.
+    """
+    # Check if it's a callback or normal command
+    if isinstance(update_or_query, Update) and update_or_query.message:
+        query = None
+        telegram_user_id = update_or_query.effective_user.id
+        chat_id = update_or_query.effective_chat.id
+    elif isinstance(update_or_query, CallbackQuery):
+        query = update_or_query
+        telegram_user_id = query.from_user.id
+        chat_id = query.message.chat_id
+    else:
+        return
+
+    # Which Overseerr user is selected?
+    overseerr_telegram_user_id = context.user_data.get("overseerr_telegram_user_id")
+    overseerr_user_name = context.user_data.get("overseerr_user_name", "Unknown User")
+
+    if not overseerr_telegram_user_id:
+        msg = "No Overseerr user selected. Use /settings to pick a user first."
+        if query:
+            await query.edit_message_text(msg)
+        else:
+            await update_or_query.message.reply_text(msg)
+        return
+
+    # Fetch from Overseerr (or the short-lived cache) to show the current status
+    if current_settings is None:
+        current_settings = await get_cached_notification_settings(context, overseerr_telegram_user_id)
+    if not current_settings:
+        error_text = f"Failed to retrieve notification settings for Overseerr user {overseerr_telegram_user_id}."
+        if query:
+            await query.edit_message_text(error_text)
+        else:
+            await update_or_query.message.reply_text(error_text)
+        return
+
+    # Extract relevant fields
+    # If notificationTypes or telegram is missing, default to 0
+    notification_types = current_settings.get("notificationTypes", {})
+    telegram_bitmask = notification_types.get("telegram", 0)
+    telegram_silent = current_settings.get("telegramSendSilently", False)
+
+    # We interpret telegram_bitmask > 0 to mean "enabled"
+    telegram_is_enabled = (telegram_bitmask != 0)
+
+    # Build the display text
+    heading_text = (
+        "🔔 *Notification Settings*\n"
+        "Manage how Overseerr sends you updates via Telegram.\n\n"
+        f"👤 *User Information:*\n"
+        f"   - Name: *{overseerr_user_name}* (ID: `{overseerr_telegram_user_id}`)\n\n"
+        "⚙️ *Current Telegram Settings:*\n"
+        f"   - Notifications: {'*Enabled* ✅' if telegram_is_enabled else '*Disabled* ❌'}\n"
+        f"   - Silent Mode: {'*On* 🤫' if telegram_silent else '*Off* 🔊'}\n\n"
+        "🔄 *Actions:*\n"
+        "Use the buttons below to toggle notifications or silent mode. "
+        "Your preferences will be updated immediately."
+    )
+
+    # Build inline keyboard
+    # "Disable notifications" if currently enabled, or "Enable notifications" if it's disabled
+    toggle_telegram_label = "Disable notifications" if telegram_is_enabled else "Enable notifications"
+    toggle_silent_label = "Turn Silent Off" if telegram_silent else "Turn Silent On"
+
+    keyboard = [
+        [
+            InlineKeyboardButton(toggle_telegram_label, callback_data="toggle_user_notifications")
+        ],
+        [
+            InlineKeyboardButton(toggle_silent_label, callback_data="toggle_user_silent")
+        ],
+        [
+            InlineKeyboardButton("⬅️ Back to Settings", callback_data="back_to_settings")
+        ]
+    ]
+    reply_markup = InlineKeyboardMarkup(keyboard)
+
+    # Edit or send message
+    if query:
+        await query.edit_message_text(
+            text=heading_text,
+            parse_mode="Markdown",
+            reply_markup=reply_markup
+        )
+    else:
+        await update_or_query.message.reply_text(
+            text=heading_text,
+            parse_mode="Markdown",
+            reply_markup=reply_markup
+        )
+
+async def get_user_notification_settings(overseerr_telegram_user_id: int) -> dict:
+    """
+    (Optional) Fetch the user's notification settings from Overseerr:
+    GET /api/v1/user/<OverseerrUserID>/settings/notifications
+    Returns a dict or an empty dict on error.
+    """
+    try:
+        url = f"{OVERSEERR_API_URL}/user/{overseerr_telegram_user_id}/settings/notifications"
+        resp = await http_client.get(url, headers=API_KEY_JSON_HEADERS)
+        resp.raise_for_status()
+        data = orjson.loads(resp.content)
+        logger.info(f"Fetched notification settings for Overseerr user {overseerr_telegram_user_id}: {data}")
+        return data
+    except (httpx.HTTPError, ValueError) as e:
+        logger.error(f"Failed to fetch settings for user {overseerr_telegram_user_id}: {e}")
+        return {}
+
+async def get_cached_notification_settings(context: ContextTypes.DEFAULT_TYPE, overseerr_telegram_user_id: int) -> dict:
+    """
+    Returns the user's notification settings, reusing the copy kept in
+    context.user_data if it was fetched less than NOTIFICATION_SETTINGS_CACHE_TTL seconds ago.
+    Returns an empty dict on error.
+    """
+    cached = context.user_data.get("notification_settings")
+    if (
+        cached
+        and cached["overseerr_user_id"] == overseerr_telegram_user_id
+        and time.monotonic() - cached["fetched_at"] < NOTIFICATION_SETTINGS_CACHE_TTL
+    ):
+        return cached["settings"]
+
+    settings = await get_user_notification_settings(overseerr_telegram_user_id)
+    if settings:
+        context.user_data["notification_settings"] = {
+            "overseerr_user_id": overseerr_telegram_user_id,
+            "fetched_at": time.monotonic(),
+            "settings": settings,
+        }
+    return settings
+
+async def update_telegram_settings_for_user(
+    overseerr_telegram_user_id: int,
+    telegram_bitmask: int,       # either 3657 or 0
+    chat_id: str,
+    send_silently: bool
+) -> bool:
+    """
+    Sends a partial update to /user/<OverseerrUserID>/settings/notifications.
+    - telegram_bitmask=3657: enable all telegram notifications
+    - telegram_bitmask=0: disable all telegram notifications
+    - We set telegramEnabled=true because Overseerr apparently keeps it that way.
+    - telegramChatId is necessary so Overseerr knows which chat to use.
+    """
+    payload = {
+        "notificationTypes": {
+            "telegram": telegram_bitmask
+        },
+        "telegramEnabled": True,         # Always true in Overseerr DB
+        "telegramChatId": chat_id,       # Must provide the chat ID
+        "telegramSendSilently": send_silently
+    }
+
+    url = f"{OVERSEERR_API_URL}/user/{overseerr_telegram_user_id}/settings/notifications"
+    logger.info(f"Updating user {overseerr_telegram_user_id} with payload: {payload}")
+
+    try:
+        resp = await http_client.post(url, headers=API_KEY_JSON_HEADERS, content=orjson.dumps(payload))
+        resp.raise_for_status()
+        logger.info(f"Successfully updated telegram bitmask for user {overseerr_telegram_user_id}.")
+        return True
+    except httpx.HTTPStatusError as e:
+        logger.error(f"Failed to update telegram bitmask for user {overseerr_telegram_user_id}: {e}")
+        logger.error(f"Response content: {e.response.text}")
+        return False
+    except httpx.HTTPError as e:
+        logger.error(f"Failed to update telegram bitmask for user {overseerr_telegram_user_id}: {e}")
+        return False
+
+async def toggle_user_notifications(query: CallbackQuery, context: ContextTypes.DEFAULT_TYPE):
+    """
+    If the user currently has 0 => switch to 3657.
+    If the user currently has 3657 => switch to 0.
+    """
+    user_data = context.user_data
+    overseerr_telegram_user_id = user_data.get("overseerr_telegram_user_id")
+    if not overseerr_telegram_user_id:
+        await query.edit_message_text("No Overseerr user selected.")
+        return
+
+    # GET the current settings (or reuse the cached copy) to see if it's 0 or not
+    settings = await get_cached_notification_settings(context, overseerr_telegram_user_id)
+    if not settings:
+        await query.edit_message_text(f"Failed to get settings for user {overseerr_telegram_user_id}.")
+        return
+    
+    # If "notificationTypes" or "notificationTypes.telegram" is missing, default to 0
+    notif_types = settings.get("notificationTypes", {})
+    current_value = notif_types.get("telegram", 0)
+
+    # Flip between 0 and 3657
+    new_value = 3657 if current_value == 0 else 0
+
+    telegram_silent = settings.get("telegramSendSilently", False)
+    chat_id = str(query.message.chat_id)
+
+    success = await update_telegram_settings_for_user(
+        overseerr_telegram_user_id=overseerr_telegram_user_id,
+        telegram_bitmask=new_value,
+        chat_id=chat_id,
+        send_silently=telegram_silent
+    )
+
+    if not success:
+        await query.edit_message_text("❌ Failed to update Telegram bitmask in Overseerr.")
+        return
+
+    # Trust the update instead of re-fetching
+    settings.setdefault("notificationTypes", {})["telegram"] = new_value
+    await show_manage_notifications_menu(query, context, settings)
+
+async def toggle_user_silent(query: CallbackQuery, context: ContextTypes.DEFAULT_TYPE):
+    """
+    Toggles the 'telegramSendSilently' flag for the currently selected Overseerr user.
+    This only changes whether notifications (if enabled) are sent silently or not.
+    If notifications are disabled (bitmask=0), silent mode won't matter in practice,
+    but we still update the 'telegramSendSilently' field in Overseerr.
+    """
+    user_data = context.user_data
+    telegram_user_id = query.from_user.id
+
+    overseerr_telegram_user_id = user_data.get("overseerr_telegram_user_id")
+    if not overseerr_telegram_user_id:
+        await query.edit_message_text("No Overseerr user selected.")
+        return
+
+    current_settings = await get_cached_notification_settings(context, overseerr_telegram_user_id)
+    if not current_settings:
+        await query.edit_message_text(
+            f"Failed to fetch notification settings for user {overseerr_telegram_user_id}."
+        )
+        return
+
+    # Instead of relying on telegramEnabled (which Overseerr keeps 'true'),
+    # we read the actual bitmask from notificationTypes['telegram'].
+    notification_types = current_settings.get("notificationTypes", {})
+    current_bitmask = notification_types.get("telegram", 0)
+
+    # Flip the silent mode
+    current_silent = current_settings.get("telegramSendSilently", False)
+    new_silent = not current_silent
+
+    # If current_bitmask == 0, the user effectively has Telegram disabled.
+    # Toggling silent won't enable them, but we can still store the preference.
+    chat_id = str(query.message.chat_id)
+
+    success = await update_telegram_settings_for_user(
+        overseerr_telegram_user_id=overseerr_telegram_user_id,
+        telegram_bitmask=current_bitmask,  # keep the same bitmask (0 = off, 3657 = on, etc.)
+        chat_id=chat_id,
+        send_silently=new_silent
+    )
+
+    if not success:
+        await query.edit_message_text("❌ Failed to update silent mode in Overseerr.")
+        return
+
+    # Refresh the menu to display the new silent mode
+    current_settings["telegramSendSilently"] = new_silent
+    await show_manage_notifications_menu(query, context, current_settings)
+
+########################################################################
+#                    /check COMMAND
+########################################################################
+async def check_media(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """
+    Handles /check command to search for media.
+    """
+    user_data = context.user_data
+    telegram_user_id = update.effective_user.id
+    chat_id = update.effective_chat.id
+    message_thread_id = getattr(update.message, "message_thread_id", None)
+    logger.info("User %s executed /check with args: %s in chat %s, thread %s", telegram_user_id, context.args, chat_id, message_thread_id)
+
+    config = load_config()
+
+    # Check if command is allowed
+    if not is_command_allowed(chat_id, message_thread_id, config, telegram_user_id):
+        return
+
+    if PASSWORD and not user_is_authorized(telegram_user_id):
+        logger.info("User %s is not authorized. Requesting password.", telegram_user_id)
+        await send_message(context, chat_id, "👋 *Hey there!* Please enter the bot’s password to proceed:", message_thread_id=message_thread_id)
+        user_data["pending_flow"] = PendingFlow.PASSWORD
+        return
+
+    if "overseerr_telegram_user_id" not in user_data:
+        logger.info("User %s has no Overseerr user set.", telegram_user_id)
+        mode_specific_msg = {
+            BotMode.NORMAL: "Please log in with your Overseerr credentials in /settings.",
+            BotMode.API: "Please select an Overseerr user in /settings.",
+            BotMode.SHARED: "The admin needs to log in first. Use /settings if you’re the admin."
+        }
+        await send_message(
+            context,
+            chat_id,
+            f"👤 *No user configured yet.*\n{mode_specific_msg.get(CURRENT_MODE, 'Please configure in /settings.')}",
+            message_thread_id=message_thread_id
+        )
+        await show_settings_menu(update, context)
+        return
+
+    if not context.args:
+        await send_message(
+            context,
+            chat_id,
+            "🔍 *Search Media*\nPlease provide a title. Example: `/check Venom`",
+            message_thread_id=message_thread_id
+        )
+        return
+
+    media_name = " ".join(context.args)
+    try:
+        search_data = await search_media(media_name)
+    except httpx.TimeoutException:
+        await send_message(
+            context,
+            chat_id,
+            "⏱ *Search Timed Out*\nOverseerr did not respond in time. Please try again later.",
+            message_thread_id=message_thread_id
+        )
+        return
+    if not search_data:
+        await send_message(
+            context,
+            chat_id,
+            "❌ *Search Error*\nSomething went wrong. Please try again later.",
+            message_thread_id=message_thread_id
+        )
+        return
+
+    processed_results = process_search_results(search_data.get("results", []))
+    if not processed_results:
+        await send_message(
+            context,
+            chat_id,
+            f"🔍 *No Results*\nNo media found for '{media_name}'. Try a different title!",
+            message_thread_id=message_thread_id
+        )
+        return
+
+    store_search_results(user_data, processed_results)
+
+    sent_message = await display_results_with_buttons(update, context, offset=0)
+    user_data["results_message_id"] = sent_message.message_id
+
+###############################################################################
+#              DISPLAY RESULTS WITH BUTTONS (SEARCH PAGINATION)
+###############################################################################
+RESULTS_PAGE_SIZE = 5
+CANCEL_SEARCH_BUTTON = InlineKeyboardButton("❌ Cancel", callback_data="cancel_search")
+
+def results_navigation_row(offset: int, total_results: int) -> list:
+    """
+    Returns the Back/Cancel/More buttons for the results page starting at offset.
+    """
+    if offset == 0:
+        if total_results > RESULTS_PAGE_SIZE:
+            return [CANCEL_SEARCH_BUTTON, InlineKeyboardButton("➡️ More", callback_data=f"page_{offset + RESULTS_PAGE_SIZE}")]
+        return [CANCEL_SEARCH_BUTTON]
+
+    back_button = InlineKeyboardButton("⬅️ Back", callback_data=f"page_{offset - RESULTS_PAGE_SIZE}")
+    if offset + RESULTS_PAGE_SIZE >= total_results:
+        return [back_button, CANCEL_SEARCH_BUTTON]
+    return [back_button, CANCEL_SEARCH_BUTTON, InlineKeyboardButton("➡️ More", callback_data=f"page_{offset + RESULTS_PAGE_SIZE}")]
+
+def get_results_page_markup(context: ContextTypes.DEFAULT_TYPE, offset: int) -> InlineKeyboardMarkup:
+    """
+    Returns the inline keyboard for the search results page starting at offset.
+    Each page is built once per search and kept in context.user_data["rendered_pages"].
+    """
+    rendered_pages = context.user_data.setdefault("rendered_pages", {})
+    if offset in rendered_pages:
+        return rendered_pages[offset]
+
+    results = context.user_data.get("search_results", [])
+    total_results = context.user_data.get("total_results", len(results))
+    keyboard = [
+        [InlineKeyboardButton(f"{result['title']} ({result.get('year', 'Unknown Year')})", callback_data=f"select_{offset + idx}")]
+        for idx, result in enumerate(results[offset : offset + RESULTS_PAGE_SIZE])
+    ]
+    keyboard.append(results_navigation_row(offset, total_results))
+
+    reply_markup = InlineKeyboardMarkup(keyboard)
+    rendered_pages[offset] = reply_markup
+    return reply_markup
+
+async def display_results_with_buttons(
+    update_or_query,
+    context: ContextTypes.DEFAULT_TYPE,
+    offset: int,
+    new_message: bool = False,
+):
+    """
+    Shows the search results page starting at offset (up to RESULTS_PAGE_SIZE titles),
+    with Back/More navigation. Returns the message object (if any).
+    """
+    reply_markup = get_results_page_markup(context, offset)
+
+    # Decide how to send/edit the message
+    if new_message:
+        sent_message = await context.bot.send_message(
+            chat_id=update_or_query.message.chat_id,
+            text="Please select a result:",
+            reply_markup=reply_markup
+        )
+        return sent_message
+    elif isinstance(update_or_query, Update) and update_or_query.message:
+        sent_message = await update_or_query.message.reply_text(
+            text="Please select a result:",
+            reply_markup=reply_markup
+        )
+        return sent_message
+    elif isinstance(update_or_query, CallbackQuery):
+        await update_or_query.edit_message_text(
+            text="Please select a result:",
+            reply_markup=reply_markup
+        )
+        return
+    else:
+        sent_message = await context.bot.send_message(
+            chat_id=update_or_query.message.chat_id,
+            text="Please select a result:",
+            reply_markup=reply_markup
+        )
+        return sent_message
+
+###############################################################################
+#        process_user_selection: SHOW MEDIA DETAILS + REQUEST/ISSUE BUTTON
+###############################################################################
+async def process_user_selection(
+    update_or_query,
+    context: ContextTypes.DEFAULT_TYPE,
+    result: dict,
+    edit_message: bool = False
+):
+    """
+    Displays details about the selected media (poster, description, status).
+    Shows buttons for 1080p, 4K, or both—depending on user permissions.
+    """
+    user_data = context.user_data
+    # Determine whether this was triggered by a CallbackQuery
+    if isinstance(update_or_query, Update):
+        query = update_or_query.callback_query
+    else:
+        query = update_or_query
+
+    # Basic media info
+    media_title = result.get("title", "Unknown Title")
+    media_year = result.get("year", "????")
+    poster = result.get("poster")
+    description = result.get("description", "No description available")
+
+    status_hd = result.get("status_hd", STATUS_UNKNOWN)
+    status_4k = result.get("status_4k", STATUS_UNKNOWN)
+    overseerr_media_id = result.get("overseerr_id")
+
+    # Save the result for potential future actions (report issue, etc.)
+    user_data["selected_result"] = result
+
+    overseerr_telegram_user_id = user_data.get("overseerr_telegram_user_id")
+
+    # Decide if the user can request 4K for this media_type
+    user_has_4k_permission = False
+    if overseerr_telegram_user_id:
+        permissions = await get_user_permissions(overseerr_telegram_user_id)
+        user_has_4k_permission = user_can_request_4k(permissions, result.get("mediaType", ""))
+
+    str_appendix="confirm"
+    if result["mediaType"] == "tv":
+        str_appendix="sselect"
+
+    # Build the inline keyboard
+    keyboard = []
+    back_button = InlineKeyboardButton("⬅️ Back", callback_data="back_to_results")
+
+    # Decide which resolutions can be requested
+    can_request_hd = status_hd not in REQUESTED_STATUSES
+    can_request_4k = user_has_4k_permission and status_4k not in REQUESTED_STATUSES
+    resolution_options = []
+    if can_request_hd:
+        resolution_options.append(("1080p", "1080p"))
+    if can_request_4k:
+        resolution_options.append(("4K", "4k"))
+    if can_request_hd and can_request_4k:
+        resolution_options.append(("Both", "both"))
+
+    # A single option gets the more explicit "Request ..." label
+    label_prefix = "📥 Request " if len(resolution_options) == 1 else "📥 "
+    request_buttons = [
+        InlineKeyboardButton(f"{label_prefix}{label}", callback_data=f"{str_appendix}_{resolution}_{result['id']}")
+        for label, resolution in resolution_options
+    ]
+
+    if request_buttons:
+        keyboard.append(request_buttons)
+
+    # Requesting a show asks for its seasons next, so start loading them while the card is read.
+    # Only in API mode: the other modes read the details with the user's session, which is
+    # checked (and renewed if needed) when the request button is pressed.
+    if request_buttons and result["mediaType"] == "tv" and CURRENT_MODE == BotMode.API:
+        tv_details_tasks = user_data.setdefault("tv_details_tasks", {})
+        if result["id"] not in tv_details_tasks:
+            tv_details_tasks[result["id"]] = context.application.create_task(get_tv_details(result["id"]))
+
+    # Show Report Issue if any resolution is pending/processing/partial/available
+    if (status_hd in REQUESTED_STATUSES or status_4k in REQUESTED_STATUSES) and overseerr_media_id:
+        report_button = InlineKeyboardButton("🛠 Report Issue", callback_data=f"report_{overseerr_media_id}")
+        keyboard.append([report_button])
+
+    keyboard.append([back_button])
+
+    # Construct the main message text (with inline status interpretation)
+    status_hd_str = STATUS_LABELS.get(status_hd, "")
+    status_4k_str = STATUS_LABELS.get(status_4k, "")
+
+    status_lines = []
+    if status_hd_str:
+        status_lines.append(f"• 1080p: {status_hd_str}")
+    if status_4k_str:
+        status_lines.append(f"• 4K: {status_4k_str}")
+
+    if status_lines:
+        status_block = "*Current status*:\n" + "\n".join(status_lines)
+    else:
+        status_block = ""
+
+    media_heading = f"*{media_title} ({media_year})*"
+    message_text = f"{media_heading}\n\n{description}\n\n{status_block}"
+
+    # If we have an old results_message_id, it is deleted alongside the update below
+    results_message_id = user_data.pop("results_message_id", None)
+
+    reply_markup = InlineKeyboardMarkup(keyboard)
+
+    # Finally send or edit the message (photo or text)
+    # Use provided poster or default poster if none available
+    media_preview_url = f"https://image.tmdb.org/t/p/w500{poster}" if poster else DEFAULT_POSTER_URL
+
+    if edit_message:
+        # If the original message is a photo, edit its caption, otherwise edit the text.
+        if query.message.photo:
+            show_media = query.edit_message_caption(
+                caption=message_text,
+                parse_mode="Markdown",
+                reply_markup=reply_markup
+            )
+        else:
+            show_media = query.edit_message_text(
+                text=message_text,
+                parse_mode="Markdown",
+                reply_markup=reply_markup
+            )
+    else:
+        # The results list is a text message, which can't be turned into a photo, so a new message is needed
+        show_media = context.bot.send_photo(
+            chat_id=query.message.chat_id,
+            photo=media_preview_url,
+            caption=message_text,
+            parse_mode="Markdown",
+            reply_markup=reply_markup
+        )
+
+    sent_msg, _ = await asyncio.gather(
+        show_media,
+        delete_message_quietly(context, query.message.chat_id, results_message_id),
+    )
+    if edit_message:
+        user_data["media_message_id"] = query.message.message_id
+    else:
+        user_data["media_message_id"] = sent_msg.message_id
+
+async def get_user_permissions(overseerr_telegram_user_id: int) -> int:
+    """
+    Returns the Overseerr permission bitmask of the given user.
+    Read through the briefly cached Overseerr user list, so permission changes
+    made in Overseerr show up within OVERSEERR_USERS_CACHE_TTL.
+    """
+    user_info = await get_overseerr_user_by_id(overseerr_telegram_user_id)
+    if not user_info:
+        logger.warning(f"No user found with Overseerr ID {overseerr_telegram_user_id}")
+        return 0
+    return user_info.get("permissions", 0)
+
+def user_can_request_4k(user_permissions: int, media_type: str) -> bool:
+    """
+    Returns True if the given permission bitmask allows 4K requests for the specified media_type.
+    """
+    # Grant all 4K permissions to admin users (permission value 2)
+    if user_permissions == 2:
+        return True
+
+    # PERMISSION_4K_MOVIE: 2048 bit
+    # PERMISSION_4K_TV = 4096 bit
+    if media_type == "movie":
+        return (user_permissions & PERMISSION_4K_MOVIE) == PERMISSION_4K_MOVIE
+    elif media_type == "tv":
+        return (user_permissions & PERMISSION_4K_TV) == PERMISSION_4K_TV
+    else:
+        return False
+
+###############################################################################
+#            cancel_search: CANCEL CURRENT SEARCH & CLEANUP
+###############################################################################
+def clear_search_state(user_data: dict):
+    """
+    Drops the stored search results and their indexes once they can no longer be used.
+    selected_result is left alone: an issue report on the open media card still needs it.
+    """
+    user_data.pop("search_results", None)
+    user_data.pop("search_results_by_id", None)
+    user_data.pop("search_results_by_overseerr_id", None)
+    user_data.pop("total_results", None)
+    user_data.pop("rendered_pages", None)
+    user_data.pop("tv_details_tasks", None)
+
+async def cancel_search(query: CallbackQuery, context: ContextTypes.DEFAULT_TYPE):
+    """
+    Cancels the current search and removes related messages or states.
+    """
+    user_data = context.user_data
+    logger.info(f"Search canceled by user {query.from_user.id}.")
+    # Delete the current message
+    await query.message.delete()
+
+    # If we have a results_message_id, delete it as well
+    results_message_id = user_data.get("results_message_id")
+    if results_message_id:
+        try:
+            await context.bot.delete_message(
+                chat_id=query.message.chat_id,
+                message_id=results_message_id
+            )
+            logger.info(f"Deleted search results message {results_message_id}.")
+        except Exception as e:
+            # Not critical - sometimes the message is already deleted.
+            logger.debug(f"Could not delete search results message {results_message_id}: {e}")
+        user_data.pop("results_message_id", None)
+
+    # Clear any saved search results from context
+    clear_search_state(user_data)
+    user_data.pop("selected_result", None)
+
+    # Notify user
+    await context.bot.send_message(
+        chat_id=query.message.chat_id,
+        text=f"🔍 Search canceled. \n"
+        f"💡 Type `/check <title>` for a new search\n",
+        parse_mode="Markdown"
+    )
+
+async def mode_select(query: CallbackQuery, context: ContextTypes.DEFAULT_TYPE):
+    """
+    Displays a detailed mode selection menu with descriptions for each mode.
+    """
+    # Detailed mode descriptions with formatting and Emojis
+    text = (
+    "🔧 *Change Mode*\n\n"
+    "🌟 *Normal Mode*\n"
+    "Each user logs in with their own Overseerr credentials. Requests are made using individual session cookies. "
+    "If a session expires, the bot tries to auto-login. If it fails, users must log in again.\n\n"
+
+    "🔑 *API Mode*\n"
+    "All requests are sent using the API key, so users **don't need to log in**. Instead, they can select a user from the list, and the bot will process requests as that user.\n"
+    "Limitations:\n"
+    "- All media requests are approved automatically.\n"
+    "- Issue reports are sent under the admin’s account\n"
+    "- No individual login credentials.\n\n"
+
+    "👥 *Shared User Mode*\n"
+    "A single Overseerr account is shared for all users. The admin logs in once, and all user requests are sent through this shared account. "
+    "Normal users cannot change any settings.\n\n"
+
+    "📖 See GitHub Wiki for details."
+    )
+
+    await query.edit_message_text(text, parse_mode="Markdown", reply_markup=MODE_SELECT_MARKUP)
+
+###############################################################################
+#          CALLBACK HANDLERS: ONE FUNCTION PER INLINE BUTTON ACTION
+###############################################################################
+# All callback handlers share the signature (query, context, payload, config, is_admin)
+# so button_handler can dispatch to them through CALLBACK_EXACT_HANDLERS and
+# CALLBACK_PREFIX_HANDLERS below. For prefix handlers, payload is the callback
+# data with the prefix already stripped (e.g. "10" for "page_10"); exact
+# handlers get the full callback data.
+
+async def on_settings(query: CallbackQuery, context: ContextTypes.DEFAULT_TYPE, payload: str, config: dict, is_admin: bool):
+    await show_settings_menu(query, context, is_admin)
+
+async def on_cancel_settings(query: CallbackQuery, context: ContextTypes.DEFAULT_TYPE, payload: str, config: dict, is_admin: bool):
+    logger.debug("User %s canceled settings.", query.from_user.id)
+    await query.edit_message_text(
+        "⚙️ Settings closed. Use /start or /settings to return."
+    )
+
+async def on_change_user(query: CallbackQuery, context: ContextTypes.DEFAULT_TYPE, payload: str, config: dict, is_admin: bool):
+    logger.debug("User %s wants to change Overseerr user.", query.from_user.id)
+    await handle_change_user(query, context)
+
+async def on_manage_users(query: CallbackQuery, context: ContextTypes.DEFAULT_TYPE, payload: str, config: dict, is_admin: bool):
+    await show_user_management_menu(query, context)
+
+async def on_users_page(query: CallbackQuery, context: ContextTypes.DEFAULT_TYPE, payload: str, config: dict, is_admin: bool):
+    offset = int(payload)
+    await show_user_management_menu(query, context, offset=offset)
+
+async def on_manage_user(query: CallbackQuery, context: ContextTypes.DEFAULT_TYPE, payload: str, config: dict, is_admin: bool):
+    telegram_id = payload
+    await manage_specific_user(query, context, telegram_id)
+
+async def on_block_user(query: CallbackQuery, context: ContextTypes.DEFAULT_TYPE, payload: str, config: dict, is_admin: bool):
+    telegram_id = payload
+    if config["users"].get(telegram_id, {}).get("is_admin", False) and telegram_id == str(query.from_user.id):
+        await query.edit_message_text("❌ Cannot block the main admin.")
+        return
+    def block(config):
+        config["users"][telegram_id]["is_blocked"] = True
+        config["users"][telegram_id]["is_authorized"] = False
+
+    await update_config(block)
+    await manage_specific_user(query, context, telegram_id)
+
+async def on_unblock_user(query: CallbackQuery, context: ContextTypes.DEFAULT_TYPE, payload: str, config: dict, is_admin: bool):
+    telegram_id = payload
+    def unblock(config):
+        config["users"][telegram_id]["is_blocked"] = False
+        config["users"][telegram_id]["is_authorized"] = True
+
+    await update_config(unblock)
+    await manage_specific_user(query, context, telegram_id)
+
+async def on_promote_user(query: CallbackQuery, context: ContextTypes.DEFAULT_TYPE, payload: str, config: dict, is_admin: bool):
+    telegram_id = payload
+    def promote(config):
+        config["users"][telegram_id]["is_admin"] = True
+        config["users"][telegram_id]["is_authorized"] = True
+        config["users"][telegram_id]["is_blocked"] = False
+
+    await update_config(promote)
+    await manage_specific_user(query, context, telegram_id)
+
+async def on_demote_user(query: CallbackQuery, context: ContextTypes.DEFAULT_TYPE, payload: str, config: dict, is_admin: bool):
+    telegram_id = payload
+    if config["users"].get(telegram_id, {}).get("is_admin", False) and telegram_id == str(query.from_user.id):
+        await query.edit_message_text("❌ Cannot demote the main admin.")
+        return
+    def demote(config):
+        config["users"][telegram_id]["is_admin"] = False
+
+    await update_config(demote)
+    await manage_specific_user(query, context, telegram_id)
+
+async def on_manage_notifications(query: CallbackQuery, context: ContextTypes.DEFAULT_TYPE, payload: str, config: dict, is_admin: bool):
+    logger.debug("User %s wants to manage notifications.", query.from_user.id)
+    await show_manage_notifications_menu(query, context)
+
+async def on_toggle_user_notifications(query: CallbackQuery, context: ContextTypes.DEFAULT_TYPE, payload: str, config: dict, is_admin: bool):
+    logger.debug("User %s toggling their Telegram notifications.", query.from_user.id)
+    await toggle_user_notifications(query, context)
+
+async def on_toggle_user_silent(query: CallbackQuery, context: ContextTypes.DEFAULT_TYPE, payload: str, config: dict, is_admin: bool):
+    logger.debug("User %s toggling silent mode.", query.from_user.id)
+    await toggle_user_silent(query, context)
+
+async def on_create_user(query: CallbackQuery, context: ContextTypes.DEFAULT_TYPE, payload: str, config: dict, is_admin: bool):
+    logger.debug("User %s clicked 'Create new Overseerr User'.", query.from_user.id)
+    user_data = context.user_data
+    user_data["creating_new_user"] = True
+    user_data["new_user_data"] = {}
+    user_data["create_user_message_id"] = query.message.message_id
+
+    await query.edit_message_text(
+        text=(
+            "➕ *Create new Overseerr User*\n\n"
+            "Step 1: Please enter the user's email address."
+        ),
+        parse_mode="Markdown",
+        reply_markup=CANCEL_USER_CREATION_MARKUP
+    )
+
+async def on_cancel_user_creation(query: CallbackQuery, context: ContextTypes.DEFAULT_TYPE, payload: str, config: dict, is_admin: bool):
+    logger.debug("User %s canceled user creation.", query.from_user.id)
+    context.user_data.pop("creating_new_user", None)
+    context.user_data.pop("new_user_data", None)
+    await show_user_management_menu(query, context)
+
+async def on_back_to_settings(query: CallbackQuery, context: ContextTypes.DEFAULT_TYPE, payload: str, config: dict, is_admin: bool):
+    logger.debug("User %s going back to settings.", query.from_user.id)
+    await show_settings_menu(query, context, is_admin)
+
+async def on_toggle_group_mode(query: CallbackQuery, context: ContextTypes.DEFAULT_TYPE, payload: str, config: dict, is_admin: bool):
+    if not is_admin:
+        await query.edit_message_text("Only admins can toggle Group Mode.")
+        return
+    def toggle_group_mode(config):
+        config["group_mode"] = not config["group_mode"]
+        if not config["group_mode"]:
+            config["primary_chat_id"] = {"chat_id": None, "message_thread_id": None}
+            logger.info("Group Mode disabled, reset primary_chat_id to null")
+
+    config = await update_config(toggle_group_mode)
+    logger.info(f"Group Mode set to {config['group_mode']} by user {query.from_user.id}")
+    await show_settings_menu(query, context, is_admin=is_admin)
+
+async def on_login(query: CallbackQuery, context: ContextTypes.DEFAULT_TYPE, payload: str, config: dict, is_admin: bool):
+    logger.debug("User %s initiated login.", query.from_user.id)
+    if CURRENT_MODE == BotMode.API:
+        await query.edit_message_text("In API Mode, no login is required.")
+        return
+    if CURRENT_MODE == BotMode.SHARED and not is_admin:
+        await query.edit_message_text("In Shared Mode, only the admin can log in.")
+        return
+    await start_login(query, context)
+
+async def on_logout(query: CallbackQuery, context: ContextTypes.DEFAULT_TYPE, payload: str, config: dict, is_admin: bool):
+    telegram_user_id = query.from_user.id
+    logger.debug("User %s initiated logout.", telegram_user_id)
+    if CURRENT_MODE == BotMode.SHARED and not is_admin:
+        await query.edit_message_text("In Shared Mode, only the admin can log out.")
+        return
+    user_data = context.user_data
+    user_data.pop("session_data", None)
+    user_data.pop("overseerr_telegram_user_id", None)
+    user_data.pop("overseerr_user_name", None)
+    if CURRENT_MODE == BotMode.NORMAL:
+        await asyncio.to_thread(remove_user_session, telegram_user_id)
+    elif CURRENT_MODE == BotMode.SHARED and is_admin:
+        context.application.bot_data.pop("shared_session", None)
+        if os.path.exists(SHARED_SESSION_FILE):
+            os.remove(SHARED_SESSION_FILE)
+            logger.info("Cleared shared session file.")
+    await query.edit_message_text("✅ Logged out!")
+    await show_settings_menu(query, context, is_admin)
+
+async def on_mode_select(query: CallbackQuery, context: ContextTypes.DEFAULT_TYPE, payload: str, config: dict, is_admin: bool):
+    if not is_admin:
+        await on_unknown_callback(query, context, payload, config, is_admin)
+        return
+    logger.debug("Admin %s accessing mode selection.", query.from_user.id)
+    await mode_select(query, context)
+
+async def on_activate_mode(query: CallbackQuery, context: ContextTypes.DEFAULT_TYPE, payload: str, config: dict, is_admin: bool):
+    global CURRENT_MODE
+    if not is_admin:
+        await on_unknown_callback(query, context, payload, config, is_admin)
+        return
+    mode = payload
+    CURRENT_MODE = BotMode[mode.upper()]
+
+    def set_mode(config):
+        config["mode"] = mode
+
+    await update_config(set_mode)
+    await show_settings_menu(query, context, is_admin)
+
+# ---------------------------------------------------------
+# Search Pagination / Selection
+# ---------------------------------------------------------
+async def on_results_page(query: CallbackQuery, context: ContextTypes.DEFAULT_TYPE, payload: str, config: dict, is_admin: bool):
+    offset = int(payload)
+    logger.debug("User %s requested page offset %d.", query.from_user.id, offset)
+    await display_results_with_buttons(query, context, offset)
+
+async def on_cancel_user_selection(query: CallbackQuery, context: ContextTypes.DEFAULT_TYPE, payload: str, config: dict, is_admin: bool):
+    logger.debug("User %s canceled user selection.", query.from_user.id)
+    await show_settings_menu(query, context, is_admin)
+
+async def on_user_page(query: CallbackQuery, context: ContextTypes.DEFAULT_TYPE, payload: str, config: dict, is_admin: bool):
+    offset = int(payload)
+    logger.debug("User %s requested user page offset %d.", query.from_user.id, offset)
+    await handle_change_user(query, context, offset=offset)
+
+async def on_select_user(query: CallbackQuery, context: ContextTypes.DEFAULT_TYPE, payload: str, config: dict, is_admin: bool):
+    user_data = context.user_data
+    try:
+        selected_user_id = int(payload)
+    except ValueError:
+        logger.warning(f"Invalid select_user callback data: {query.data}")
+        await query.edit_message_text("Invalid user selection. Please try again.")
+        return
+
+    selected_user = await get_overseerr_user_by_id(selected_user_id)
+    if not selected_user:
+        logger.info(f"User ID {selected_user_id} not found in Overseerr user list.")
+        await query.edit_message_text("User not found. Please try again.")
+        return
+
+    display_name = (
+        selected_user.get("displayName")
+        or selected_user.get("username")
+        or f"User {selected_user_id}"
+    )
+
+    user_data["overseerr_telegram_user_id"] = selected_user_id
+    user_data["overseerr_user_name"] = display_name
+
+    # Fetch notification settings for the selected user
+    current_settings = await get_user_notification_settings(selected_user_id)
+
+    # Check if Telegram notifications are enabled
+    notification_types = current_settings.get("notificationTypes", {})
+    telegram_bitmask = notification_types.get("telegram", 0)
+    if telegram_bitmask == 0:  # Notifications are disabled
+        chat_id = str(query.message.chat_id)
+        success = await update_telegram_settings_for_user(
+            overseerr_telegram_user_id=selected_user_id,
+            chat_id=chat_id,
+            send_silently=current_settings.get("telegramSendSilently", False),
+            telegram_bitmask=3657  # Enable all notifications
+        )
+
+    # Persist in JSON so it survives bot restarts
+    await asyncio.to_thread(save_user_selection, query.from_user.id, selected_user_id, display_name)
+
+    await show_settings_menu(query, context, is_admin)
+
+async def on_select_result(query: CallbackQuery, context: ContextTypes.DEFAULT_TYPE, payload: str, config: dict, is_admin: bool):
+    results = context.user_data.get("search_results", [])
+    result_index = int(payload)
+    if 0 <= result_index < len(results):
+        selected_result = results[result_index]
+        logger.debug("User %s selected index %d: %s", query.from_user.id, result_index, selected_result["title"])
+        await process_user_selection(query, context, selected_result)
+    else:
+        logger.warning("Invalid search result index: %s", result_index)
+        await query.edit_message_text("Invalid selection. Please try again.")
+
+async def on_back_to_results(query: CallbackQuery, context: ContextTypes.DEFAULT_TYPE, payload: str, config: dict, is_admin: bool):
+    logger.debug("User %s going back to search results.", query.from_user.id)
+    await query.message.delete()
+    sent_message = await display_results_with_buttons(
+        query, context, offset=0, new_message=True
+    )
+    context.user_data["results_message_id"] = sent_message.message_id
+
+async def on_cancel_search(query: CallbackQuery, context: ContextTypes.DEFAULT_TYPE, payload: str, config: dict, is_admin: bool):
+    logger.debug("User %s canceled the search.", query.from_user.id)
+    await cancel_search(query, context)
+
+# ---------------------------------------------------------
+# Handling Requests for 1080p, 4K, or Both
+# ---------------------------------------------------------
+async def get_request_session(query: CallbackQuery, context: ContextTypes.DEFAULT_TYPE) -> tuple[bool, Optional[str]]:
+    """
+    Resolves the session cookie used for a request from the media card.
+    In Normal mode an expired session is renewed once with the stored credentials.
+    Progress and errors are shown in the card's caption.
+    Returns (ok, session_cookie); the cookie is None in API mode.
+    """
+    user_data = context.user_data
+    edit_caption = query.edit_message_caption
+
+    if CURRENT_MODE == BotMode.NORMAL:
+        if "session_data" not in user_data:
+            await edit_caption("Please log in first (/settings).")
+            return False, None
+        session_cookie = user_data["session_data"]["cookie"]
+        if await check_session_validity(session_cookie):
+            return True, session_cookie
+
+        await edit_caption("⏳ Session expired, attempting to re-login...")
+        email, password = base64.b64decode(user_data["session_data"]["credentials"]).decode().split(":")
+        new_cookie = await overseerr_login(email, password)
+        if not new_cookie:
+            user_data.pop("session_data", None)
+            await edit_caption("❌ Re-login failed. Please log in again.")
+            return False, None
+
+        user_data["session_data"]["cookie"] = new_cookie
+        await asyncio.to_thread(save_user_session, query.from_user.id, user_data["session_data"])
+        await edit_caption("✅ Successfully re-logged in!")
+        return True, new_cookie
+
+    if CURRENT_MODE == BotMode.SHARED:
+        shared_session = context.application.bot_data.get("shared_session")
+        if not shared_session or not await check_session_validity(shared_session["cookie"]):
+            await edit_caption("Shared session expired. Admin must re-login.")
+            return False, None
+        return True, shared_session["cookie"]
+
+    return True, None
+
+# Telegram users with a media request in flight. Updates run concurrently, so without
+# this a double-tapped confirm button would request the media twice.
+requests_in_progress = set()
+
+async def on_confirm_request(query: CallbackQuery, context: ContextTypes.DEFAULT_TYPE, payload: str, config: dict, is_admin: bool):
+    telegram_user_id = query.from_user.id
+    if telegram_user_id in requests_in_progress:
+        logger.info(f"Ignoring confirm from user {telegram_user_id}: a request is already running")
+        return
+    requests_in_progress.add(telegram_user_id)
+    try:
+        await confirm_request(query, context, payload)
+    finally:
+        requests_in_progress.discard(telegram_user_id)
+
+async def confirm_request(query: CallbackQuery, context: ContextTypes.DEFAULT_TYPE, payload: str):
+    """
+    Requests the selected media in the resolution (and season) given by the confirm button.
+    """
+    user_data = context.user_data
+    # payload is "<resolution>_<media_id>" or, for TV, "<resolution>_<media_id>_<season>"
+    resolution, _, media_payload = payload.partition("_")
+    media_id_str, _, season_index = media_payload.partition("_")
+    media_id = int(media_id_str)
+    selected_result = user_data.get("search_results_by_id", {}).get(media_id)
+    if not selected_result:
+        logger.warning(f"Media ID {media_id} not found in search results.")
+        # The media card is a photo, so its caption is edited rather than its text
+        await query.edit_message_caption("Unable to find this media. Please try again.")
+        return
+
+    session_ok, session_cookie = await get_request_session(query, context)
+    if not session_ok:
+        return
+
+    requested_by = None  # Default to None (excluded in Normal/Shared)
+    if CURRENT_MODE == BotMode.API:
+        requested_by = user_data.get("overseerr_telegram_user_id", 1)  # Use selected user ID in API mode
+
+    if resolution == "1080p":
+        success_1080p, message_1080p = await request_media(
+            media_id=media_id,
+            media_type=selected_result["mediaType"],
+            season_index=season_index,
+            requested_by=requested_by,
+            is4k=False,
+            session_cookie=session_cookie
+        )
+        await send_request_status(query, selected_result['title'], success_1080p=success_1080p, message_1080p=message_1080p)
+    elif resolution == "4k":
+        success_4k, message_4k = await request_media(
+            media_id=media_id,
+            media_type=selected_result["mediaType"],
+            season_index=season_index,
+            requested_by=requested_by,
+            is4k=True,
+            session_cookie=session_cookie
+        )
+        await send_request_status(query, selected_result['title'], success_4k=success_4k, message_4k=message_4k)
+    elif resolution == "both":
+        success_1080p, message_1080p = await request_media(
+            media_id=media_id,
+            media_type=selected_result["mediaType"],
+            season_index=season_index,
+            requested_by=requested_by,
+            is4k=False,
+            session_cookie=session_cookie
+        )
+        success_4k, message_4k = await request_media(
+            media_id=media_id,
+            media_type=selected_result["mediaType"],
+            season_index=season_index,
+            requested_by=requested_by,
+            is4k=True,
+            session_cookie=session_cookie
+        )
+        await send_request_status(query, selected_result['title'], success_1080p, message_1080p, success_4k, message_4k)
+
+    # The status message replaces the card's keyboard, so the search can't be navigated anymore
+    clear_search_state(user_data)
+    user_data.pop("selected_result", None)
+
+# ---------------------------------------------------------
+# Report Issue
+# ---------------------------------------------------------
+async def on_report_issue(query: CallbackQuery, context: ContextTypes.DEFAULT_TYPE, payload: str, config: dict, is_admin: bool):
+    user_data = context.user_data
+    overseerr_media_id = int(payload)
+    selected_result = user_data.get("search_results_by_overseerr_id", {}).get(overseerr_media_id)
+    if selected_result:
+        logger.debug(
+            "User %s wants to report an issue for %s (Overseerr ID %d).",
+            query.from_user.id, selected_result["title"], overseerr_media_id
+        )
+        user_data['selected_result'] = selected_result
+
+        await query.edit_message_caption(
+            caption=f"🛠 *Report an Issue*\n\nSelect the issue type for *{selected_result['title']}*:",
+            parse_mode="Markdown",
+            reply_markup=ISSUE_TYPE_MARKUP,
+        )
+    else:
+        logger.warning("No matching search result found for Overseerr ID %s.", overseerr_media_id)
+        await query.edit_message_caption("Selected media not found. Please try again.")
+
+async def on_issue_type(query: CallbackQuery, context: ContextTypes.DEFAULT_TYPE, payload: str, config: dict, is_admin: bool):
+    user_data = context.user_data
+    try:
+        issue_type_id = int(payload)
+    except ValueError:
+        logger.warning("Invalid issue_type callback data: %s", query.data)
+        await query.edit_message_caption("Invalid issue type. Please start again.")
+        return
+
+    issue_type_name = ISSUE_TYPES.get(issue_type_id, "Other")
+    logger.debug("User %s selected issue type %d (%s).", query.from_user.id, issue_type_id, issue_type_name)
+
+    selected_result = user_data.get('selected_result')
+    if not selected_result:
+        logger.warning("No selected_result found in context when choosing issue type.")
+        await query.edit_message_caption("No media selected. Please try reporting again.")
+        return
+
+    # Only start waiting for the description once there is media to report it on
+    user_data['reporting_issue'] = {
+        'issue_type': issue_type_id,
+        'issue_type_name': issue_type_name,
+    }
+    user_data['pending_flow'] = PendingFlow.ISSUE_DESCRIPTION
+
+    prompt_message = ISSUE_PROMPT_TEMPLATES.get(issue_type_id, ISSUE_PROMPT_TEMPLATES[4]).format(title=selected_result["title"])
+
+    await query.edit_message_caption(
+        caption=prompt_message,
+        parse_mode="Markdown",
+        reply_markup=CANCEL_ISSUE_MARKUP,
+    )
+
+async def on_cancel_issue(query: CallbackQuery, context: ContextTypes.DEFAULT_TYPE, payload: str, config: dict, is_admin: bool):
+    logger.debug("User %s canceled the issue reporting process.", query.from_user.id)
+    user_data = context.user_data
+    user_data.pop('reporting_issue', None)
+    user_data.pop('pending_flow', None)
+    selected_result = user_data.get('selected_result')
+    if not selected_result:
+        await query.edit_message_caption("No media selected. Please search again with /check.")
+        return
+    await process_user_selection(query, context, selected_result, edit_message=True)
+
+# ---------------------------------------------------------
+# Seasons select
+# ---------------------------------------------------------
+async def on_select_seasons(query: CallbackQuery, context: ContextTypes.DEFAULT_TYPE, payload: str, config: dict, is_admin: bool):
+    user_data = context.user_data
+    resolution_index, _, media_id_str = payload.partition("_")
+    media_id = int(media_id_str)
+    selected_result = user_data.get("search_results_by_id", {}).get(media_id)
+    if not selected_result:
+        logger.warning(f"Media ID {media_id} not found in search results.")
+        # The media card is a photo, so its caption is edited rather than its text
+        await query.edit_message_caption("Unable to find this media. Please try again.")
+        return
+
+    session_ok, session_cookie = await get_request_session(query, context)
+    if not session_ok:
+        return
+
+    # Build request_buttons list
+    keyboard = []
+    back_button = InlineKeyboardButton("⬅️ Back", callback_data="back_to_results")
+
+    if selected_result["mediaType"] == "tv":
+        # Reuse the lookup started when the card was opened, if there is one
+        tv_details_task = user_data.get("tv_details_tasks", {}).get(media_id)
+        if tv_details_task:
+            jrespond = await tv_details_task
+        else:
+            jrespond = await get_tv_details(media_id=media_id, session_cookie=session_cookie)
+        if not jrespond:
+            await query.edit_message_caption("❌ Could not load the seasons. Please try again later.")
+            user_data.get("tv_details_tasks", {}).pop(media_id, None)
+            return
+        for season in jrespond["seasons"]:
+            season_index = season.get("seasonNumber","")
+            btn_text = "📥 " + season.get("name","")
+            btn = InlineKeyboardButton(btn_text, callback_data=f"confirm_{resolution_index}_{selected_result['id']}_{season_index}")
+            keyboard.append([btn])
+
+    btn_all = InlineKeyboardButton("📥 All", callback_data=f"confirm_{resolution_index}_{selected_result['id']}_all")
+    keyboard.append([btn_all])
+    keyboard.append([back_button])
+
+    reply_markup = InlineKeyboardMarkup(keyboard)
+
+    await query.edit_message_caption(
+    caption="Select seasons:",
+    parse_mode="Markdown",
+    reply_markup=reply_markup
+    )
+
+# ---------------------------------------------------------
+# Fallback
+# ---------------------------------------------------------
+async def on_unknown_callback(query: CallbackQuery, context: ContextTypes.DEFAULT_TYPE, payload: str, config: dict, is_admin: bool):
+    logger.warning(f"User {query.from_user.id} triggered unknown callback data: {query.data}")
+    await query.edit_message_text(
+        text="Invalid action or unknown callback data. Please try again.",
+        parse_mode="Markdown"
+    )
+
+# Callback data that must match exactly
+CALLBACK_EXACT_HANDLERS = {
+    "settings": on_settings,
+    "cancel_settings": on_cancel_settings,
+    "change_user": on_change_user,
+    "manage_users": on_manage_users,
+    "manage_notifications": on_manage_notifications,
+    "toggle_user_notifications": on_toggle_user_notifications,
+    "toggle_user_silent": on_toggle_user_silent,
+    "create_user": on_create_user,
+    "cancel_user_creation": on_cancel_user_creation,
+    "back_to_settings": on_back_to_settings,
+    "toggle_group_mode": on_toggle_group_mode,
+    "login": on_login,
+    "logout": on_logout,
+    "mode_select": on_mode_select,
+    "cancel_user_selection": on_cancel_user_selection,
+    "back_to_results": on_back_to_results,
+    "cancel_search": on_cancel_search,
+    "cancel_issue": on_cancel_issue,
+}
+
+# Callback data carrying a payload after a prefix. The longest matching prefix
+# wins, so "select_user_5" goes to on_select_user and "select_5" to on_select_result.
+CALLBACK_PREFIX_HANDLERS = {
+    "users_page_": on_users_page,
+    "manage_user_": on_manage_user,
+    "block_user_": on_block_user,
+    "unblock_user_": on_unblock_user,
+    "promote_user_": on_promote_user,
+    "demote_user_": on_demote_user,
+    "activate_": on_activate_mode,
+    "page_": on_results_page,
+    "user_page_": on_user_page,
+    "select_user_": on_select_user,
+    "select_": on_select_result,
+    "confirm_": on_confirm_request,
+    "report_": on_report_issue,
+    "issue_type_": on_issue_type,
+    "sselect_": on_select_seasons,
+}
+
+def find_prefix_handler(data: str):
+    """
+    Looks up the handler for the longest registered prefix of the callback data.
+    Only the (at most a few) underscore positions are tried, each as a dict lookup.
+    Returns (handler, payload) or (None, None) if no prefix matches.
+    """
+    end = data.rfind("_")
+    while end != -1:
+        handler = CALLBACK_PREFIX_HANDLERS.get(data[:end + 1])
+        if handler is not None:
+            return handler, data[end + 1:]
+        end = data.rfind("_", 0, end)
+    return None, None
+
+###############################################################################
+#   button_handler: PROCESSES ALL INLINE BUTTON CLICKS (search, confirm, etc.)
+###############################################################################
+async def button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """
+    Handles button callbacks from inline keyboards by dispatching to the
+    matching on_* callback handler.
+    """
+    query = update.callback_query
+    data = query.data
+    telegram_user_id = query.from_user.id
+    chat_id = query.message.chat_id
+    message_thread_id = getattr(query.message, "message_thread_id", None)
+    config = load_config()
+    user_id_str = str(telegram_user_id)
+    is_admin = config["users"].get(user_id_str, {}).get("is_admin", False)
+
+    logger.info("User %s pressed button %r in chat %s, thread %s", telegram_user_id, data, chat_id, message_thread_id)
+
+    # Check if button callback is allowed
+    if not is_command_allowed(chat_id, message_thread_id, config, telegram_user_id):
+        return
+
+    if PASSWORD and not user_is_authorized(telegram_user_id):
+        logger.info("User %s is not authorized. Showing an error.", telegram_user_id)
+        await query.edit_message_text(
+            text="You need to be authorized. Please use /start and enter the password first."
+        )
+        return
+
+    handler = CALLBACK_EXACT_HANDLERS.get(data)
+    if handler is not None:
+        await handler(query, context, data, config, is_admin)
+        return
+
+    prefix_handler, payload = find_prefix_handler(data)
+    if prefix_handler is not None:
+        await prefix_handler(query, context, payload, config, is_admin)
+        return
+
+    await on_unknown_callback(query, context, data, config, is_admin)
+
+async def send_request_status(query, title, success_1080p=None, message_1080p=None, success_4k=None, message_4k=None):
+    """
+    Sends a formatted status message for a media request.
+    Handles 1080p, 4K, or both in a unified way.
+    """
+    status_1080p = "✅ 1080p requested successfully" if success_1080p else f"❌ 1080p: {message_1080p}" if message_1080p else "❌ 1080p request failed"
+    status_4k = "✅ 4K requested successfully" if success_4k else f"❌ 4K: {message_4k}" if message_4k else "❌ 4K request failed"
+
+    msg = f"*Request Status for {title}:*\n"
+    if success_1080p is not None:
+        msg += f"• {status_1080p}\n"
+    if success_4k is not None:
+        msg += f"• {status_4k}\n"
+
+    await query.edit_message_caption(msg.strip(), parse_mode="Markdown")
+
+###############################################################################
+#                HANDLE CHANGE USER FUNCTION
+###############################################################################
+async def handle_change_user(update_or_query, context: ContextTypes.DEFAULT_TYPE, is_initial=False, offset=0):
+    """
+    Handles the 'Change User' button click or direct call after password.
+    Presents a paginated list of Overseerr users to select from, with efficient user list caching.
+    """
+    if isinstance(update_or_query, Update):
+        telegram_user_id = update_or_query.effective_user.id
+        chat_id = update_or_query.effective_chat.id
+        message_thread_id = getattr(update_or_query.message, "message_thread_id", None)
+    elif isinstance(update_or_query, CallbackQuery):
+        telegram_user_id = update_or_query.from_user.id
+        chat_id = update_or_query.message.chat_id
+        message_thread_id = getattr(update_or_query.message, "message_thread_id", None)
+    else:
+        logger.error("Invalid argument type passed to handle_change_user")
+        return
+
+    config = load_config()
+
+    # Check if action is allowed
+    if not is_command_allowed(chat_id, message_thread_id, config, telegram_user_id):
+        return
+
+    logger.info(f"User {telegram_user_id} is attempting to change Overseerr user, is_initial={is_initial}, offset={offset}, chat {chat_id}, thread {message_thread_id}")
+
+    # Shared, briefly cached user list instead of a per-chat copy that never refreshes
+    users = await get_overseerr_users()
+    if not users:
+        error_text = "❌ Could not fetch user list from Overseerr. Please try again later."
+        await send_message(context, chat_id, error_text, message_thread_id=message_thread_id)
+        return
+    total_users = len(users)
+    page_size = 9
+    max_pages = (total_users + page_size - 1) // page_size
+
+    offset = max(0, min(offset, (max_pages - 1) * page_size))
+    current_users = users[offset:offset + page_size]
+
+    keyboard = [
+        [InlineKeyboardButton(
+            f"{u.get('displayName') or u.get('username') or 'User ' + str(u['id'])} (ID: {u['id']})",
+            callback_data=f"select_user_{u['id']}"
+        )]
+        for u in current_users
+    ]
+
+    navigation_buttons = []
+    cancel_button = InlineKeyboardButton("❌ Cancel", callback_data="cancel_user_selection")
+    navigation_buttons.append(cancel_button)
+
+    if offset > 0:
+        back_button = InlineKeyboardButton("⬅️ Back", callback_data=f"user_page_{offset - page_size}")
+        navigation_buttons.append(back_button)
+
+    if offset + page_size < total_users:
+        more_button = InlineKeyboardButton("➡️ More", callback_data=f"user_page_{offset + page_size}")
+        navigation_buttons.append(more_button)
+
+    if navigation_buttons:
+        keyboard.append(navigation_buttons)
+
+    reply_markup = InlineKeyboardMarkup(keyboard)
+    message_text = (
+        "🔄 *Select an Overseerr User:*" if not is_initial
+        else "🔄 *Let’s pick your Overseerr user:*"
+    )
+
+    if isinstance(update_or_query, Update):
+        await send_message(context, chat_id, message_text, reply_markup=reply_markup, message_thread_id=message_thread_id)
+    elif isinstance(update_or_query, CallbackQuery):
+        await update_or_query.edit_message_text(message_text, parse_mode="Markdown", reply_markup=reply_markup)
+
+###############################################################################
+#                               MAIN ENTRY POINT
+###############################################################################
+async def post_init(application):
+    """
+    Opens the shared HTTP client, fetches the global Telegram notification settings
+    and warms the Overseerr user list cache, both at the same time.
+    """
+    global http_client, GLOBAL_TELEGRAM_NOTIFICATION_STATUS
+    http_client = create_http_client()
+    GLOBAL_TELEGRAM_NOTIFICATION_STATUS, _ = await asyncio.gather(
+        get_global_telegram_notifications(),
+        get_overseerr_users(),
+    )
+
+async def post_shutdown(application):
+    """
+    Closes the shared HTTP client.
+    """
+    if http_client is not None:
+        await http_client.aclose()
+
+def main():
+    global CURRENT_MODE
+    ensure_data_directory()
+    config = load_config()
+    refresh_authorized_users(config)
+    mode_from_config = config.get("mode", "normal")
+    try:
+        CURRENT_MODE = BotMode[mode_from_config.upper()]
+    except KeyError:
+        logger.warning(f"Invalid mode {mode_from_config} in config, defaulting to NORMAL")
+        CURRENT_MODE = BotMode.NORMAL
+    logger.info(f"Bot started in mode: {CURRENT_MODE.value}")
+
+    if uvloop is not None:
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+        logger.info("Using uvloop event loop")
+
+    # Outgoing Telegram calls get their own keep-alive pool so concurrent button
+    # presses don't queue behind each other; getUpdates uses a separate small pool.
+    app = (
+        ApplicationBuilder()
+        .token(TELEGRAM_TOKEN)
+        .request(HTTPXRequest(connection_pool_size=32, pool_timeout=30.0, connect_timeout=10.0, read_timeout=20.0))
+        .get_updates_request(HTTPXRequest(connection_pool_size=4))
+        # Queues bursts of sends/edits under Telegram's flood limits (kept a bit below the
+        # ~30 messages/s cap) and retries calls that still hit RetryAfter instead of failing the handler
+        .rate_limiter(AIORateLimiter(overall_max_rate=25, overall_time_period=1, max_retries=3))
+        # Handlers mostly wait on Overseerr/Telegram, so let updates run side by side;
+        # outgoing Telegram calls are still throttled by the rate limiter above
+        .concurrent_updates(256)
+        .post_init(post_init)
+        .post_shutdown(post_shutdown)
+        .build()
+    )
+
+    if CURRENT_MODE == BotMode.SHARED:
+        shared_session = load_shared_session()
+        if shared_session:
+            app.bot_data["shared_session"] = shared_session
+            logger.info("Loaded shared session for Shared mode")
+
+    # Register handlers
+    # Runs for every update (messages and button presses) before the other handlers
+    app.add_handler(TypeHandler(Update, user_data_loader), group=-999)
+    app.add_handler(CommandHandler("start", start_command))
+    app.add_handler(CommandHandler("settings", show_settings_menu))
+    app.add_handler(CommandHandler("check", check_media))
+    app.add_handler(CallbackQueryHandler(button_handler))
+    app.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, handle_text_input))
+
+    # Only messages (commands, text input) and button presses are handled, so Telegram
+    # doesn't need to send anything else; startup keeps retrying until Telegram is reachable
+    allowed_updates = [Update.MESSAGE, Update.CALLBACK_QUERY]
+
+    if WEBHOOK_URL:
+        # Telegram pushes updates to WEBHOOK_URL/<token>; the token keeps the path unguessable
+        logger.info(f"Starting bot webhook on port {WEBHOOK_PORT}...")
+        app.run_webhook(
+            listen="0.0.0.0",
+            port=WEBHOOK_PORT,
+            url_path=TELEGRAM_TOKEN,
+            webhook_url=f"{WEBHOOK_URL.rstrip('/')}/{TELEGRAM_TOKEN}",
+            allowed_updates=allowed_updates,
+            bootstrap_retries=-1,
+        )
+    else:
+        logger.info("Starting bot polling...")
+        # Long-poll for the maximum 50 s so idle periods don't cost a getUpdates call every 10 s
+        app.run_polling(timeout=50, bootstrap_retries=-1, allowed_updates=allowed_updates)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+import asyncio
+import os
+import sys
+import unittest
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+
+os.environ.setdefault("OVERSEERR_API_URL", "http://overseerr.invalid/api/v1")
+os.environ.setdefault("OVERSEERR_API_KEY", "test-key")
+os.environ.setdefault("TELEGRAM_TOKEN", "123:test")
+os.environ.setdefault("PASSWORD", "")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import telegram_overseerr_bot as bot
+
+
+class MissingSelectedResultTests(unittest.IsolatedAsyncioTestCase):
+    """
+    The media card is a photo message, so errors on it must edit the caption;
+    edit_message_text fails with BadRequest on photo messages.
+    """
+
+    def make_query(self):
+        return SimpleNamespace(
+            edit_message_caption=AsyncMock(),
+            edit_message_text=AsyncMock(),
+            from_user=SimpleNamespace(id=42),
+        )
+
+    async def test_confirm_request_without_selected_result(self):
+        query = self.make_query()
+        context = SimpleNamespace(user_data={})
+
+        with patch.object(bot, "request_media", AsyncMock()) as request_media:
+            await bot.on_confirm_request(query, context, "1080p_123", {}, False)
+
+        query.edit_message_caption.assert_awaited_once_with("Unable to find this media. Please try again.")
+        query.edit_message_text.assert_not_awaited()
+        request_media.assert_not_awaited()
+
+    async def test_select_seasons_without_selected_result(self):
+        query = self.make_query()
+        context = SimpleNamespace(user_data={"search_results_by_id": {}})
+
+        with patch.object(bot, "get_tv_details", AsyncMock()) as get_tv_details:
+            await bot.on_select_seasons(query, context, "0_123", {}, False)
+
+        query.edit_message_caption.assert_awaited_once_with("Unable to find this media. Please try again.")
+        query.edit_message_text.assert_not_awaited()
+        get_tv_details.assert_not_awaited()
+
+
+    async def test_cancel_issue_without_selected_result(self):
+        query = self.make_query()
+        context = SimpleNamespace(user_data={
+            "pending_flow": bot.PendingFlow.ISSUE_DESCRIPTION,
+            "reporting_issue": {"issue_type": 1, "issue_type_name": "Video"},
+        })
+
+        await bot.on_cancel_issue(query, context, "", {}, False)
+
+        query.edit_message_caption.assert_awaited_once()
+        self.assertNotIn("pending_flow", context.user_data)
+        self.assertNotIn("reporting_issue", context.user_data)
+
+    async def test_issue_type_without_selected_result_starts_no_flow(self):
+        query = self.make_query()
+        query.data = "issue_type_1"
+        context = SimpleNamespace(user_data={})
+
+        await bot.on_issue_type(query, context, "1", {}, False)
+
+        self.assertNotIn("pending_flow", context.user_data)
+        self.assertNotIn("reporting_issue", context.user_data)
+
+    async def test_issue_description_without_selected_result_ends_flow(self):
+        update = SimpleNamespace(message=SimpleNamespace(reply_text=AsyncMock()))
+        context = SimpleNamespace(user_data={
+            "pending_flow": bot.PendingFlow.ISSUE_DESCRIPTION,
+            "reporting_issue": {"issue_type": 1, "issue_type_name": "Video"},
+        })
+
+        await bot.handle_issue_description_input(update, context, "No sound", {}, {})
+
+        update.message.reply_text.assert_awaited_once()
+        self.assertNotIn("pending_flow", context.user_data)
+        self.assertNotIn("reporting_issue", context.user_data)
+
+
+class StoreSearchResultsTests(unittest.TestCase):
+    def test_new_search_keeps_the_open_media_card(self):
+        selected = {"id": 1, "title": "Venom", "mediaType": "movie", "overseerr_id": None}
+        user_data = {"selected_result": selected, "pending_flow": bot.PendingFlow.ISSUE_DESCRIPTION}
+        results = [{"id": 2, "title": "Alien", "mediaType": "movie", "overseerr_id": 5}]
+
+        bot.store_search_results(user_data, results)
+
+        self.assertIs(user_data["selected_result"], selected)
+        self.assertEqual(user_data["search_results_by_id"], {2: results[0]})
+        self.assertEqual(user_data["search_results_by_overseerr_id"], {5: results[0]})
+
+
+class ConfirmRequestTests(unittest.IsolatedAsyncioTestCase):
+    async def test_double_tapped_confirm_requests_once(self):
+        query = SimpleNamespace(
+            edit_message_caption=AsyncMock(),
+            edit_message_text=AsyncMock(),
+            from_user=SimpleNamespace(id=7),
+        )
+        result = {"id": 123, "title": "Venom", "mediaType": "movie"}
+        context = SimpleNamespace(user_data={"search_results_by_id": {123: result}})
+
+        async def slow_request(**kwargs):
+            await asyncio.sleep(0.05)
+            return True, "Request successful"
+
+        with patch.object(bot, "get_request_session", AsyncMock(return_value=(True, "cookie"))), \
+                patch.object(bot, "request_media", AsyncMock(side_effect=slow_request)) as request_media:
+            await asyncio.gather(
+                bot.on_confirm_request(query, context, "1080p_123", {}, False),
+                bot.on_confirm_request(query, context, "1080p_123", {}, False),
+            )
+
+        request_media.assert_awaited_once()
+        self.assertNotIn(7, bot.requests_in_progress)
+
+
+if __name__ == "__main__":
+    unittest.main()